@@ -0,0 +1,230 @@
+"""
+End-to-end throughput benchmark.
+
+Starts the local stand-ins in a separate process, runs the real `src.main.main()` against
+them for a fixed time and reports chunks per second, per-stage latency percentiles,
+real-time lag, peak RSS and open sockets of the service process.
+
+Usage:
+    python -m benchmarks.run --sources 100 --duration 120 --backlog 600
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import sqlite3
+import tempfile
+import time
+from dataclasses import asdict
+
+from benchmarks.stand_ins import StandInConfig, serve
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sources", type=int, default=10, help="number of sources (1-500)")
+    parser.add_argument(
+        "--streams",
+        type=int,
+        default=0,
+        help="channels the sources are spread over, one per source by default",
+    )
+    parser.add_argument("--duration", type=float, default=60, help="benchmark time, seconds")
+    parser.add_argument("--chunk-duration", type=int, default=30)
+    parser.add_argument(
+        "--backlog",
+        type=int,
+        default=0,
+        help="archive backlog each source starts with, seconds; "
+        "a backlog makes sources run at full speed instead of real-time cadence",
+    )
+    parser.add_argument("--transcription-latency", type=float, default=0.5)
+    parser.add_argument("--transcription-rtf", type=float, default=0.01)
+    parser.add_argument("--archive-latency", type=float, default=0.0)
+    parser.add_argument("--video-bitrate", type=int, default=2000, help="kbps")
+    parser.add_argument("--port", type=int, default=0, help="stand-in port, random by default")
+    parser.add_argument("--json", help="also write the report to this file")
+    return parser.parse_args()
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(values[min(len(values) - 1, int(q * len(values)))], 4)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(values[-1], 4)}
+
+
+def count_sockets() -> int:
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Stand-ins did not start on port {port}")
+
+
+def seed_checkpoints(path: str, sources: int, position: int) -> None:
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "source_id INTEGER PRIMARY KEY, position INTEGER NOT NULL, updated_at INTEGER NOT NULL)"
+        )
+        connection.executemany(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?)",
+            [(i, position, int(time.time())) for i in range(sources)],
+        )
+    connection.close()
+
+
+def read_checkpoints(path: str) -> list[int]:
+    connection = sqlite3.connect(path)
+    try:
+        return [row[0] for row in connection.execute("SELECT position FROM checkpoints")]
+    finally:
+        connection.close()
+
+
+async def run(args: argparse.Namespace, port: int, state_db: str) -> dict:
+    # Imported here: settings are read from the environment prepared by main()
+    import aiohttp
+
+    from src import logging as service_logging
+    from src import main as service
+
+    service_logging.configure()
+
+    if args.backlog:
+        now = int(time.time())
+        seed_checkpoints(state_db, args.sources, now - args.chunk_duration * 3 // 2 - args.backlog)
+
+    started = time.perf_counter()
+    task = asyncio.create_task(service.main())
+    peak_sockets, peak_tasks = 0, 0
+    while time.perf_counter() - started < args.duration:
+        await asyncio.sleep(0.5)
+        if task.done():
+            task.result()
+        peak_sockets = max(peak_sockets, count_sockets())
+        peak_tasks = max(peak_tasks, len(service.tasks))
+    elapsed = time.perf_counter() - started
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://127.0.0.1:{port}/_stats") as response:
+            stats = await response.json()
+
+    now = int(time.time())
+    lags = [
+        max(0, now - args.chunk_duration * 3 // 2 - position)
+        for position in read_checkpoints(state_db)
+    ]
+    counters = stats["counters"]
+    return {
+        "config": vars(args),
+        "elapsed": round(elapsed, 2),
+        "chunks_per_second": round(counters.get("transcription_requests", 0) / elapsed, 3),
+        "audio_seconds_per_second": round(stats["transcribed_seconds"] / elapsed, 2),
+        "latency": {stage: percentiles(values) for stage, values in stats["latencies"].items()},
+        "lag": percentiles([float(lag) for lag in lags]),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_open_sockets": peak_sockets,
+        "peak_tasks": peak_tasks,
+        "counters": counters,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"elapsed:                  {report['elapsed']} s")
+    print(f"chunks per second:        {report['chunks_per_second']}")
+    print(f"audio seconds per second: {report['audio_seconds_per_second']}")
+    for stage, values in report["latency"].items():
+        print(f"{stage + ' latency:':<26}{values}")
+    print(f"real-time lag:            {report['lag']}")
+    print(f"peak RSS:                 {report['peak_rss_mb']} MB")
+    print(f"peak open sockets:        {report['peak_open_sockets']}")
+    print(f"peak source tasks:        {report['peak_tasks']}")
+    print(f"counters:                 {report['counters']}")
+
+
+def main() -> None:
+    args = parse_args()
+    if not 1 <= args.sources <= 500:
+        raise SystemExit("--sources must be between 1 and 500")
+
+    port = args.port or free_port()
+    workdir = tempfile.mkdtemp(prefix="trs-benchmark-")
+    state_db = os.path.join(workdir, "state.db")
+    base_url = f"http://127.0.0.1:{port}"
+    os.environ.update(
+        {
+            "TRANSCRIPTION_BASE_URL": base_url,
+            "TRANSCRIPTION_USERNAME": "benchmark",
+            "TRANSCRIPTION_PASSWORD": "benchmark",
+            "BACKEND_BASE_URL": base_url,
+            "BACKEND_API_KEY": "benchmark",
+            "STATE_DB_PATH": state_db,
+            "DELIVERY_JOURNAL_DIR": os.path.join(workdir, "delivery"),
+            "TMP_DIR": workdir,
+            "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+            "METRICS_PORT": os.environ.get("METRICS_PORT", "0"),
+        }
+    )
+
+    config = StandInConfig(
+        sources=args.sources,
+        streams=args.streams,
+        chunk_duration=args.chunk_duration,
+        video_bitrate_kbps=args.video_bitrate,
+        transcription_latency=args.transcription_latency,
+        transcription_rtf=args.transcription_rtf,
+        archive_latency=args.archive_latency,
+    )
+    context = multiprocessing.get_context("spawn")
+    stand_ins = context.Process(target=serve, args=(config, port), daemon=True)
+    stand_ins.start()
+    try:
+        wait_for_port(port)
+        report = asyncio.run(run(args, port, state_db))
+        report["stand_ins"] = asdict(config)
+    finally:
+        stand_ins.terminate()
+        stand_ins.join()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Local stand-ins for the archive, the transcription service and the backend.
+
+All three are served by one aiohttp application so a benchmark needs a single port.
+Every request is timed and the statistics are available at `GET /_stats`.
+"""
+
+import asyncio
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import lru_cache
+
+from aiohttp import web
+
+from benchmarks.ts import TsGenerator, null_packet
+
+TOKEN = "benchmark-token"
+
+_FILENAME_RE = re.compile(r"-(\d+)-(\d+)\.\w+$")
+
+
+@dataclass
+class StandInConfig:
+    sources: int = 10
+    streams: int = 0  # Channels the sources point at, one per source if 0
+    chunk_duration: int = 30
+    language: str = "ru"
+    video_bitrate_kbps: int = 2000
+    transcription_latency: float = 0.5  # Fixed latency per request, seconds
+    transcription_rtf: float = 0.01  # Additional latency per second of audio
+    segment_length: float = 6.0  # Length of generated segments, seconds
+    archive_latency: float = 0.0  # Time to first byte of archive responses, seconds
+
+
+class StandIns:
+    """
+    aiohttp application implementing the endpoints used by the service.
+    """
+
+    def __init__(self, config: StandInConfig, base_url: str) -> None:
+        self._config = config
+        self._base_url = base_url
+        self._generator = TsGenerator(config.video_bitrate_kbps)
+        self._latencies: dict[str, list[float]] = defaultdict(list)
+        self._counters: dict[str, int] = defaultdict(int)
+        self._transcribed_seconds = 0.0
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=1024**3)
+        app.router.add_get("/channels/{channel}/archive-{timestamp}-{duration}.ts", self.archive)
+        app.router.add_post("/auth/login", self.login)
+        app.router.add_post("/transcription/transcribe", self.transcribe)
+        app.router.add_get("/sources", self.sources)
+        app.router.add_post("/transcriptions/{source_id}", self.transcriptions)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+    async def archive(self, request: web.Request) -> web.StreamResponse:
+        started = time.perf_counter()
+        duration = int(request.match_info["duration"])
+        if self._config.archive_latency:
+            await asyncio.sleep(self._config.archive_latency)
+
+        # The cached chunk is made unique per window, identical windows are skipped as dead
+        window = f"{request.match_info['channel']}-{request.match_info['timestamp']}"
+        body = self._chunk(duration) + null_packet(window.encode())
+        response = web.StreamResponse(headers={"Content-Type": "video/mp2t"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        for offset in range(0, len(body), 256 * 1024):
+            await response.write(body[offset : offset + 256 * 1024])
+        await response.write_eof()
+
+        self._counters["archive_bytes"] += len(body)
+        self._record("archive", started)
+        return response
+
+    async def login(self, request: web.Request) -> web.Response:
+        self._counters["logins"] += 1
+        return web.json_response({"access_token": TOKEN})
+
+    async def transcribe(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        if request.headers.get("Authorization") != f"Bearer {TOKEN}":
+            return web.json_response({"detail": "Unauthorized"}, status=401)
+
+        try:
+            form = await request.post()
+        except ConnectionResetError:
+            # The client gave up while uploading, e.g. the benchmark is stopping
+            return web.Response(status=499)
+        upload = form["file"]
+        size = len(upload.file.read())
+        match = _FILENAME_RE.search(upload.filename or "")
+        duration = float(match.group(2)) if match else float(self._config.chunk_duration)
+
+        await asyncio.sleep(
+            self._config.transcription_latency + duration * self._config.transcription_rtf
+        )
+
+        segments, words = [], []
+        start, number = 0.0, 1
+        while start + self._config.segment_length <= duration:
+            end = start + self._config.segment_length - 0.5
+            segments.append({"number": number, "start": start, "end": end, "text": f"s{number}"})
+            words.append({"word": f"s{number}", "start": start, "end": end, "score": 0.9})
+            start += self._config.segment_length
+            number += 1
+
+        self._counters["upload_bytes"] += size
+        self._transcribed_seconds += duration
+        self._record("transcription", started)
+        return web.json_response({"segments": segments, "words": words})
+
+    async def sources(self, request: web.Request) -> web.Response:
+        streams = self._config.streams or self._config.sources
+        return web.json_response(
+            {
+                "sources": [
+                    {
+                        "id": i,
+                        "name": f"source-{i}",
+                        "url": f"{self._base_url}/channels/{i % streams}/index.m3u8",
+                        "language": self._config.language,
+                        "disabled": False,
+                        "chunkDuration": self._config.chunk_duration,
+                    }
+                    for i in range(self._config.sources)
+                ]
+            }
+        )
+
+    async def transcriptions(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        body = await request.json()
+        self._counters["transcriptions"] += len(body["transcriptions"])
+        self._record("backend", started)
+        return web.json_response({"status": "ok"})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "latencies": self._latencies,
+                "counters": self._counters,
+                "transcribed_seconds": self._transcribed_seconds,
+            }
+        )
+
+    def _record(self, stage: str, started: float) -> None:
+        self._counters[f"{stage}_requests"] += 1
+        self._latencies[stage].append(time.perf_counter() - started)
+
+    @lru_cache(maxsize=8)  # noqa: B019 - the instance lives as long as the process
+    def _chunk(self, duration: int) -> bytes:
+        return self._generator.generate(duration)
+
+
+def serve(config: StandInConfig, port: int) -> None:
+    """
+    Run the stand-ins until the process is terminated.
+    """
+    stand_ins = StandIns(config, f"http://127.0.0.1:{port}")
+    web.run_app(stand_ins.create_app(), host="127.0.0.1", port=port, print=None)
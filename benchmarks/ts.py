@@ -0,0 +1,109 @@
+"""
+Synthetic MPEG-TS generator used by the archive stand-in.
+"""
+
+import os
+
+TS_PACKET_SIZE = 188
+PMT_PID = 0x1000
+VIDEO_PID = 0x100
+AUDIO_PID = 0x101
+PTS_CLOCK = 90000
+FRAMES_PER_SECOND = 25
+
+
+def null_packet(payload: bytes) -> bytes:
+    """
+    Null packet carrying `payload`, which demuxers discard.
+    """
+    return bytes([0x47, 0x1F, 0xFF, 0x10]) + payload[:184].ljust(184, b"\xff")
+
+
+def _crc32_mpeg(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+            crc &= 0xFFFFFFFF
+    return crc
+
+
+def _section(table_id: int, table_id_extension: int, body: bytes) -> bytes:
+    length = 5 + len(body) + 4
+    section = (
+        bytes([table_id, 0xB0 | (length >> 8), length & 0xFF])
+        + table_id_extension.to_bytes(2, "big")
+        + bytes([0xC1, 0x00, 0x00])
+        + body
+    )
+    return section + _crc32_mpeg(section).to_bytes(4, "big")
+
+
+def _pes(stream_id: int, data: bytes, pts: int) -> bytes:
+    pts_bytes = bytes(
+        [
+            0x21 | ((pts >> 29) & 0x0E),
+            (pts >> 22) & 0xFF,
+            ((pts >> 14) & 0xFE) | 0x01,
+            (pts >> 7) & 0xFF,
+            ((pts << 1) & 0xFE) | 0x01,
+        ]
+    )
+    return bytes([0, 0, 1, stream_id, 0, 0, 0x80, 0x80, 5]) + pts_bytes + data
+
+
+class TsGenerator:
+    """
+    Generates transport streams with a PAT, a PMT, a video stream of random bytes and an
+    ADTS AAC audio stream tagged with a language, at a configurable bitrate.
+    """
+
+    def __init__(self, video_bitrate_kbps: int = 2000, language: str = "rus") -> None:
+        self._continuity: dict[int, int] = {}
+        self._video_frame_size = video_bitrate_kbps * 1000 // 8 // FRAMES_PER_SECOND
+        pat = _section(0x00, 1, bytes([0x00, 0x01, 0xE0 | (PMT_PID >> 8), PMT_PID & 0xFF]))
+        language_descriptor = bytes([0x0A, 4]) + language.encode("ascii")[:3] + b"\x00"
+        pmt = _section(
+            0x02,
+            1,
+            bytes([0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0x00])
+            + bytes([0x1B, 0xE0 | (VIDEO_PID >> 8), VIDEO_PID & 0xFF, 0xF0, 0x00])
+            + bytes([0x0F, 0xE0 | (AUDIO_PID >> 8), AUDIO_PID & 0xFF, 0xF0])
+            + bytes([len(language_descriptor)])
+            + language_descriptor,
+        )
+        self._tables = self._packets(0, b"\x00" + pat) + self._packets(PMT_PID, b"\x00" + pmt)
+
+    def generate(self, duration: int, seed: int = 0) -> bytes:
+        """
+        Generate `duration` seconds of transport stream.
+        """
+        parts = [self._tables]
+        for frame in range(duration * FRAMES_PER_SECOND):
+            pts = frame * PTS_CLOCK // FRAMES_PER_SECOND
+            video = os.urandom(self._video_frame_size)
+            parts.append(self._packets(VIDEO_PID, _pes(0xE0, video, pts)))
+            adts = b"\xff\xf1\x50\x80\x2e\x7f\xfc" + bytes([(seed + frame) % 256]) * 360
+            parts.append(self._packets(AUDIO_PID, _pes(0xC0, adts, pts)))
+        return b"".join(parts)
+
+    def _packets(self, pid: int, payload: bytes) -> bytes:
+        packets = []
+        unit_start = True
+        while payload:
+            continuity = self._continuity.get(pid, 0)
+            self._continuity[pid] = (continuity + 1) % 16
+            part, payload = payload[:184], payload[184:]
+
+            header = bytes([0x47, (0x40 if unit_start else 0x00) | (pid >> 8), pid & 0xFF])
+            if len(part) == 184:
+                packets.append(header + bytes([0x10 | continuity]) + part)
+            else:
+                stuffing = 183 - len(part)
+                adaptation = bytes([stuffing]) + (
+                    b"\x00" + b"\xff" * (stuffing - 1) if stuffing else b""
+                )
+                packets.append(header + bytes([0x30 | continuity]) + adaptation + part)
+            unit_start = False
+        return b"".join(packets)
@@ -1,4 +1,4 @@
 from .archive import get_video_from_archive
-from .transcription import TranscriptionClient
+from .transcription import TranscriptionClient, transcription_pool
 
-__all__ = ["TranscriptionClient", "get_video_from_archive"]
+__all__ = ["TranscriptionClient", "get_video_from_archive", "transcription_pool"]
@@ -1,44 +1,203 @@
-from pathlib import Path
+import asyncio
+import re
 
-import aiofiles
 import aiohttp
 
 from src import log
+from src.api.http import http_clients
+from src.api.spool import Spool
+from src.config import settings
 
+# Bounds of the adaptive read size: reads filling the buffer double it, mostly empty reads halve it
+_MIN_READ_SIZE = 16 * 1024
+_MAX_READ_SIZE = 1024 * 1024
 
-async def get_video_from_archive(url: str, filepath: Path) -> None:
+# Errors after which a transfer is resumed: dropped connections, truncated bodies and stalls
+_RESUMABLE_ERRORS = (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError, TimeoutError)
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+async def get_video_from_archive(url: str, name: str) -> Spool:
     """
     Download video from archive in a safe and controlled way.
 
+    The video is kept in memory and only spills over to a temporary file
+    when it is larger than `CHUNK_SPOOL_MAX_SIZE`.
+
+    There is no total timeout, a download fails when the archive sends nothing for
+    `ARCHIVE_STALL_TIMEOUT` seconds. If the archive accepts byte ranges, interrupted transfers
+    are resumed where they stopped, and files of at least `ARCHIVE_PARALLEL_MIN_SIZE` bytes
+    are fetched as `ARCHIVE_PARALLEL_RANGES` ranges concurrently.
+
     Args:
         url (str): Full URL to the video file
-        filepath (Path): Destination path for saving video
+        name (str): File name used when uploading the video
 
     Returns:
-        Path: Path to saved file
+        Spool: Downloaded video, the caller is responsible for closing it
 
     Raises:
         RuntimeError: If video file cannot be downloaded
     """
 
-    filepath.parent.mkdir(parents=True, exist_ok=True)
+    spool = Spool(name)
+    try:
+        log.debug("download_start", url=url, sampled=True)
+        response = await http_clients.archive.get(url)
+        try:
+            response.raise_for_status()
+        except aiohttp.ClientResponseError:
+            response.release()
+            raise
+
+        length = response.content_length
+        # Resuming a changed file would mix two versions, ranges are validated by If-Range
+        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        ranges = response.headers.get("Accept-Ranges") == "bytes"
+        parts = settings.ARCHIVE_PARALLEL_RANGES
+        if not ranges or length is None or length < settings.ARCHIVE_PARALLEL_MIN_SIZE:
+            parts = 1
 
-    timeout = aiohttp.ClientTimeout(total=60)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
+        if parts == 1:
+            await _download_range(url, spool, 0, length, response, validator, ranges)
+        else:
+            await _download_parts(url, name, spool, length, parts, response, validator)
+
+        log.debug(
+            "download_success",
+            url=url,
+            size=spool.size,
+            on_disk=spool.on_disk,
+            parts=parts,
+            sampled=True,
+        )
+        return spool
+
+    except Exception as e:
+        spool.close()
+        log.error("download_error", url=url, error=str(e) or type(e).__name__)
+        raise RuntimeError(f"Error downloading video: {e}") from e
+    except BaseException:
+        # Cancelled, the spool may have spilled over to a temporary file
+        spool.close()
+        raise
+
+
+async def _download_parts(
+    url: str,
+    name: str,
+    spool: Spool,
+    length: int,
+    parts: int,
+    response: aiohttp.ClientResponse,
+    validator: str | None,
+) -> None:
+    """
+    Download a file as consecutive byte ranges fetched concurrently. The first range is read
+    from the response already received, the others are requested alongside it.
+    """
+    bounds = [length * i // parts for i in range(parts + 1)]
+    spools = [spool] + [Spool(f"{i}-{name}") for i in range(1, parts)]
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for i in range(parts):
+                tg.create_task(
+                    _download_range(
+                        url,
+                        spools[i],
+                        bounds[i],
+                        bounds[i + 1],
+                        response if i == 0 else None,
+                        validator,
+                        True,
+                    )
+                )
+        for part in spools[1:]:
+            await spool.write_from(part)
+    except BaseExceptionGroup as group:
+        # Report the failure of the first failing range rather than the group
+        raise group.exceptions[0] from None
+    finally:
+        for part in spools[1:]:
+            part.close()
+
+
+async def _download_range(
+    url: str,
+    spool: Spool,
+    start: int,
+    end: int | None,
+    response: aiohttp.ClientResponse | None,
+    validator: str | None,
+    resumable: bool,
+) -> None:
+    """
+    Download bytes `start` to `end` (exclusive, None for the end of the file) into `spool`,
+    reading from `response` first if given. Interrupted transfers are resumed with a Range
+    request up to `ARCHIVE_MAX_RESUMES` times if `resumable`.
+    """
+    resumes = 0
+    while True:
+        offset = start + spool.size
         try:
-            log.debug("download_start", url=url, filepath=str(filepath))
-            async with session.get(url, ssl=False) as response:
-                response.raise_for_status()
-
-                async with aiofiles.open(filepath, "wb") as f:
-                    async for chunk in response.content.iter_chunked(8192):
-                        if chunk:
-                            await f.write(chunk)
-
-            log.debug("download_success", filepath=str(filepath))
-
-        except Exception as e:
-            if filepath.exists():
-                filepath.unlink(missing_ok=True)
-            log.error("download_error", url=url, filepath=str(filepath), error=str(e))
-            raise RuntimeError(f"Error downloading video: {e}") from e
+            if response is None:
+                response = await _request_range(url, offset, end, validator)
+            async with response:
+                await _read(response, spool, None if end is None else end - start)
+            if end is not None and start + spool.size < end:
+                raise aiohttp.ClientPayloadError("Response ended before the requested range")
+            return
+        except _RESUMABLE_ERRORS as e:
+            response = None
+            if not resumable or resumes >= settings.ARCHIVE_MAX_RESUMES:
+                raise
+            resumes += 1
+            log.warning(
+                "Archive download interrupted, resuming",
+                url=url,
+                offset=start + spool.size,
+                attempt=resumes,
+                error=str(e) or type(e).__name__,
+            )
+            await asyncio.sleep(0.5 * resumes)
+
+
+async def _request_range(
+    url: str, offset: int, end: int | None, validator: str | None
+) -> aiohttp.ClientResponse:
+    """
+    Request the bytes from `offset` to `end` (exclusive, None for the end of the file).
+    """
+    headers = {"Range": f"bytes={offset}-{'' if end is None else end - 1}"}
+    if validator:
+        headers["If-Range"] = validator
+    response = await http_clients.archive.get(url, headers=headers)
+    try:
+        response.raise_for_status()
+        match = _CONTENT_RANGE.fullmatch(response.headers.get("Content-Range", ""))
+        if response.status != 206 or match is None or int(match[1]) != offset:
+            # The archive ignored the range, or the file changed since the transfer started
+            raise RuntimeError(f"Archive did not resume the download at byte {offset}")
+    except Exception:
+        response.release()
+        raise
+    return response
+
+
+async def _read(response: aiohttp.ClientResponse, spool: Spool, limit: int | None) -> None:
+    """
+    Append the body of `response` to `spool` until it holds `limit` bytes or the body ends.
+    The read size adapts to the throughput: small for trickling streams, large for fast ones.
+    """
+    size = _MIN_READ_SIZE * 4
+    while limit is None or spool.size < limit:
+        wanted = size if limit is None else min(size, limit - spool.size)
+        data = await response.content.read(wanted)
+        if not data:
+            return
+        await spool.write(data)
+        if len(data) == wanted:
+            size = min(size * 2, _MAX_READ_SIZE)
+        elif len(data) < wanted // 4:
+            size = max(size // 2, _MIN_READ_SIZE)
@@ -0,0 +1,109 @@
+import asyncio
+import base64
+import binascii
+import json
+import time
+from collections.abc import Awaitable, Callable
+
+from src import log
+from src.config import settings
+
+LoginFunction = Callable[[], Awaitable[dict]]
+
+
+def get_token_expiry(token: str) -> float | None:
+    """
+    Returns the `exp` claim of a JWT as a Unix timestamp, or None if the token is not a JWT
+    or has no expiry. The signature is not verified, the token is only inspected.
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    exp = claims.get("exp") if isinstance(claims, dict) else None
+    return float(exp) if isinstance(exp, int | float) else None
+
+
+class TokenManager:
+    """
+    Process-wide access token of one account on one service, shared by all its clients.
+
+    Logins are single-flight: concurrent requests for a new token, e.g. after many requests
+    failed with 401 at once, wait for the same login. Tokens with a known expiry (the JWT
+    `exp` claim or `expires_in` of the login response) are refreshed in the background once
+    they are within `refresh_margin` seconds of expiring, and before use once they expired.
+    """
+
+    def __init__(self, login: LoginFunction, refresh_margin: float) -> None:
+        self._login = login
+        self._refresh_margin = refresh_margin
+        self._token: str | None = None
+        self._expires_at: float | None = None
+        self._refreshing: asyncio.Task[str] | None = None
+
+    async def get_token(self) -> str:
+        """
+        Return a valid token, logging in if there is none yet or it expired.
+        """
+        token = self._token
+        if token is None or self._is_expired(0):
+            return await self.refresh(token)
+        if self._is_expired(self._refresh_margin) and self._refreshing is None:
+            self._start_refresh()
+        return token
+
+    async def refresh(self, stale: str | None) -> str:
+        """
+        Replace the token `stale`, which the service rejected or which expired. If it was
+        already replaced, the current token is returned without logging in again.
+        """
+        if self._token is not None and self._token != stale:
+            return self._token
+        if self._refreshing is None:
+            self._start_refresh()
+        # The login is shared, a caller giving up must not cancel it for the others
+        return await asyncio.shield(self._refreshing)
+
+    def _is_expired(self, margin: float) -> bool:
+        return self._expires_at is not None and time.time() >= self._expires_at - margin
+
+    def _start_refresh(self) -> None:
+        self._refreshing = asyncio.create_task(self._refresh())
+        self._refreshing.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task[str]) -> None:
+        self._refreshing = None
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Login failed", error=str(task.exception()))
+
+    async def _refresh(self) -> str:
+        data = await self._login()
+        token = data["access_token"]
+        expires_at = get_token_expiry(token)
+        if expires_at is None and isinstance(data.get("expires_in"), int | float):
+            expires_at = time.time() + data["expires_in"]
+
+        self._token, self._expires_at = token, expires_at
+        log.info(
+            "Logged in",
+            expires_in=round(expires_at - time.time()) if expires_at is not None else None,
+        )
+        return token
+
+
+_token_managers: dict[tuple[str, str], TokenManager] = {}
+
+
+def get_token_manager(base_url: str, username: str, login: LoginFunction) -> TokenManager:
+    """
+    Returns the token manager of an account on a service, creating it with `login` on first use.
+    """
+    key = (base_url, username)
+    manager = _token_managers.get(key)
+    if manager is None:
+        manager = _token_managers[key] = TokenManager(login, settings.TOKEN_REFRESH_MARGIN)
+    return manager
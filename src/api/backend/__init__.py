@@ -1,3 +1,4 @@
 from .client import BackendClient
+from .delivery import DeliveryQueue, delivery_queue
 
-__all__ = ["BackendClient"]
+__all__ = ["BackendClient", "DeliveryQueue", "delivery_queue"]
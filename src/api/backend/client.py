@@ -1,9 +1,11 @@
 import httpx
 
+from src import log
+from src.api.http import http_clients
 from src.config import settings
+from src.logging import Lazy
 
 from .schemas import SourceList, TranscriptionList
-from ... import log
 
 
 class BackendClient:
@@ -14,24 +16,54 @@ class BackendClient:
     def __init__(self):
         self._base_url = settings.BACKEND_BASE_URL
         self._headers: dict[str, str] = {"Authorization": f"Bearer {settings.BACKEND_API_KEY}"}
+        self._client = http_clients.backend
 
     async def get_sources(self) -> SourceList:
         """
         Get the list of sources from the backend.
         """
         endpoint = f"{self._base_url}/sources"
+        log.debug("Fetching sources from backend", endpoint=endpoint)
+        response = await self._get(endpoint)
+        sources = SourceList.model_validate_json(response.content)
         log.debug(
-            "Fetching sources from backend",
-            endpoint=endpoint
+            "Received sources from backend",
+            endpoint=endpoint,
+            status_code=response.status_code,
+            count=len(sources.sources),
         )
-        response = await self._get(endpoint)
+        return sources
+
+    async def get_sources_if_changed(
+        self, etag: str | None = None
+    ) -> tuple[SourceList | None, str | None]:
+        """
+        Get the list of sources unless it still matches `etag`.
+        Returns None instead of the list when it was not modified, and the new ETag.
+        """
+        endpoint = f"{self._base_url}/sources"
+        headers = {**self._headers, "If-None-Match": etag} if etag else self._headers
+        response = await self._client.get(endpoint, headers=headers)
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            return None, etag
+        response.raise_for_status()
+        sources = SourceList.model_validate_json(response.content)
         log.debug(
             "Received sources from backend",
             endpoint=endpoint,
             status_code=response.status_code,
-            response=response.json()
+            count=len(sources.sources),
+            etag=response.headers.get("ETag"),
         )
-        return SourceList.model_validate(response.json())
+        return sources, response.headers.get("ETag")
+
+    async def get_excluded_phrases(self) -> list | dict:
+        """
+        Get the excluded phrase lists from the backend.
+        """
+        endpoint = f"{self._base_url}{settings.EXCLUDED_PHRASES_ENDPOINT}"
+        response = await self._get(endpoint)
+        return response.json()
 
     async def send_transcription_result(
         self, source_id: int, transcription: TranscriptionList
@@ -41,33 +73,39 @@ class BackendClient:
         """
         endpoint = f"{self._base_url}/transcriptions/{source_id}"
         log.debug(
-            f"Sending transcription result",
+            "Sending transcription result",
             source_id=source_id,
-            transcription=transcription,
-            endpoint=endpoint
+            count=len(transcription.transcriptions),
+            endpoint=endpoint,
+            sampled=True,
+        )
+        # Serialized in one pass by pydantic instead of dumping to dicts for `json=`
+        result = await self._post(
+            endpoint,
+            content=transcription.model_dump_json(),
+            headers={"Content-Type": "application/json"},
         )
-        result = await self._post(endpoint, json=transcription.model_dump())
         log.debug(
-            f"Received response from backend after sending transcription result",
+            "Received response from backend after sending transcription result",
             source_id=source_id,
             status_code=result.status_code,
-            response=result.json()
+            response=Lazy(lambda: result.text),
+            sampled=True,
         )
 
     async def _post(self, endpoint: str, **kwargs) -> httpx.Response:
         """
         Send an async POST request.
         """
-        async with httpx.AsyncClient(headers=self._headers, timeout=60.0) as client:
-            response = await client.post(endpoint, **kwargs)
-            response.raise_for_status()
-            return response
+        headers = {**self._headers, **kwargs.pop("headers", {})}
+        response = await self._client.post(endpoint, headers=headers, **kwargs)
+        response.raise_for_status()
+        return response
 
     async def _get(self, endpoint: str, **kwargs) -> httpx.Response:
         """
         Send an async GET request.
         """
-        async with httpx.AsyncClient(headers=self._headers, timeout=60.0) as client:
-            response = await client.get(endpoint, **kwargs)
-            response.raise_for_status()
-            return response
+        response = await self._client.get(endpoint, headers=self._headers, **kwargs)
+        response.raise_for_status()
+        return response
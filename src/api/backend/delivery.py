@@ -0,0 +1,401 @@
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from httpx import HTTPStatusError
+
+from src import log, metrics
+from src.config import settings
+
+from .client import BackendClient
+from .schemas import TranscriptionList
+
+# Responses to invalid results, which are dropped instead of retried
+_REJECTED_STATUS_CODES = (400, 422)
+
+
+@dataclass
+class Batch:
+    """
+    Transcriptions of several sources flushed together.
+
+    `items` maps a source id to its transcriptions in the order they were produced.
+    """
+
+    id: int
+    items: dict[int, TranscriptionList] = field(default_factory=dict)
+
+
+class DeliveryQueue:
+    """
+    Write-behind delivery of transcription results to the backend.
+
+    Results of all sources are buffered and flushed as a batch when `batch_size` results are
+    pending or every `flush_interval` seconds. Each batch is appended to a journal file and
+    fsync'd before delivery, and an acknowledgement is appended once the backend accepted the
+    transcriptions of a source, so unsent batches survive restarts and backend outages.
+    If the journal cannot be written, results are still delivered, only not durably.
+    Once the journal has grown past `compact_size` bytes and doubled since it was last
+    compacted, it is rewritten with only the undelivered results. On close, delivery goes on
+    for up to `drain_timeout` seconds before the rest is left to the journal.
+
+    The results of each source are delivered in order, the sources of a batch concurrently.
+    A source whose deliveries fail is retried with exponential backoff while the results
+    of the other sources keep flowing.
+    """
+
+    def __init__(
+        self,
+        journal_dir: str | Path,
+        batch_size: int,
+        flush_interval: float,
+        max_backoff: float,
+        compact_size: int,
+        drain_timeout: float,
+    ) -> None:
+        self._journal_path = Path(journal_dir) / "journal.jsonl"
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_backoff = max_backoff
+        self._compact_size = compact_size
+        self._drain_timeout = drain_timeout
+        # Bytes in the journal, and in it right after the last compaction
+        self._journal_size = 0
+        self._compacted_size = 0
+        self._backend_client: BackendClient | None = None
+        self._pending: list[tuple[int, TranscriptionList]] = []
+        self._journaled: asyncio.Future[None] | None = None
+        self._batches: deque[Batch] = deque()
+        self._batch_ids = itertools.count(1)
+        self._flush_requested = asyncio.Event()
+        self._batch_available = asyncio.Event()
+        self._batch_added = asyncio.Event()
+        self._drained = asyncio.Event()
+        # Sources whose last delivery failed: (backoff, monotonic time of the next attempt)
+        self._retries: dict[int, tuple[float, float]] = {}
+        self._journal_lock = asyncio.Lock()
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of results waiting to be flushed into a batch.
+        """
+        return len(self._pending)
+
+    @property
+    def undelivered(self) -> int:
+        """
+        Number of journaled batches not yet fully delivered.
+        """
+        return len(self._batches)
+
+    async def submit(self, source_id: int, transcription: TranscriptionList) -> None:
+        """
+        Queue a transcription result for delivery.
+
+        Returns once the result is written to the journal, or failed to be, at most
+        `flush_interval` seconds later. Never waits for the backend.
+        """
+        self._pending.append((source_id, transcription))
+        if self._journaled is None:
+            self._journaled = asyncio.get_running_loop().create_future()
+        journaled = self._journaled
+
+        if len(self._pending) >= self._batch_size:
+            self._flush_requested.set()
+        await asyncio.shield(journaled)
+
+    async def start(self) -> None:
+        """
+        Replay the journal and start the flush and delivery loops.
+        """
+        self._backend_client = BackendClient()
+        self._journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with contextlib.suppress(FileNotFoundError):
+            self._journal_size = self._journal_path.stat().st_size
+
+        for batch in await asyncio.to_thread(self._read_journal):
+            self._batches.append(batch)
+        if self._batches:
+            self._batch_ids = itertools.count(self._batches[-1].id + 1)
+            self._batch_available.set()
+            log.info("Replaying undelivered transcription batches", count=len(self._batches))
+
+        if not self._batches:
+            self._drained.set()
+
+        self._tasks = [
+            asyncio.create_task(self._flush_loop(), name="delivery-flush"),
+            asyncio.create_task(self._deliver_loop(), name="delivery-send"),
+        ]
+
+    async def close(self) -> None:
+        """
+        Deliver the remaining results for up to `drain_timeout` seconds, then stop delivery
+        and journal results that were not flushed yet.
+        """
+        if self._tasks and self._drain_timeout > 0:
+            await self._flush()
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._drained.wait(), self._drain_timeout)
+            if self._batches:
+                log.warning(
+                    "Transcription batches left undelivered, journaled for the next start",
+                    count=len(self._batches),
+                )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._flush()
+        # Everything is in the journal now and will be replayed on the next start
+        self._batches.clear()
+        self._batch_available.clear()
+
+    async def __aenter__(self) -> "DeliveryQueue":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self._flush_interval)
+            except TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        journaled, self._journaled = self._journaled, None
+        batch = Batch(next(self._batch_ids))
+        for source_id, transcription in pending:
+            if source_id in batch.items:
+                batch.items[source_id].transcriptions.extend(transcription.transcriptions)
+            else:
+                batch.items[source_id] = transcription.model_copy(deep=True)
+
+        await self._append_journal(self._batch_record(batch.id, batch.items))
+        journaled.set_result(None)
+        self._batches.append(batch)
+        self._batch_available.set()
+        self._batch_added.set()
+        self._drained.clear()
+
+    async def _deliver_loop(self) -> None:
+        while True:
+            await self._batch_available.wait()
+            self._batch_added.clear()
+
+            ready = self._next_results(time.monotonic())
+            if ready:
+                await self._deliver(ready)
+
+            self._batches = deque(batch for batch in self._batches if batch.items)
+            # Truncate the journal once everything was delivered, or rewrite it when results
+            # of a source that keeps failing hold it back
+            threshold = max(self._compact_size, 2 * self._compacted_size) if self._batches else 0
+            if self._journal_size > threshold:
+                await self._compact_journal()
+            if not self._batches:
+                self._batch_available.clear()
+                self._drained.set()
+            elif not ready:
+                # Every source left is backing off, new results of other sources end the wait
+                retry_at = min(retry_at for _, retry_at in self._retries.values())
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._batch_added.wait(), max(0.0, retry_at - time.monotonic())
+                    )
+
+    def _next_results(self, now: float) -> dict[int, Batch]:
+        """
+        Returns the batch holding the oldest undelivered result of each source that is not
+        backing off.
+        """
+        ready: dict[int, Batch] = {}
+        seen: set[int] = set()
+        for batch in self._batches:
+            for source_id in batch.items:
+                if source_id in seen:
+                    continue
+                seen.add(source_id)
+                retry = self._retries.get(source_id)
+                if retry is None or retry[1] <= now:
+                    ready[source_id] = batch
+        return ready
+
+    async def _deliver(self, ready: dict[int, Batch]) -> None:
+        """
+        Send the oldest result of every ready source concurrently. Failed sources back off.
+        """
+
+        async def send(source_id: int, transcription: TranscriptionList) -> int:
+            started = time.perf_counter()
+            await self._backend_client.send_transcription_result(
+                source_id=source_id, transcription=transcription
+            )
+            metrics.backend_post_seconds.observe(time.perf_counter() - started)
+            return source_id
+
+        results = await asyncio.gather(
+            *(send(source_id, batch.items[source_id]) for source_id, batch in ready.items()),
+            return_exceptions=True,
+        )
+
+        for (source_id, batch), result in zip(ready.items(), results, strict=True):
+            if self._is_rejected(result):
+                log.error(
+                    "Transcription result rejected by backend, dropping",
+                    error=str(result),
+                    source_id=source_id,
+                    batch=batch.id,
+                )
+            elif isinstance(result, BaseException):
+                backoff = self._retries[source_id][0] * 2 if source_id in self._retries else 1.0
+                backoff = min(backoff, self._max_backoff)
+                self._retries[source_id] = (backoff, time.monotonic() + backoff)
+                log.warning(
+                    "Backend delivery failed, retrying",
+                    error=str(result),
+                    source_id=source_id,
+                    batch=batch.id,
+                    retry_in=backoff,
+                )
+                continue
+            self._retries.pop(source_id, None)
+            del batch.items[source_id]
+            await self._append_journal({"ack": batch.id, "source_id": source_id})
+
+    @staticmethod
+    def _is_rejected(result: int | BaseException) -> bool:
+        """
+        Only results the backend refused as invalid fail again on retry. Other client errors,
+        such as 401/403 of an expired or rotated API key, 408, 409, 425 and 429, are retried.
+        """
+        return (
+            isinstance(result, HTTPStatusError)
+            and result.response.status_code in _REJECTED_STATUS_CODES
+        )
+
+    async def _append_journal(self, record: dict) -> None:
+        """
+        Append a record to the journal. A failed write, e.g. on a full disk, is logged and
+        counted but not raised: the results are still delivered, they only would not be
+        replayed after a restart.
+        """
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            async with self._journal_lock:
+                await asyncio.to_thread(self._write_journal, line)
+                self._journal_size += len(line.encode())
+        except Exception as e:
+            log.error(
+                "Error writing delivery journal",
+                error=str(e),
+                batch=record.get("batch", record.get("ack")),
+            )
+            metrics.delivery_journal_errors.inc()
+
+    def _write_journal(self, line: str) -> None:
+        with open(self._journal_path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _batch_record(batch_id: int, items: dict[int, TranscriptionList]) -> dict:
+        return {
+            "batch": batch_id,
+            "items": {
+                str(source_id): transcription.model_dump()
+                for source_id, transcription in items.items()
+            },
+        }
+
+    async def _compact_journal(self) -> None:
+        """
+        Rewrite the journal with the results not delivered yet, while the other results
+        keep being delivered, and replace it atomically.
+        """
+        async with self._journal_lock:
+            # Batches are journaled and acknowledged under the same lock, so the snapshot
+            # matches the journal. Acknowledgements of results it still holds follow it.
+            batches = [(batch.id, dict(batch.items)) for batch in self._batches if batch.items]
+            try:
+                size = await asyncio.to_thread(self._rewrite_journal, batches)
+            except OSError as e:
+                log.error("Error compacting delivery journal", error=str(e))
+                return
+            self._journal_size = self._compacted_size = size
+
+    def _rewrite_journal(self, batches: list[tuple[int, dict[int, TranscriptionList]]]) -> int:
+        path = self._journal_path.with_name(self._journal_path.name + ".tmp")
+        size = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for batch_id, items in batches:
+                line = json.dumps(self._batch_record(batch_id, items), ensure_ascii=False) + "\n"
+                f.write(line)
+                size += len(line.encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path, self._journal_path)
+        directory = os.open(self._journal_path.parent, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        return size
+
+    def _read_journal(self) -> list[Batch]:
+        if not self._journal_path.exists():
+            return []
+
+        batches: dict[int, Batch] = {}
+        with open(self._journal_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn write at the end of the journal, the batch was never acknowledged
+                    log.warning("Skipping corrupted journal record", path=str(self._journal_path))
+                    continue
+
+                if "batch" in record:
+                    batches[record["batch"]] = Batch(
+                        record["batch"],
+                        {
+                            int(source_id): TranscriptionList.model_validate(transcription)
+                            for source_id, transcription in record["items"].items()
+                        },
+                    )
+                elif "ack" in record and record["ack"] in batches:
+                    batches[record["ack"]].items.pop(record["source_id"], None)
+
+        return [batch for batch in batches.values() if batch.items]
+
+
+delivery_queue = DeliveryQueue(
+    # Workers sharing the data directory keep separate journals
+    Path(settings.DELIVERY_JOURNAL_DIR) / settings.WORKER_ID
+    if settings.SHARDING
+    else settings.DELIVERY_JOURNAL_DIR,
+    settings.DELIVERY_BATCH_SIZE,
+    settings.DELIVERY_FLUSH_INTERVAL,
+    settings.DELIVERY_MAX_BACKOFF,
+    settings.DELIVERY_JOURNAL_COMPACT_SIZE,
+    settings.DELIVERY_DRAIN_TIMEOUT,
+)
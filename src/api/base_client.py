@@ -10,9 +10,10 @@ class BaseClient(ABC):
     Base class for API clients.
     """
 
-    def __init__(self, base_url: str, credentials: dict[str, str]):
+    def __init__(self, base_url: str, credentials: dict[str, str], client: httpx.AsyncClient):
         self._base_url = base_url
         self._credentials = credentials
+        self._client = client
         self._headers: dict[str, str] = {}
 
     @retry_on_unauthorized
@@ -20,10 +21,9 @@ class BaseClient(ABC):
         """
         Send an async POST request.
         """
-        async with httpx.AsyncClient(headers=self._headers, timeout=60.0) as client:
-            response = await client.post(endpoint, **kwargs)
-            response.raise_for_status()
-            return response
+        response = await self._client.post(endpoint, headers=self._headers, **kwargs)
+        response.raise_for_status()
+        return response
 
     @abstractmethod
     async def login(self) -> None:
@@ -0,0 +1,118 @@
+import importlib.util
+
+import aiohttp
+import httpx
+
+from src import log
+from src.config import settings
+
+
+class HttpClients:
+    """
+    Process-wide set of long-lived HTTP clients shared by every API client.
+
+    Each upstream service gets its own keep-alive pool so that connection limits apply per host.
+    The pool is started and closed by the application entry point.
+    """
+
+    def __init__(self) -> None:
+        self._backend: httpx.AsyncClient | None = None
+        self._transcription: httpx.AsyncClient | None = None
+        self._archive: aiohttp.ClientSession | None = None
+
+    @property
+    def backend(self) -> httpx.AsyncClient:
+        """
+        Client used for the backend API.
+        """
+        if self._backend is None:
+            raise RuntimeError("HTTP clients are not started")
+        return self._backend
+
+    @property
+    def transcription(self) -> httpx.AsyncClient:
+        """
+        Client used for the transcription service.
+        """
+        if self._transcription is None:
+            raise RuntimeError("HTTP clients are not started")
+        return self._transcription
+
+    @property
+    def archive(self) -> aiohttp.ClientSession:
+        """
+        Session used to download video chunks from the archive.
+        """
+        if self._archive is None:
+            raise RuntimeError("HTTP clients are not started")
+        return self._archive
+
+    async def start(self) -> None:
+        """
+        Open the connection pools. Calling it again on a started instance is a no-op.
+        """
+        if self._archive is not None:
+            return
+
+        http2 = settings.HTTP2
+        if http2 and importlib.util.find_spec("h2") is None:
+            log.warning("HTTP/2 requested but the 'h2' package is not installed, using HTTP/1.1")
+            http2 = False
+
+        self._backend = self._create_httpx_client(http2)
+        self._transcription = self._create_httpx_client(http2)
+
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_MAX_CONNECTIONS,
+            limit_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_EXPIRY,
+            ssl=False,
+        )
+        self._archive = aiohttp.ClientSession(
+            connector=connector,
+            # No total timeout: large downloads are fine as long as data keeps coming
+            timeout=aiohttp.ClientTimeout(
+                total=None,
+                connect=settings.HTTP_CONNECT_TIMEOUT,
+                sock_read=settings.ARCHIVE_STALL_TIMEOUT,
+            ),
+        )
+        log.info("HTTP clients started", http2=http2)
+
+    async def close(self) -> None:
+        """
+        Close all connection pools.
+        """
+        if self._backend is not None:
+            await self._backend.aclose()
+        if self._transcription is not None:
+            await self._transcription.aclose()
+        if self._archive is not None:
+            await self._archive.close()
+
+        self._backend = None
+        self._transcription = None
+        self._archive = None
+        log.info("HTTP clients closed")
+
+    async def __aenter__(self) -> "HttpClients":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @staticmethod
+    def _create_httpx_client(http2: bool) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+
+http_clients = HttpClients()
@@ -0,0 +1,123 @@
+import asyncio
+import io
+import tempfile
+from typing import BinaryIO
+
+from src.config import settings
+
+_COPY_BLOCK_SIZE = 1024 * 1024
+
+
+class Spool:
+    """
+    Bounded in-memory buffer for chunk bytes.
+
+    Data stays in memory until it grows past `max_size` bytes, after which it is moved to a
+    temporary file in `TMP_DIR`. Disk writes are offloaded to a thread so they never block
+    the event loop. The temporary file is removed when the spool is closed.
+
+    A spool shared by several consumers is reference counted: each of them takes a reference
+    with `retain()` and closes it, and the buffer is released with the last one.
+
+    `name` and `content_type` are used when the spool is uploaded.
+    """
+
+    def __init__(
+        self, name: str, content_type: str = "audio/mpeg", max_size: int | None = None
+    ) -> None:
+        self.name = name
+        self.content_type = content_type
+        self._max_size = settings.CHUNK_SPOOL_MAX_SIZE if max_size is None else max_size
+        self._file: BinaryIO = io.BytesIO()
+        self._on_disk = False
+        self._size = 0
+        self._refs = 1
+
+    @property
+    def size(self) -> int:
+        """
+        Number of bytes written to the spool.
+        """
+        return self._size
+
+    @property
+    def closed(self) -> bool:
+        """
+        Whether every reference to the spool was closed and its buffer released.
+        """
+        return self._refs == 0
+
+    @property
+    def on_disk(self) -> bool:
+        """
+        Whether the spool has spilled over to a temporary file.
+        """
+        return self._on_disk
+
+    async def write(self, data: bytes) -> None:
+        """
+        Append data to the spool.
+        """
+        if not self._on_disk and self._size + len(data) > self._max_size:
+            await asyncio.to_thread(self._roll_over)
+
+        if self._on_disk:
+            await asyncio.to_thread(self._file.write, data)
+        else:
+            self._file.write(data)
+        self._size += len(data)
+
+    async def write_from(self, other: "Spool") -> None:
+        """
+        Append the whole content of another spool.
+        """
+        with other.open() as f:
+            if not other.on_disk:
+                await self.write(f.read())
+                return
+            while block := await asyncio.to_thread(f.read, _COPY_BLOCK_SIZE):
+                await self.write(block)
+
+    def open(self) -> BinaryIO:
+        """
+        Open an independent reader positioned at the start of the spool.
+
+        A reader of an in-memory spool reads a snapshot of its content taken when opened.
+        """
+        if self._on_disk:
+            self._file.flush()
+            return open(self._file.name, "rb")
+        return io.BytesIO(self._file.getvalue())
+
+    def retain(self) -> "Spool":
+        """
+        Take another reference to the spool, to be closed independently.
+        """
+        if self._refs == 0:
+            raise ValueError("Spool is closed")
+        self._refs += 1
+        return self
+
+    def close(self) -> None:
+        """
+        Close a reference. The last one releases the buffer and removes the temporary file,
+        if any.
+        """
+        if self._refs == 0:
+            return
+        self._refs -= 1
+        if self._refs == 0:
+            self._file.close()
+
+    def __enter__(self) -> "Spool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _roll_over(self) -> None:
+        file = tempfile.NamedTemporaryFile(dir=settings.TMP_DIR, suffix=f"-{self.name}")
+        file.write(self._file.getvalue())
+        self._file.close()
+        self._file = file
+        self._on_disk = True
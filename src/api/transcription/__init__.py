@@ -1,3 +1,4 @@
 from .client import TranscriptionClient
+from .pool import ReplicaPool, transcription_pool
 
-__all__ = ["TranscriptionClient"]
+__all__ = ["ReplicaPool", "TranscriptionClient", "transcription_pool"]
@@ -1,64 +1,128 @@
-from pathlib import Path
+import asyncio
+import time
 
-import httpx
-
-from src import log
-from src.api.base_client import BaseClient
+from src import log, metrics
+from src.api.spool import Spool
+from src.api.transcription.pool import (
+    Replica,
+    ReplicaPool,
+    is_replica_failure,
+    transcription_pool,
+)
 from src.api.transcription.schemas import TranscriptionResult
 from src.config import settings
 
 
-class TranscriptionClient(BaseClient):
-    def __init__(self):
-        super().__init__(
-            settings.TRANSCRIPTION_BASE_URL,
-            {
-                "username": settings.TRANSCRIPTION_USERNAME,
-                "password": settings.TRANSCRIPTION_PASSWORD,
-            },
-        )
-
-    async def login(self) -> None:
-        """
-        Login to the transcription service.
-        """
-        endpoint = f"{self._base_url}/auth/login"
+class TranscriptionClient:
+    """
+    Client for the transcription service, routing each request to a replica of the pool.
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(endpoint, json=self._credentials)
-            response.raise_for_status()
-            data = response.json()
+    With `TRANSCRIPTION_HEDGE` enabled, a request still running after the p95 latency of its
+    replica is sent to a second replica as well, and the first answer wins.
+    """
 
-        token = data["access_token"]
-        self._headers["Authorization"] = f"Bearer {token}"
+    def __init__(self, pool: ReplicaPool | None = None):
+        self._pool = pool or transcription_pool
 
     async def transcribe(
         self,
-        audio_file_path: str | Path,
+        audio: Spool,
         language: str = "en",
         result_format: str = "full",
         model: str = "turbo",
+        words: bool = True,
+        duration: float = 0.0,
     ) -> TranscriptionResult:
         """
-        Transcribe an audio file using the transcription service.
+        Transcribe audio held in a spool using the transcription service.
+        Word timings are only requested with `words`.
+        `duration` is the length of the audio in seconds, used to compare replica latencies.
+        A request failing because of its replica is retried once on another replica.
         """
-        if "Authorization" not in self._headers:
-            await self.login()
+        args = (audio, language, result_format, model, words, duration)
+        primary = self._pool.pick()
+        try:
+            return await self._send(primary, *args)
+        except Exception as e:
+            fallback = self._pool.pick(exclude=primary) if is_replica_failure(e) else None
+            if fallback is None:
+                raise
+            log.warning(
+                "Transcription replica failed, retrying on another one",
+                replica=primary.base_url,
+                fallback=fallback.base_url,
+                error=str(e),
+            )
+        return await self._transcribe(fallback, *args)
+
+    async def _send(self, primary: Replica, *args) -> TranscriptionResult:
+        delay = self._hedge_delay(primary, args[-1])
+        if delay is None:
+            return await self._transcribe(primary, *args)
 
-        endpoint = f"{self._base_url}/transcription/transcribe"
+        request = asyncio.create_task(self._transcribe(primary, *args))
+        try:
+            done, _ = await asyncio.wait({request}, timeout=delay)
+        except asyncio.CancelledError:
+            request.cancel()
+            raise
+        secondary = None if done else self._pool.pick(exclude=primary)
+        if secondary is None:
+            return await request
 
-        audio_path = Path(audio_file_path)
-        files = {
-            "file": (audio_path.name, open(audio_path, "rb"), "audio/mpeg"),
-        }
-        data = {
-            "language": language,
-            "result_format": result_format,
-            "model": model,
-            "align_mode": True,
-            "audio_preprocessing": False,
-        }
+        metrics.hedged_requests.inc()
+        log.debug(
+            "Hedging transcription request",
+            primary=primary.base_url,
+            secondary=secondary.base_url,
+            delay=round(delay, 3),
+            sampled=True,
+        )
+        hedge = asyncio.create_task(self._transcribe(secondary, *args))
+        return await self._first_success([request, hedge])
+
+    def _hedge_delay(self, replica: Replica, duration: float) -> float | None:
+        if not settings.TRANSCRIPTION_HEDGE or len(self._pool.replicas) < 2:
+            return None
+        p95 = replica.p95()
+        return p95 * max(duration, 1.0) if p95 is not None else None
+
+    @staticmethod
+    async def _first_success(requests: list[asyncio.Task]) -> TranscriptionResult:
+        """
+        Returns the first successful result and cancels the other requests. If all of them
+        fail, the error of the first request is raised.
+        """
+        pending = set(requests)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return requests[0].result()
+        finally:
+            for task in pending:
+                task.cancel()
 
-        response = await self._post(endpoint=endpoint, files=files, data=data)
-        result = TranscriptionResult.model_validate(response.json())
+    @staticmethod
+    async def _transcribe(
+        replica: Replica,
+        audio: Spool,
+        language: str,
+        result_format: str,
+        model: str,
+        words: bool,
+        duration: float,
+    ) -> TranscriptionResult:
+        replica.started()
+        started = time.perf_counter()
+        try:
+            result = await replica.client.transcribe(
+                audio, language=language, result_format=result_format, model=model, words=words
+            )
+        except BaseException as e:
+            replica.failed(e if isinstance(e, Exception) else None)
+            raise
+        replica.succeeded(time.perf_counter() - started, duration)
         return result
@@ -0,0 +1,226 @@
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import Iterable
+
+import httpx
+from pydantic import ValidationError
+
+from src import log, metrics
+from src.api.http import http_clients
+from src.api.transcription.replica import ReplicaClient
+from src.config import settings
+
+# Weight of the latest request in the moving average of a replica latency
+_EWMA_ALPHA = 0.2
+# Latencies kept per replica to estimate its p95
+_LATENCY_WINDOW = 100
+# Latencies needed before a replica p95 is trusted for hedging
+_MIN_HEDGE_SAMPLES = 20
+# Statuses meaning the replica itself is unavailable. A plain 500 is how the service reports
+# a chunk it cannot transcribe and says nothing about the health of the replica.
+_REPLICA_FAILURE_STATUSES = frozenset({502, 503, 504})
+
+
+def is_replica_failure(error: BaseException) -> bool:
+    """
+    Whether a request failed because of the replica rather than because of the request.
+    A response that is not a valid transcription, e.g. a truncated body, is the replica's.
+    """
+    if isinstance(error, httpx.TransportError | ValidationError):
+        return True
+    return (
+        isinstance(error, httpx.HTTPStatusError)
+        and error.response.status_code in _REPLICA_FAILURE_STATUSES
+    )
+
+
+class Replica:
+    """
+    One transcription service endpoint with its load, latency and circuit breaker state.
+
+    Latencies are tracked in seconds per second of audio, so that requests of different
+    durations are comparable.
+    """
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url
+        self.outstanding = 0
+        self.healthy = True
+        self._client: ReplicaClient | None = None
+        self._latency: float | None = None
+        self._latencies: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._failures = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    @property
+    def client(self) -> ReplicaClient:
+        # Created on first use, once the HTTP clients are started
+        if self._client is None:
+            self._client = ReplicaClient(self.base_url)
+        return self._client
+
+    @property
+    def latency(self) -> float | None:
+        """
+        Moving average of the latency per second of audio, None until a request succeeded.
+        """
+        return self._latency
+
+    @property
+    def circuit_open(self) -> bool:
+        return self._failures >= settings.TRANSCRIPTION_BREAKER_THRESHOLD
+
+    def available(self, now: float) -> bool:
+        """
+        Whether a request may be sent: the breaker is closed, or its cooldown is over and no
+        trial request is in flight yet (half-open).
+        """
+        if not self.circuit_open:
+            return True
+        return now >= self._open_until and not self._probing
+
+    def p95(self) -> float | None:
+        """
+        95th percentile of the recent latencies per second of audio, None with too few samples.
+        """
+        if len(self._latencies) < _MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+    def started(self) -> None:
+        if self.circuit_open:
+            self._probing = True
+        self.outstanding += 1
+
+    def succeeded(self, elapsed: float, duration: float) -> None:
+        self.outstanding -= 1
+        ratio = elapsed / max(duration, 1.0)
+        self._latencies.append(ratio)
+        if self._latency is None:
+            self._latency = ratio
+        else:
+            self._latency += _EWMA_ALPHA * (ratio - self._latency)
+        if self.circuit_open:
+            log.info("Transcription replica recovered", replica=self.base_url)
+        self._failures = 0
+        self._probing = False
+
+    def failed(self, error: BaseException | None) -> None:
+        """
+        Record the end of a failed or cancelled request. Only failures of the replica count
+        towards the circuit breaker.
+        """
+        self.outstanding -= 1
+        probing, self._probing = self._probing, False
+        if error is None or not is_replica_failure(error):
+            return
+        metrics.replica_failures.labels(self.base_url).inc()
+        self._failures += 1
+        # Requests started before the circuit opened do not extend the cooldown
+        if probing or self._failures == settings.TRANSCRIPTION_BREAKER_THRESHOLD:
+            self._open_until = time.monotonic() + settings.TRANSCRIPTION_BREAKER_COOLDOWN
+            log.warning(
+                "Transcription replica circuit open",
+                replica=self.base_url,
+                failures=self._failures,
+                error=str(error),
+            )
+
+
+class ReplicaPool:
+    """
+    Set of transcription service replicas requests are balanced across.
+
+    Each request goes to the available replica with the lowest expected wait: its outstanding
+    requests times its average latency. Replicas failing `TRANSCRIPTION_BREAKER_THRESHOLD`
+    requests in a row are skipped for `TRANSCRIPTION_BREAKER_COOLDOWN` seconds, then get
+    a single trial request. Replicas failing their health check are used only when no
+    healthy one is left.
+    """
+
+    def __init__(self, base_urls: Iterable[str]) -> None:
+        self.replicas = [Replica(url) for url in base_urls]
+        if not self.replicas:
+            raise ValueError("At least one transcription replica is required")
+        self._health_task: asyncio.Task | None = None
+        for replica in self.replicas:
+            metrics.replica_outstanding.labels(replica.base_url).set_function(
+                lambda replica=replica: replica.outstanding
+            )
+            metrics.replica_circuit_open.labels(replica.base_url).set_function(
+                lambda replica=replica: float(replica.circuit_open)
+            )
+
+    async def start(self) -> None:
+        """
+        Start the health checks. Disabled when `TRANSCRIPTION_HEALTH_PATH` is empty.
+        """
+        if self._health_task is not None or not settings.TRANSCRIPTION_HEALTH_PATH:
+            return
+        self._health_task = asyncio.create_task(self._check_health())
+
+    async def close(self) -> None:
+        if self._health_task is None:
+            return
+        self._health_task.cancel()
+        await asyncio.gather(self._health_task, return_exceptions=True)
+        self._health_task = None
+
+    async def __aenter__(self) -> "ReplicaPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def pick(self, exclude: Replica | None = None) -> Replica | None:
+        """
+        Choose the replica for the next request, other than `exclude`. Falls back to replicas
+        with an open circuit when every other one is unavailable, so requests fail fast
+        instead of waiting. Returns None if there is no other replica.
+        """
+        candidates = [replica for replica in self.replicas if replica is not exclude]
+        if not candidates:
+            return None
+        now = time.monotonic()
+        available = [replica for replica in candidates if replica.available(now)]
+        healthy = [replica for replica in available if replica.healthy]
+        # Replicas without latency yet are assumed as fast as the fastest one, to get probed
+        known = [replica.latency for replica in self.replicas if replica.latency is not None]
+        default = min(known, default=1.0)
+
+        def expected_wait(replica: Replica) -> float:
+            latency = replica.latency if replica.latency is not None else default
+            return (replica.outstanding + 1) * latency
+
+        return min(healthy or available or candidates, key=expected_wait)
+
+    async def _check_health(self) -> None:
+        while True:
+            await asyncio.gather(*(self._check_replica(replica) for replica in self.replicas))
+            await asyncio.sleep(settings.TRANSCRIPTION_HEALTH_INTERVAL)
+
+    async def _check_replica(self, replica: Replica) -> None:
+        # Any answer but a gateway error means the replica is up
+        try:
+            response = await http_clients.transcription.get(
+                f"{replica.base_url}{settings.TRANSCRIPTION_HEALTH_PATH}",
+                timeout=settings.HTTP_CONNECT_TIMEOUT,
+            )
+            healthy = response.status_code not in _REPLICA_FAILURE_STATUSES
+        except httpx.HTTPError:
+            healthy = False
+        if healthy and not replica.healthy:
+            log.info("Transcription replica healthy again", replica=replica.base_url)
+        elif not healthy and replica.healthy:
+            log.warning("Transcription replica failed its health check", replica=replica.base_url)
+        replica.healthy = healthy
+
+
+transcription_pool = ReplicaPool(
+    url.strip().rstrip("/") for url in settings.TRANSCRIPTION_BASE_URL.split(",") if url.strip()
+)
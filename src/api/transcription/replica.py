@@ -0,0 +1,82 @@
+from src.api.auth import get_token_manager
+from src.api.base_client import BaseClient
+from src.api.http import http_clients
+from src.api.spool import Spool
+from src.api.transcription.schemas import TranscriptionResult
+from src.config import settings
+
+
+class ReplicaClient(BaseClient):
+    """
+    Client of a single transcription service replica.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(
+            base_url,
+            {
+                "username": settings.TRANSCRIPTION_USERNAME,
+                "password": settings.TRANSCRIPTION_PASSWORD,
+            },
+            http_clients.transcription,
+        )
+        self._tokens = get_token_manager(
+            self._base_url, self._credentials["username"], self._request_token
+        )
+        self._token: str | None = None
+
+    async def login(self) -> None:
+        """
+        Replace the token rejected by the transcription service. Concurrent logins of all
+        clients of the account are coalesced into one.
+        """
+        self._set_token(await self._tokens.refresh(self._token))
+
+    async def _authenticate(self) -> None:
+        self._set_token(await self._tokens.get_token())
+
+    def _set_token(self, token: str) -> None:
+        self._token = token
+        self._headers["Authorization"] = f"Bearer {token}"
+
+    async def _request_token(self) -> dict:
+        """
+        Login to the transcription service.
+        """
+        endpoint = f"{self._base_url}/auth/login"
+
+        response = await self._client.post(endpoint, json=self._credentials)
+        response.raise_for_status()
+        return response.json()
+
+    async def transcribe(
+        self,
+        audio: Spool,
+        language: str = "en",
+        result_format: str = "full",
+        model: str = "turbo",
+        words: bool = True,
+    ) -> TranscriptionResult:
+        """
+        Transcribe audio held in a spool using the transcription service. Without `words`,
+        alignment is not requested and the response carries segments only.
+        """
+        await self._authenticate()
+
+        endpoint = f"{self._base_url}/transcription/transcribe"
+
+        data = {
+            "language": language,
+            "result_format": result_format,
+            "model": model,
+            "align_mode": words,
+            "audio_preprocessing": False,
+        }
+
+        with audio.open() as f:
+            files = {
+                "file": (audio.name, f, audio.content_type),
+            }
+            response = await self._post(endpoint=endpoint, files=files, data=data)
+        # Validated straight from the body, without an intermediate dict tree
+        return TranscriptionResult.model_validate_json(response.content)
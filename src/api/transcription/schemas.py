@@ -1,4 +1,8 @@
-from pydantic import BaseModel
+from array import array
+from collections.abc import Iterable
+from typing import Annotated, Any
+
+from pydantic import BaseModel, PlainValidator
 
 
 class Segment(BaseModel):
@@ -8,13 +12,74 @@ class Segment(BaseModel):
     text: str
 
 
-class WordSegment(BaseModel):
-    word: str
-    start: float
-    end: float
-    score: float
+class WordTimings:
+    """
+    Word timings of a transcription as parallel arrays, one entry per word, instead of
+    an object per word: a long window has tens of thousands of words.
+    """
+
+    __slots__ = ("words", "starts", "ends", "scores")
+
+    def __init__(self) -> None:
+        self.words: list[str] = []
+        self.starts = array("d")
+        self.ends = array("d")
+        self.scores = array("d")
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def append(self, word: str, start: float, end: float, score: float) -> None:
+        self.words.append(word)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.scores.append(score)
+
+    def shift(self, offset: float) -> None:
+        """
+        Add `offset` to the timings of every word.
+        """
+        self.starts = array("d", [t + offset for t in self.starts])
+        self.ends = array("d", [t + offset for t in self.ends])
+
+    def reorder(self, order: Iterable[int]) -> None:
+        """
+        Rearrange the words in the order of their indexes in `order`.
+        """
+        order = list(order)
+        self.words = [self.words[i] for i in order]
+        self.starts = array("d", [self.starts[i] for i in order])
+        self.ends = array("d", [self.ends[i] for i in order])
+        self.scores = array("d", [self.scores[i] for i in order])
+
+    @classmethod
+    def validate(cls, value: Any) -> "WordTimings":
+        """
+        Builds the timings from the word list of a transcription response. Words the
+        service could not align, e.g. numbers, have no timings and are skipped. A malformed
+        list raises ValueError, reported by pydantic as a validation error.
+        """
+        if isinstance(value, cls):
+            return value
+        if not isinstance(value, list):
+            raise ValueError("words must be a list")
+        timings = cls()
+        for item in value:
+            if not isinstance(item, dict):
+                raise ValueError("word must be an object")
+            word = item.get("word")
+            if not isinstance(word, str):
+                raise ValueError("word must have a string 'word'")
+            start, end = item.get("start"), item.get("end")
+            if start is None or end is None:
+                continue
+            try:
+                timings.append(word, float(start), float(end), float(item.get("score") or 0))
+            except TypeError:
+                raise ValueError("word timings must be numbers") from None
+        return timings
 
 
 class TranscriptionResult(BaseModel):
     segments: list[Segment]
-    words: list[WordSegment] | None = None
+    words: Annotated[WordTimings, PlainValidator(WordTimings.validate)] | None = None
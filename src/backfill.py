@@ -0,0 +1,269 @@
+"""
+Historical backfill: re-transcribes a time range of a source from the archive.
+
+The range is split into overlapping archive windows that are downloaded and transcribed
+concurrently, like catch-up mode, and their segments are stitched in order and delivered
+to the backend. Runs next to the service and does not touch its checkpoints.
+
+Usage:
+    python -m src.backfill --source-id 12 --start 2024-05-01T10:00 --end 2024-05-01T12:00
+    python -m src.backfill --url https://host/channel/index.m3u8 --language ru \\
+        --start 1714557600 --end 1714564800
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+from src import log
+from src.api.backend import BackendClient
+from src.api.backend.schemas import Source
+from src.api.http import http_clients
+from src.api.transcription import transcription_pool
+from src.api.transcription.schemas import Segment
+from src.config import settings
+from src.logging import configure as configure_logging
+from src.source_processing.scheduler import transcription_scheduler
+from src.source_processing.service import SourceProcessing
+from src.source_processing.stitching import TranscribedWindow
+
+# Delivery attempts per window before giving up on it
+_DELIVERY_ATTEMPTS = 3
+
+
+def parse_time(value: str) -> int:
+    """
+    Parses a Unix timestamp or an ISO 8601 date, UTC unless it has an offset.
+    """
+    if value.isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--source-id", type=int, help="source to backfill, loaded from the backend")
+    parser.add_argument("--url", help="source URL, overrides the URL of --source-id")
+    parser.add_argument("--language", help="source language, overrides the one of --source-id")
+    parser.add_argument("--start", type=parse_time, required=True, help="Unix time or ISO date")
+    parser.add_argument("--end", type=parse_time, required=True, help="Unix time or ISO date")
+    parser.add_argument(
+        "--window",
+        type=int,
+        help="archive window length, seconds; chunk duration x CATCHUP_WINDOW_FACTOR by default",
+    )
+    parser.add_argument("--overlap", type=int, default=settings.CATCHUP_OVERLAP)
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        default=settings.CATCHUP_PARALLELISM,
+        help="windows downloaded and transcribed at once",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.TRANSCRIPTION_CONCURRENCY,
+        help="transcription requests in flight",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print transcriptions as JSON lines instead of sending them to the backend, "
+        "implied without --source-id",
+    )
+    args = parser.parse_args()
+
+    if args.source_id is None and not (args.url and args.language):
+        parser.error("either --source-id or both --url and --language are required")
+    if args.source_id is None:
+        args.dry_run = True
+    if args.end <= args.start:
+        parser.error("--end must be after --start")
+    return args
+
+
+async def load_source(args: argparse.Namespace) -> Source:
+    """
+    Returns the source to backfill: from the backend if a source id is given, with the URL
+    and the language overridden by the arguments.
+    """
+    overrides = {
+        name: value
+        for name, value in (("url", args.url), ("language", args.language))
+        if value is not None
+    }
+    if args.source_id is None:
+        return Source(
+            id=0, name="backfill", disabled=False, chunk_duration=args.window or 60, **overrides
+        )
+
+    sources = await BackendClient().get_sources()
+    for source in sources.sources:
+        if source.id == args.source_id:
+            return source.model_copy(update=overrides)
+    raise SystemExit(f"Source {args.source_id} not found")
+
+
+class Backfill:
+    """
+    Transcribes the windows of a time range with bounded parallelism and delivers their
+    segments in order. Each window is cut and continues the previous one as in the stitch
+    stage of catch-up mode.
+    """
+
+    def __init__(
+        self,
+        source: Source,
+        start: int,
+        end: int,
+        window: int,
+        overlap: int,
+        parallelism: int,
+        dry_run: bool,
+    ) -> None:
+        self._processor = SourceProcessing(source)
+        self._source = source
+        self._start = start
+        self._end = end
+        self._window = window
+        self._overlap = overlap
+        self._parallelism = parallelism
+        self._dry_run = dry_run
+        self._backend_client = None if dry_run else BackendClient()
+        self.windows = 0
+        self.failed = 0
+        self.segments = 0
+        # Seconds of the range covered by windows that were transcribed
+        self.audio_seconds = 0
+
+    def get_windows(self) -> list[tuple[int, int]]:
+        """
+        Returns the (start, duration) of the archive windows covering the range. Each window
+        but the first starts `overlap` seconds before the end of the previous one.
+        """
+        windows = []
+        for start in range(self._start, self._end, self._window):
+            actual_start = max(self._start, start - self._overlap)
+            windows.append((actual_start, min(start + self._window, self._end) - actual_start))
+        return windows
+
+    async def run(self) -> None:
+        windows = self.get_windows()
+        in_flight: asyncio.Queue[asyncio.Task[TranscribedWindow | None]] = asyncio.Queue()
+        # Windows downloaded or transcribed and not yet stitched
+        slots = asyncio.Semaphore(self._parallelism)
+
+        async def submit() -> None:
+            for start, duration in windows:
+                await slots.acquire()
+                task = asyncio.create_task(
+                    self._processor.transcribe_archive_window(start, duration)
+                )
+                await in_flight.put(task)
+
+        submitter = asyncio.create_task(submit())
+        try:
+            committed: float = self._start
+            covered = self._start
+            for start, duration in windows:
+                task = await in_flight.get()
+                window = await task
+                slots.release()
+                self.windows += 1
+                if window is not None:
+                    self.audio_seconds += start + duration - max(start, covered)
+                covered = start + duration
+                committed = await self._stitch(start, duration, window, committed)
+                log.info(
+                    "Backfill window done",
+                    source_id=self._source.id,
+                    start=start,
+                    done=self.windows,
+                    total=len(windows),
+                )
+            await submitter
+        finally:
+            submitter.cancel()
+            while not in_flight.empty():
+                in_flight.get_nowait().cancel()
+
+    async def _stitch(
+        self, start: int, duration: int, window: TranscribedWindow | None, committed: float
+    ) -> float:
+        """
+        Delivers the segments of a window not covered by the previous one and returns
+        the position covered so far.
+        """
+        if window is None:
+            self.failed += 1
+            log.warning("Backfill window skipped", source_id=self._source.id, start=start)
+            return start + duration
+
+        # The last window is not continued by another one
+        cut = window.cut_point(committed) if window.end < self._end else window.end
+        segments = window.take(committed, cut)
+        if segments:
+            await self._deliver(segments)
+            self.segments += len(segments)
+        return cut
+
+    async def _deliver(self, segments: list[Segment]) -> None:
+        transcription = SourceProcessing.to_transcription(segments)
+        if self._dry_run:
+            for item in transcription.transcriptions:
+                print(json.dumps(item.model_dump(), ensure_ascii=False), flush=True)
+            return
+
+        for attempt in range(1, _DELIVERY_ATTEMPTS + 1):
+            try:
+                await self._backend_client.send_transcription_result(self._source.id, transcription)
+                return
+            except Exception as e:
+                if attempt == _DELIVERY_ATTEMPTS:
+                    raise
+                log.warning("Backfill delivery failed, retrying", error=str(e), attempt=attempt)
+                await asyncio.sleep(2**attempt)
+
+
+async def main() -> None:
+    args = parse_args()
+    transcription_scheduler.concurrency = args.concurrency
+
+    async with http_clients, transcription_pool:
+        source = await load_source(args)
+        backfill = Backfill(
+            source,
+            args.start,
+            args.end,
+            args.window or source.chunk_duration * settings.CATCHUP_WINDOW_FACTOR,
+            args.overlap,
+            args.parallelism,
+            args.dry_run,
+        )
+        log.info(
+            "Starting backfill",
+            source_id=source.id,
+            url=source.url,
+            language=source.language,
+            start=args.start,
+            end=args.end,
+        )
+        started = time.perf_counter()
+        await backfill.run()
+        elapsed = time.perf_counter() - started
+
+    print(f"windows:                  {backfill.windows} ({backfill.failed} failed)")
+    print(f"segments delivered:       {backfill.segments}")
+    print(f"audio seconds:            {backfill.audio_seconds} of {args.end - args.start}")
+    print(f"elapsed:                  {elapsed:.2f} s")
+    print(f"audio seconds per second: {backfill.audio_seconds / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    configure_logging()
+    asyncio.run(main())
@@ -1,3 +1,6 @@
+import socket
+
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,18 +11,111 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(env_file=".env")
 
-    LOG_LEVEL: str = "DEBUG"  # DEBUG | INFO | WARNING | ERROR | CRITICAL
+    LOG_LEVEL: str = "INFO"  # DEBUG | INFO | WARNING | ERROR | CRITICAL
+    LOG_SAMPLE_INTERVAL: float = 1.0  # Min seconds between repeated per-chunk events, 0 logs all
+    LOG_QUEUE_SIZE: int = 10000  # Records queued for the logging thread before dropping new ones
     ENV: str = "dev"  # dev | prod
     TMP_DIR: str = "/tmp"  # Temporary directory
 
     # Transcription API
-    TRANSCRIPTION_BASE_URL: str
+    TRANSCRIPTION_BASE_URL: str  # Comma-separated replicas, requests are balanced across them
     TRANSCRIPTION_USERNAME: str
     TRANSCRIPTION_PASSWORD: str
+    TOKEN_REFRESH_MARGIN: float = 60.0  # Refresh tokens this long before they expire, seconds
+    TRANSCRIPTION_HEALTH_PATH: str = "/health"  # Replica health check endpoint, empty disables
+    TRANSCRIPTION_HEALTH_INTERVAL: float = 10.0  # Seconds between replica health checks
+    TRANSCRIPTION_BREAKER_THRESHOLD: int = 3  # Consecutive replica failures opening its circuit
+    TRANSCRIPTION_BREAKER_COOLDOWN: float = 30.0  # Time before retrying an open replica, seconds
+    TRANSCRIPTION_HEDGE: bool = False  # Resend requests slower than the replica p95 to another
 
     # Backend API
     BACKEND_BASE_URL: str
     BACKEND_API_KEY: str
 
+    # HTTP clients
+    HTTP_TIMEOUT: float = 60.0  # Read/write/pool timeout for API requests, seconds
+    HTTP_CONNECT_TIMEOUT: float = 10.0  # Connection timeout, seconds
+    HTTP_MAX_CONNECTIONS: int = 100  # Total archive connections
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 20  # Connections per upstream host
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Idle keep-alive connection lifetime, seconds
+    HTTP2: bool = False  # Requires the `h2` package
+    ARCHIVE_STALL_TIMEOUT: float = 15.0  # Max wait for data during an archive download, seconds
+    ARCHIVE_MAX_RESUMES: int = 3  # Range requests resuming an interrupted archive download
+    ARCHIVE_PARALLEL_RANGES: int = 1  # Byte ranges of large chunks fetched concurrently
+    ARCHIVE_PARALLEL_MIN_SIZE: int = 16 * 1024 * 1024  # Min chunk size fetched in ranges, bytes
+    CHUNK_SPOOL_MAX_SIZE: int = 64 * 1024 * 1024  # Bytes kept in memory per chunk before TMP_DIR
+
+    # Source polling
+    SOURCES_POLL_MIN_INTERVAL: float = 10.0  # Poll interval after the sources changed, seconds
+    SOURCES_POLL_MAX_INTERVAL: float = 60.0  # Poll interval while sources are unchanged, seconds
+    SOURCES_POLL_BACKOFF: float = 1.5  # Interval growth factor per unchanged poll
+
+    # Source processing
+    PIPELINE_QUEUE_SIZE: int = 2  # Max chunks buffered between pipeline stages of a source
+    CHUNK_JITTER: float = 0.5  # Share of the chunk period source start offsets are spread over
+    TRANSCRIPTION_CONCURRENCY: int = 4  # Max transcription requests in flight across all sources
+    TRANSCRIPTION_QUEUE_SIZE: int = 100  # Max transcription requests waiting for a slot
+    STAGE_RESTART_DELAY: float = 1.0  # Delay before restarting a failed pipeline stage, seconds
+    STAGE_RESTART_MAX_DELAY: float = 60.0  # Max restart delay of a stage that keeps failing
+    AUDIO_DEMUX_ENABLED: bool = True  # Upload only the audio elementary stream of chunks
+    HLS_LIVE_ENABLED: bool = False  # Follow .m3u8 sources at the live edge instead of the archive
+    CHUNK_CACHE_ENABLED: bool = True  # Download each window once for sources of the same stream
+    TRANSCRIPTION_RESULT_CACHE_SIZE: int = 256  # Results reused by sources of a stream, 0 disables
+
+    # Chunk stitching: windows are cut at a pause between words and the next one continues from it
+    STITCH_WORD_TIMINGS: bool = True  # Request word alignment, else cut after whole segments
+    STITCH_WORD_MARGIN: float = 1.0  # Words ending this close to the window end may be cut, seconds
+    STITCH_MIN_PAUSE: float = 0.3  # Pause between words preferred as a cut point, seconds
+    STITCH_MIN_WORD_SCORE: float = 0.5  # Min alignment score of the last word before a cut
+
+    # Chunk inspection: downloaded chunks judged dead are not transcribed
+    TS_INSPECTION_ENABLED: bool = True  # Check MPEG-TS chunks before transcribing them
+    TS_MIN_AUDIO_BYTES_PER_SECOND: int = 1000  # Less audio stream data means silence or no audio
+    TS_MIN_TIMELINE_RATIO: float = 0.5  # Min PCR/PTS progression per second of chunk
+    TS_MAX_CC_ERROR_RATIO: float = 0.05  # Max share of audio and table packets with CC errors
+    STATE_DB_PATH: str = "data/state.db"  # SQLite database with source checkpoints
+    STATE_DB_BUSY_TIMEOUT: float = 30.0  # Wait for workers holding the database lock, seconds
+    CHECKPOINT_MAX_LOOKBACK: int = 3600  # Max archive backlog to catch up after a restart, seconds
+
+    # Catch-up mode
+    CATCHUP_LAG_THRESHOLD: int = 300  # Lag behind real time that enables catch-up mode, seconds
+    CATCHUP_WINDOW_FACTOR: int = 4  # Catch-up window length in chunks
+    CATCHUP_PARALLELISM: int = 3  # Catch-up windows transcribed concurrently per source
+    CATCHUP_OVERLAP: int = 30  # Overlap between consecutive catch-up windows, seconds
+    CATCHUP_TOLERANCE: float = 1.0  # Slack when dropping segments already covered, seconds
+
+    # Excluded phrases: a JSON list, or an object mapping languages (or "*") to lists
+    EXCLUDED_PHRASES_FILE: str = ""  # Local file to load phrases from
+    EXCLUDED_PHRASES_ENDPOINT: str = ""  # Backend endpoint to load phrases from, e.g. /phrases
+    EXCLUDED_PHRASES_RELOAD_INTERVAL: float = 60.0  # Seconds between reload checks
+
+    # Sharding: sources are split between workers sharing the state database
+    WORKERS: int = 1  # Worker processes spawned by the supervisor, 1 runs in a single process
+    SHARDING: bool = False  # Process only the sources leased by this worker
+    WORKER_ID: str = Field(default_factory=socket.gethostname)  # Unique and stable per worker
+    LEASE_TTL: float = 30.0  # Time after which leases of a silent worker expire, seconds
+    LEASE_RENEW_INTERVAL: float = 10.0  # Heartbeat and rebalancing interval, seconds
+
+    # Metrics
+    METRICS_HOST: str = "0.0.0.0"  # Interface of the Prometheus metrics endpoint
+    METRICS_PORT: int = 9100  # Port of the Prometheus metrics endpoint, 0 disables it
+
+    # Diagnostics
+    LOOP_MONITOR_INTERVAL: float = 0.5  # Event loop lag probe interval, seconds, 0 disables it
+    LOOP_BLOCK_THRESHOLD: float = 0.25  # Lag logged as a blocked loop with its stack, seconds
+    DIAGNOSTICS_DIR: str = "data/diagnostics"  # Where profiles and task snapshots are written
+    PROFILE_DURATION: float = 10.0  # Length of on-demand stack sampling profiles, seconds
+    PROFILE_MAX_DURATION: float = 60.0  # Longest profile a snapshot request may ask for, seconds
+    PROFILE_INTERVAL: float = 0.005  # Stack sampling interval of profiles, seconds
+    DIAGNOSTICS_ENDPOINT: bool = False  # Serve POST /debug/snapshot on the metrics port
+
+    # Backend delivery
+    DELIVERY_JOURNAL_DIR: str = "data/delivery"  # Journal of undelivered transcription batches
+    DELIVERY_BATCH_SIZE: int = 50  # Results per batch
+    DELIVERY_FLUSH_INTERVAL: float = 1.0  # Max time a result waits for its batch, seconds
+    DELIVERY_MAX_BACKOFF: float = 300.0  # Max delay between delivery retries, seconds
+    DELIVERY_JOURNAL_COMPACT_SIZE: int = 16 * 1024 * 1024  # Journal size to compact at, bytes
+    DELIVERY_DRAIN_TIMEOUT: float = 10.0  # Time to deliver what is left on shutdown, seconds
+
 
 settings = Settings()
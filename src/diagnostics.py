@@ -0,0 +1,255 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from collections.abc import Coroutine
+from datetime import datetime, timezone
+from types import FrameType
+
+from aiohttp import web
+
+from src import log, metrics
+from src.config import settings
+
+# Frames of a blocking callback logged, innermost last
+_LOGGED_FRAMES = 15
+# Names of source tasks: "source-<id>" for the source, "source-<id>-<stage>" for its stages
+_SOURCE_TASK_NAME = re.compile(r"source-(\d+)(?:-(.+))?")
+
+
+def _describe_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _walk(frame: FrameType | None) -> list[FrameType]:
+    """
+    Returns the frames of a thread stack, outermost first.
+    """
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _describe_task(task: asyncio.Task | None) -> dict:
+    if task is None:
+        return {"task": None, "coroutine": None}
+    coroutine = task.get_coro()
+    name = getattr(coroutine, "__qualname__", type(coroutine).__name__)
+    return {"task": task.get_name(), "coroutine": name}
+
+
+class LoopMonitor:
+    """
+    Event loop health monitor, cheap enough to keep on in production.
+
+    A watchdog thread schedules a callback on the loop every `LOOP_MONITOR_INTERVAL` seconds
+    and measures how long it takes to run, which is the lag of the loop. When the callback
+    is not run within `LOOP_BLOCK_THRESHOLD` seconds, the loop is blocked by the code running
+    at that moment: the watchdog captures its stack and task, and they are logged with the
+    duration of the block once the loop is responsive again.
+
+    The monitor also records the creation time of tasks for `snapshot_tasks()` and serves
+    diagnostic snapshots, see `write_snapshot()`.
+    """
+
+    def __init__(self, interval: float, threshold: float) -> None:
+        self._interval = interval
+        self._threshold = threshold
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._created: weakref.WeakKeyDictionary[asyncio.Task, float] = weakref.WeakKeyDictionary()
+        self._snapshot: asyncio.Task | None = None
+        self._lag = 0.0
+
+    async def start(self) -> None:
+        if self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._loop.set_task_factory(self._create_task)
+        if self._interval <= 0:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    async def close(self) -> None:
+        if self._loop is None:
+            return
+        self._stopped.set()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+        if self._snapshot is not None:
+            self._snapshot.cancel()
+        self._loop.set_task_factory(None)
+        self._loop = None
+
+    async def __aenter__(self) -> "LoopMonitor":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _create_task(
+        self, loop: asyncio.AbstractEventLoop, coro: Coroutine, **kwargs
+    ) -> asyncio.Task:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        self._created[task] = time.monotonic()
+        return task
+
+    def _watch(self) -> None:
+        """
+        Body of the watchdog thread.
+        """
+        while not self._stopped.wait(self._interval):
+            answered = threading.Event()
+            sent = time.monotonic()
+            try:
+                self._loop.call_soon_threadsafe(self._answer, sent, answered)
+            except RuntimeError:
+                # The loop is closed
+                return
+            if answered.wait(self._threshold):
+                continue
+
+            blocker = self._capture()
+            while not answered.wait(self._interval):
+                if self._stopped.is_set():
+                    return
+            self._loop.call_soon_threadsafe(self._report_block, blocker)
+
+    def _answer(self, sent: float, answered: threading.Event) -> None:
+        self._lag = time.monotonic() - sent
+        metrics.event_loop_lag_seconds.observe(self._lag)
+        answered.set()
+
+    def _capture(self) -> dict:
+        """
+        Captures the stack of the loop thread and its current task, from the watchdog thread.
+        """
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "\n".join(_describe_frame(f) for f in _walk(frame)[-_LOGGED_FRAMES:])
+        return {**_describe_task(asyncio.current_task(self._loop)), "stack": stack}
+
+    def _report_block(self, blocker: dict) -> None:
+        metrics.event_loop_blocks.inc()
+        log.warning("Event loop blocked", duration=round(self._lag, 3), **blocker)
+
+    def snapshot_tasks(self) -> list[dict]:
+        """
+        Describes every task of the loop: its name, the source and stage it runs, how long
+        it has existed and where it is suspended.
+        """
+        now = time.monotonic()
+        snapshot = []
+        for task in asyncio.all_tasks(self._loop):
+            created = self._created.get(task)
+            match = _SOURCE_TASK_NAME.fullmatch(task.get_name())
+            stack = task.get_stack()
+            snapshot.append(
+                {
+                    **_describe_task(task),
+                    "source_id": int(match[1]) if match else None,
+                    "stage": match[2] if match else None,
+                    "age": round(now - created, 3) if created is not None else None,
+                    "awaiting": _describe_frame(stack[-1]) if stack else None,
+                    "stack": [_describe_frame(frame) for frame in stack],
+                }
+            )
+        snapshot.sort(key=lambda item: (item["source_id"] is None, item["source_id"] or 0))
+        return snapshot
+
+    def profile(self, duration: float, interval: float) -> Counter[str]:
+        """
+        Samples the stack of the loop thread every `interval` seconds for `duration` seconds,
+        from the calling thread. Returns the number of samples per stack in the folded
+        format of flame graph tools, each rooted at the task running at the time.
+        """
+        samples: Counter[str] = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                task = asyncio.current_task(self._loop)
+                root = f"task:{task.get_name()}" if task is not None else "loop"
+                frames = (f"{f.f_code.co_qualname}" for f in _walk(frame))
+                samples[";".join((root, *frames))] += 1
+            time.sleep(interval)
+        return samples
+
+    async def write_snapshot(self, duration: float | None = None) -> dict[str, str]:
+        """
+        Writes the task snapshot and a stack sampling profile of `duration` seconds
+        (`PROFILE_DURATION` by default, at most `PROFILE_MAX_DURATION`) to `DIAGNOSTICS_DIR`.
+        Returns the paths of the files.
+        """
+        duration = settings.PROFILE_DURATION if duration is None else duration
+        duration = min(max(duration, 0.0), settings.PROFILE_MAX_DURATION)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        directory = settings.DIAGNOSTICS_DIR
+        tasks_path = os.path.join(directory, f"tasks-{stamp}.json")
+        profile_path = os.path.join(directory, f"profile-{stamp}.folded")
+
+        tasks = self.snapshot_tasks()
+        samples = await asyncio.to_thread(self.profile, duration, settings.PROFILE_INTERVAL)
+
+        def write() -> None:
+            os.makedirs(directory, exist_ok=True)
+            with open(tasks_path, "w") as f:
+                json.dump(tasks, f, indent=2)
+            with open(profile_path, "w") as f:
+                f.writelines(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+        await asyncio.to_thread(write)
+        log.info(
+            "Diagnostic snapshot written",
+            tasks=tasks_path,
+            profile=profile_path,
+            task_count=len(tasks),
+            samples=samples.total(),
+        )
+        return {"tasks": tasks_path, "profile": profile_path}
+
+    def request_snapshot(self) -> None:
+        """
+        Starts writing a snapshot in the background, e.g. from a signal handler.
+        """
+        if self._snapshot is not None and not self._snapshot.done():
+            log.warning("Diagnostic snapshot already in progress")
+            return
+        self._snapshot = asyncio.create_task(self.write_snapshot(), name="diagnostic-snapshot")
+
+    async def handle_snapshot(self, request: web.Request) -> web.Response:
+        """
+        Admin endpoint writing a snapshot, the profile lasts `?duration=` seconds. Only one
+        snapshot is written at a time, like with `request_snapshot()`.
+        """
+        try:
+            duration = float(request.query.get("duration", settings.PROFILE_DURATION))
+        except ValueError:
+            raise web.HTTPBadRequest(text="Invalid duration") from None
+        if self._snapshot is not None and not self._snapshot.done():
+            raise web.HTTPConflict(text="Diagnostic snapshot already in progress")
+        self._snapshot = asyncio.create_task(
+            self.write_snapshot(duration), name="diagnostic-snapshot"
+        )
+        # A disconnecting client does not cancel the profile, it is still written
+        return web.json_response(await asyncio.shield(self._snapshot))
+
+
+loop_monitor = LoopMonitor(settings.LOOP_MONITOR_INTERVAL, settings.LOOP_BLOCK_THRESHOLD)
+if settings.DIAGNOSTICS_ENDPOINT:
+    metrics.metrics_server.add_route("POST", "/debug/snapshot", loop_monitor.handle_snapshot)
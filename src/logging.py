@@ -1,5 +1,12 @@
+import atexit
+import importlib.util
+import json
 import logging
 import logging.config
+import logging.handlers
+import queue
+import time
+from collections.abc import Callable
 from typing import Any, Generic, TypeVar
 
 import structlog
@@ -15,6 +22,111 @@ def get_level() -> str:
     return settings.LOG_LEVEL
 
 
+class Lazy:
+    """
+    Log value computed only when the record is rendered, i.e. never for records that are
+    filtered out, and in the logging thread otherwise.
+
+    Usage:
+        log.debug("Response", body=Lazy(response.json))
+    """
+
+    __slots__ = ("_function",)
+
+    def __init__(self, function: Callable[[], Any]) -> None:
+        self._function = function
+
+    def __repr__(self) -> str:
+        return repr(self._function())
+
+    def __structlog__(self) -> Any:
+        return self._function()
+
+
+class Sampler:
+    """
+    Processor that rate-limits repetitive events logged with `sampled=True`.
+
+    At most one record per event is passed every `interval` seconds, whichever source logs it,
+    and the next passed record carries the number of suppressed ones. Warnings and errors
+    are never dropped.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self._interval = interval
+        self._last: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+
+    def __call__(self, logger: Any, method_name: str, event_dict: dict) -> dict:
+        if not event_dict.pop("sampled", False) or self._interval <= 0:
+            return event_dict
+        if method_name not in ("debug", "info"):
+            return event_dict
+
+        key = event_dict.get("event")
+        now = time.monotonic()
+        if now - self._last.get(key, -self._interval) < self._interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            raise structlog.DropEvent
+
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            event_dict["suppressed"] = suppressed
+        return event_dict
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that never blocks the caller: records are handed to the listener thread
+    as they are, to be formatted there, and dropped when the queue is full.
+    """
+
+    def __init__(self, queue: queue.Queue) -> None:
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the handlers of the listener
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Lazy):
+        return value.__structlog__()
+    return repr(value)
+
+
+def get_json_serializer() -> Callable[..., str]:
+    """
+    Returns the fastest available JSON serializer: `orjson`, a dependency of the service,
+    or a reused `json.JSONEncoder` where it is not installed (`json.dumps` with options builds
+    a new encoder per call). Both accept non-string keys like the standard library does.
+    """
+    if importlib.util.find_spec("orjson") is not None:
+        import orjson
+
+        def dumps(value: Any, **kwargs: Any) -> str:
+            return orjson.dumps(
+                value, default=_json_default, option=orjson.OPT_NON_STR_KEYS
+            ).decode()
+
+        return dumps
+
+    encoder = json.JSONEncoder(ensure_ascii=False, default=_json_default)
+
+    def dumps(value: Any, **kwargs: Any) -> str:
+        return encoder.encode(value)
+
+    return dumps
+
+
 class Logging(Generic[RendererType]):
     timestamper = structlog.processors.TimeStamper(fmt="iso")
     shared_processors = [
@@ -25,15 +137,21 @@ class Logging(Generic[RendererType]):
         timestamper,
         structlog.processors.UnicodeDecoder(),
         structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
     ]
 
     @classmethod
     def get_processors(cls) -> list[Any]:
         """
-        Returns the list of processors to be used by structlog.
+        Returns the list of processors to be used by structlog. Records below the log level
+        are dropped before any other processing.
         """
-        cls.shared_processors.append(structlog.processors.format_exc_info)
-        return cls.shared_processors + [structlog.stdlib.ProcessorFormatter.wrap_for_formatter]
+        return [
+            structlog.stdlib.filter_by_level,
+            Sampler(settings.LOG_SAMPLE_INTERVAL),
+            *cls.shared_processors,
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ]
 
     @classmethod
     def get_renderer(cls) -> RendererType:
@@ -44,12 +162,11 @@ class Logging(Generic[RendererType]):
         cls,
     ) -> None:
         """
-        Configures the standard library logging.
+        Configures the standard library logging. Records are queued to a background thread
+        that renders and writes them, so logging never blocks the event loop.
         """
         level = get_level()
 
-        cls.shared_processors.append(structlog.processors.format_exc_info)
-
         logging.config.dictConfig(
             {
                 "version": 1,
@@ -71,13 +188,23 @@ class Logging(Generic[RendererType]):
                         "class": "logging.StreamHandler",
                         "formatter": "myLogger",
                     },
+                    "queue": {
+                        "class": "src.logging.DroppingQueueHandler",
+                        "queue": {"()": queue.Queue, "maxsize": settings.LOG_QUEUE_SIZE},
+                        "handlers": ["default"],
+                        "respect_handler_level": True,
+                    },
                 },
                 "loggers": {
-                    "": {"handlers": ["default"], "level": level, "propagate": False},
+                    "": {"handlers": ["queue"], "level": level, "propagate": False},
                 },
             }
         )
 
+        listener = logging.getHandlerByName("queue").listener
+        listener.start()
+        atexit.register(listener.stop)
+
     @classmethod
     def configure_structlog(cls) -> None:
         structlog.configure_once(
@@ -100,7 +227,7 @@ class Production(Logging[structlog.processors.JSONRenderer]):
 
     @classmethod
     def get_renderer(cls) -> structlog.processors.JSONRenderer:
-        return structlog.processors.JSONRenderer(ensure_ascii=False)
+        return structlog.processors.JSONRenderer(serializer=get_json_serializer())
 
 
 class Development(Logging[structlog.dev.ConsoleRenderer]):
@@ -1,40 +1,157 @@
 import asyncio
+import contextlib
+import functools
+import signal
 
-from src import log
-from src.api.backend import BackendClient
+from src import log, metrics
+from src.api.backend import BackendClient, delivery_queue
+from src.api.backend.schemas import Source
+from src.api.http import http_clients
+from src.api.transcription import transcription_pool
+from src.config import settings
+from src.diagnostics import loop_monitor
+from src.logging import configure as configure_logging
+from src.sharding import lease_store, shard_ownership, supervise
+from src.source_processing.checkpoints import checkpoint_store
+from src.source_processing.phrases import phrase_filter, reload_phrases
 from src.source_processing.service import SourceProcessing
+from src.source_processing.sources import SourceDiff, SourceWatcher, diff_sources
 
 tasks = {}
+processors: dict[int, SourceProcessing] = {}
 
 
 async def main():
-    backend_client = BackendClient()
+    loop = asyncio.get_running_loop()
+    # Stops the workers of the supervisor as well, which flush and release their leases
+    loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    if settings.WORKERS > 1:
+        await supervise(settings.WORKERS)
+        return
+
+    loop.add_signal_handler(signal.SIGUSR1, loop_monitor.request_snapshot)
+    metrics.source_tasks.set_function(lambda: len(tasks))
+    async with (
+        loop_monitor,
+        metrics.metrics_server,
+        http_clients,
+        transcription_pool,
+        checkpoint_store,
+        # Leases are released after the results of the stopped sources were delivered, so that
+        # workers taking the sources over continue from where the results end
+        contextlib.AsyncExitStack() as stack,
+        delivery_queue,
+    ):
+        watcher = SourceWatcher(BackendClient())
+        background = []
+        if settings.EXCLUDED_PHRASES_FILE or settings.EXCLUDED_PHRASES_ENDPOINT:
+            background.append(
+                asyncio.create_task(reload_phrases(phrase_filter), name="phrases-reload")
+            )
+        if settings.SHARDING:
+            await stack.enter_async_context(lease_store)
+            background.append(asyncio.create_task(rebalance(watcher), name="rebalance"))
+        try:
+            await poll_sources(watcher)
+        finally:
+            for task in background:
+                task.cancel()
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*background, *tasks.values(), return_exceptions=True)
+            tasks.clear()
+            processors.clear()
+
+
+async def poll_sources(watcher: SourceWatcher):
     while True:
         try:
-            sources = await backend_client.get_sources()
+            diff = await watcher.poll()
         except Exception as e:
             log.error(f"Error fetching sources: {e}")
         else:
-            source_ids = {source.id for source in sources.sources if not source.disabled}
+            if diff:
+                reconcile(watcher.sources)
+
+        log.info(f"Sleeping for {watcher.interval:g} seconds before next check...")
+        await asyncio.sleep(watcher.interval)
+
+
+async def rebalance(watcher: SourceWatcher):
+    """
+    Renews the leases of this worker and rebalances the sources between live workers.
+    """
+    while True:
+        try:
+            if await shard_ownership.refresh(watcher.sources):
+                reconcile(watcher.sources)
+        except Exception as e:
+            log.error(f"Error refreshing source leases: {e}")
+            # Stops every source once the leases could have been taken over by other workers
+            reconcile(watcher.sources)
+        await asyncio.sleep(settings.LEASE_RENEW_INTERVAL)
+
+
+def reconcile(sources: dict[int, Source]) -> None:
+    """
+    Brings the running sources in line with `sources`, or with the owned part of them
+    in sharded mode.
+    """
+    if settings.SHARDING:
+        owned = shard_ownership.owned
+        sources = {source_id: source for source_id, source in sources.items() if source_id in owned}
+    running = {source_id: processor.source for source_id, processor in processors.items()}
+    apply_diff(diff_sources(running, list(sources.values())))
+
+
+def apply_diff(diff: SourceDiff) -> None:
+    """
+    Starts added sources, stops removed ones and reconfigures running ones in place.
+    """
+    for source in diff.added:
+        log.info(f"Starting processing for source {source.name} (ID: {source.id})")
+        start_source(source)
+
+    for source in diff.changed:
+        log.info(f"Updating processing for source {source.name} (ID: {source.id})")
+        processors[source.id].update(source)
+
+    for source_id in diff.removed:
+        log.info(f"Stopping processing for source ID: {source_id} (no longer active or removed)")
+        tasks.pop(source_id).cancel()
+        del processors[source_id]
+
+
+def start_source(source: Source) -> None:
+    processors[source.id] = SourceProcessing(source)
+    task = tasks[source.id] = asyncio.create_task(
+        processors[source.id].process(), name=f"source-{source.id}"
+    )
+    task.add_done_callback(functools.partial(on_source_done, source.id))
+
 
-            for source in sources.sources:
-                if not source.disabled and source.id not in tasks:
-                    log.info(f"Starting processing for source {source.name} (ID: {source.id})")
-                    task = asyncio.create_task(SourceProcessing(source).process())
-                    tasks[source.id] = task
+def on_source_done(source_id: int, task: asyncio.Task) -> None:
+    """
+    Restarts a source whose task failed, e.g. while restoring its checkpoint, unless it was
+    stopped or replaced in the meantime.
+    """
+    if task.cancelled() or tasks.get(source_id) is not task:
+        return
+    log.error(
+        "Source processing failed, restarting",
+        source_id=source_id,
+        exc_info=task.exception(),
+        delay=settings.STAGE_RESTART_MAX_DELAY,
+    )
 
-            for source_id, task in list(tasks.items()):
-                if source_id not in source_ids:
-                    log.info(
-                        f"Stopping processing for source ID: {source_id} "
-                        f"(no longer active or removed)"
-                    )
-                    task.cancel()
-                    del tasks[source_id]
+    def restart() -> None:
+        if tasks.get(source_id) is task:
+            start_source(processors[source_id].source)
 
-        log.info("Sleeping for 60 seconds before next check...")
-        await asyncio.sleep(60)  # Poll every 60 seconds
+    asyncio.get_running_loop().call_later(settings.STAGE_RESTART_MAX_DELAY, restart)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    configure_logging()
+    with contextlib.suppress(asyncio.CancelledError):
+        asyncio.run(main())
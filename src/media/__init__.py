@@ -0,0 +1,12 @@
+from .health import ChunkHealth, inspect_chunk
+from .ts import AudioTrack, TsDemuxer, demux_audio, extract_audio, slice_from
+
+__all__ = [
+    "AudioTrack",
+    "ChunkHealth",
+    "TsDemuxer",
+    "demux_audio",
+    "extract_audio",
+    "inspect_chunk",
+    "slice_from",
+]
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+
+from src.api.spool import Spool
+from src.config import settings
+from src.media.ts import (
+    NULL_PID,
+    PAT_PID,
+    SYNC_BYTE,
+    TS_PACKET_SIZE,
+    AudioTrack,
+    Progression,
+    TsDemuxer,
+    read_pts,
+)
+
+_READ_BLOCK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ChunkHealth:
+    """
+    Result of the inspection of an MPEG-TS chunk.
+
+    `packets` counts every packet but null packets. Continuity counters are checked on the
+    `checked_packets` of the audio stream and the tables, the streams transcription depends
+    on. `pcr_seconds` and `pts_seconds` are how far the program clock and the audio
+    timestamps advanced within the chunk, None if the chunk carries none. `audio_bytes` is
+    the size of the audio elementary stream and `track` the stream itself, None if no
+    supported audio stream was found.
+    """
+
+    packets: int
+    checked_packets: int
+    cc_errors: int
+    pcr_seconds: float | None
+    pts_seconds: float | None
+    audio_bytes: int | None
+    digest: bytes
+    track: AudioTrack | None = field(default=None, repr=False)
+
+    def dead_reason(self, duration: float, previous_digest: bytes | None) -> str | None:
+        """
+        Returns why a chunk of `duration` seconds is not worth transcribing, or None.
+        """
+        if self.packets == 0:
+            return "empty"
+        if self.digest == previous_digest:
+            return "repeated"
+        if (
+            self.audio_bytes is not None
+            and self.audio_bytes < settings.TS_MIN_AUDIO_BYTES_PER_SECOND * duration
+        ):
+            return "silent"
+        timeline = max(
+            (s for s in (self.pcr_seconds, self.pts_seconds) if s is not None), default=None
+        )
+        if timeline is not None and timeline < settings.TS_MIN_TIMELINE_RATIO * duration:
+            return "frozen"
+        if self.cc_errors > settings.TS_MAX_CC_ERROR_RATIO * self.checked_packets:
+            return "corrupt"
+        return None
+
+
+class TsInspector(TsDemuxer):
+    """
+    Streaming MPEG-TS health inspector.
+
+    Demuxes the audio elementary stream like `extract_audio` while it counts continuity
+    counter errors of the audio stream and the tables, measures the progression of the PCR
+    announced in the PMT and of the PTS of the audio stream. Packets of other streams, e.g.
+    video, are only counted, so that a chunk is read once and at little cost per packet.
+    """
+
+    def __init__(self, language: str | None = None) -> None:
+        super().__init__(language)
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._continuity: dict[int, int] = {}
+        self._packets = 0
+        self._checked_packets = 0
+        self._cc_errors = 0
+        self._pcr = Progression()
+        self._pts = Progression()
+
+    def feed(self, data: bytes) -> None:
+        """
+        Inspect and demux the next block of the transport stream.
+        """
+        self._hash.update(data)
+        buffer = memoryview(self._remainder + data if self._remainder else data)
+        offset = 0
+        size = len(buffer)
+        packets = 0
+        audio_pid = self.audio.pid if self.audio is not None else None
+        pcr_pid = self.pcr_pid
+        program_pids = self.program_pids
+
+        while offset + TS_PACKET_SIZE <= size:
+            if buffer[offset] != SYNC_BYTE:
+                offset += 1
+                continue
+            pid = ((buffer[offset + 1] & 0x1F) << 8) | buffer[offset + 2]
+            if pid == NULL_PID:
+                offset += TS_PACKET_SIZE
+                continue
+            packets += 1
+
+            if pid == audio_pid or pid == PAT_PID or pid in program_pids:
+                packet = buffer[offset : offset + TS_PACKET_SIZE]
+                self._inspect_packet(packet, pid, pid == audio_pid, pid == pcr_pid)
+                self._handle_packet(packet)
+                if audio_pid is None and self.audio is not None:
+                    audio_pid, pcr_pid = self.audio.pid, self.pcr_pid
+            elif pid == pcr_pid and buffer[offset + 3] & 0x20:
+                self._read_pcr(buffer[offset : offset + TS_PACKET_SIZE])
+            offset += TS_PACKET_SIZE
+
+        self._packets += packets
+        self._remainder = bytes(buffer[offset:])
+
+    def result(self) -> ChunkHealth:
+        track = self.track()
+        return ChunkHealth(
+            packets=self._packets,
+            checked_packets=self._checked_packets,
+            cc_errors=self._cc_errors,
+            pcr_seconds=self._pcr.seconds,
+            pts_seconds=self._pts.seconds,
+            audio_bytes=len(track.data) if track is not None else None,
+            digest=self._hash.digest(),
+            track=track,
+        )
+
+    def _inspect_packet(self, packet: memoryview, pid: int, audio: bool, pcr: bool) -> None:
+        self._checked_packets += 1
+        adaptation_field_control = (packet[3] >> 4) & 0x03
+        has_adaptation = adaptation_field_control & 0x02 and packet[4] > 0
+        flags = packet[5] if has_adaptation else 0
+
+        if adaptation_field_control & 0x01:
+            # The counter only advances with a payload, a repeated packet keeps it
+            continuity = packet[3] & 0x0F
+            last = self._continuity.get(pid)
+            discontinuity = flags & 0x80
+            if (
+                last is not None
+                and not discontinuity
+                and continuity != last
+                and continuity != (last + 1) & 0x0F
+            ):
+                self._cc_errors += 1
+            self._continuity[pid] = continuity
+
+        if pcr and has_adaptation:
+            self._read_pcr(packet)
+
+        if audio and packet[1] & 0x40:
+            payload_start = 4 + (1 + packet[4] if adaptation_field_control & 0x02 else 0)
+            pts = read_pts(packet[payload_start:])
+            if pts is not None:
+                self._pts.add(pts)
+
+    def _read_pcr(self, packet: memoryview) -> None:
+        if packet[4] >= 7 and packet[5] & 0x10:
+            self._pcr.add(
+                (packet[6] << 25)
+                | (packet[7] << 17)
+                | (packet[8] << 9)
+                | (packet[9] << 1)
+                | (packet[10] >> 7)
+            )
+
+
+def _inspect(spool: Spool, language: str | None) -> ChunkHealth:
+    inspector = TsInspector(language)
+    with spool.open() as f:
+        while block := f.read(_READ_BLOCK_SIZE):
+            inspector.feed(block)
+    return inspector.result()
+
+
+async def inspect_chunk(spool: Spool, language: str | None = None) -> ChunkHealth:
+    """
+    Inspect an MPEG-TS chunk in a worker thread.
+
+    Args:
+        spool (Spool): MPEG-TS chunk
+        language (str | None): Preferred audio language, selects the audio stream inspected
+
+    Returns:
+        ChunkHealth: Continuity, timeline and audio statistics of the chunk, with its
+            audio elementary stream
+    """
+    return await asyncio.to_thread(_inspect, spool, language)
@@ -0,0 +1,534 @@
+import asyncio
+from dataclasses import dataclass
+from pathlib import PurePath
+
+from src import log
+from src.api.spool import Spool
+
+TS_PACKET_SIZE = 188
+SYNC_BYTE = 0x47
+
+PAT_PID = 0x0000
+NULL_PID = 0x1FFF
+PAT_TABLE_ID = 0x00
+PMT_TABLE_ID = 0x02
+ISO_639_LANGUAGE_DESCRIPTOR = 0x0A
+
+# Shortest valid sections: header up to the last section number, (PMT: program info length),
+# CRC32, bytes
+_MIN_PAT_SIZE = 12
+_MIN_PMT_SIZE = 16
+
+PTS_CLOCK = 90000
+# Timestamps wrap around at 33 bits
+TIMESTAMP_MODULO = 1 << 33
+# Larger steps between consecutive timestamps are discontinuities, not progression
+_MAX_TIMESTAMP_STEP = 10 * PTS_CLOCK
+
+# Stream types whose elementary stream can be uploaded as is: (file extension, content type)
+AUDIO_STREAM_TYPES = {
+    0x03: ("mp3", "audio/mpeg"),  # MPEG-1 audio
+    0x04: ("mp3", "audio/mpeg"),  # MPEG-2 audio
+    0x0F: ("aac", "audio/aac"),  # AAC with ADTS transport
+}
+
+# ISO 639-1 codes mapped to the ISO 639-2 codes used in PMT language descriptors
+LANGUAGE_CODES = {
+    "ru": {"rus"},
+    "en": {"eng"},
+    "uk": {"ukr"},
+    "be": {"bel"},
+    "kk": {"kaz"},
+    "de": {"deu", "ger"},
+    "fr": {"fra", "fre"},
+    "es": {"spa"},
+    "it": {"ita"},
+    "zh": {"zho", "chi"},
+    "ar": {"ara"},
+    "tr": {"tur"},
+}
+
+_READ_BLOCK_SIZE = 1024 * 1024
+
+
+def _crc32_table() -> list[int]:
+    table = []
+    for byte in range(256):
+        crc = byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC32_TABLE = _crc32_table()
+
+
+def crc32_mpeg(data: bytes | bytearray) -> int:
+    """
+    CRC32 of MPEG-2 PSI sections. A section followed by its CRC has a CRC of 0.
+    """
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC32_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+def read_pts(pes: memoryview) -> int | None:
+    """
+    Returns the PTS of the PES packet starting with `pes`, None if it has none.
+    """
+    # PES header with the PTS flag: start code, stream id, length, flags, PTS
+    if len(pes) >= 14 and pes[0] == 0 and pes[1] == 0 and pes[2] == 1 and pes[7] & 0x80:
+        return (
+            ((pes[9] & 0x0E) << 29)
+            | (pes[10] << 22)
+            | ((pes[11] & 0xFE) << 14)
+            | (pes[12] << 7)
+            | (pes[13] >> 1)
+        )
+    return None
+
+
+class Progression:
+    """
+    Sum of the forward steps of a 90 kHz timestamp sequence, ignoring discontinuities.
+    """
+
+    def __init__(self) -> None:
+        self.last: int | None = None
+        self.total = 0
+
+    def add(self, value: int) -> None:
+        if self.last is not None:
+            step = (value - self.last) % TIMESTAMP_MODULO
+            if step < _MAX_TIMESTAMP_STEP:
+                self.total += step
+        self.last = value
+
+    @property
+    def seconds(self) -> float | None:
+        return self.total / PTS_CLOCK if self.last is not None else None
+
+
+@dataclass
+class AudioStream:
+    """
+    Audio elementary stream announced in a PMT.
+    """
+
+    pid: int
+    stream_type: int
+    language: str | None
+
+    @property
+    def extension(self) -> str:
+        return AUDIO_STREAM_TYPES[self.stream_type][0]
+
+    @property
+    def content_type(self) -> str:
+        return AUDIO_STREAM_TYPES[self.stream_type][1]
+
+
+@dataclass
+class AudioTrack:
+    """
+    Audio elementary stream demuxed from an MPEG-TS chunk.
+
+    `lead` is the end of an audio PES packet that started before the chunk. It only belongs
+    to the stream when the chunk is joined to the one before it.
+    """
+
+    stream: AudioStream
+    lead: bytes
+    data: bytes
+
+    def join(self, following: "AudioTrack") -> "AudioTrack | None":
+        """
+        Returns the stream of this chunk joined byte-wise to the `following` one, as demuxed
+        from the joined chunks, None if they carry different streams.
+        """
+        if (following.stream.pid, following.stream.stream_type) != (
+            self.stream.pid,
+            self.stream.stream_type,
+        ):
+            return None
+        return AudioTrack(self.stream, self.lead, self.data + following.lead + following.data)
+
+    async def to_spool(self, name: str) -> Spool:
+        """
+        Writes the stream to a spool named after the chunk `name`, to be closed by the caller.
+        """
+        spool = Spool(
+            PurePath(name).with_suffix(f".{self.stream.extension}").name,
+            content_type=self.stream.content_type,
+        )
+        await spool.write(self.data)
+        return spool
+
+
+class TsDemuxer:
+    """
+    Streaming MPEG-TS demuxer that extracts a single audio elementary stream.
+
+    Data can be fed in blocks of any size. PAT and PMT are parsed as they arrive, the audio
+    stream matching `language` is selected (the first supported audio stream otherwise),
+    and the payloads of its PES packets are concatenated without PES headers, which yields
+    a plain ADTS AAC or MPEG audio stream.
+    """
+
+    def __init__(self, language: str | None = None) -> None:
+        self._languages = self._get_language_codes(language)
+        self._remainder = b""
+        self._sections: dict[int, bytearray] = {}
+        self._pmt_pids: set[int] = set()
+        self._streams: list[AudioStream] = []
+        self._audio: AudioStream | None = None
+        self._pcr_pid: int | None = None
+        self._in_pes = False
+        self._pes_seen = False
+        self._lead = bytearray()
+        self._output = bytearray()
+
+    @property
+    def audio(self) -> AudioStream | None:
+        """
+        Selected audio stream, None until a PMT with a supported audio stream is seen.
+        """
+        return self._audio
+
+    @property
+    def program_pids(self) -> set[int]:
+        """
+        PIDs of the PMTs announced in the PAT seen so far.
+        """
+        return self._pmt_pids
+
+    @property
+    def pcr_pid(self) -> int | None:
+        """
+        PID carrying the program clock of the selected audio stream, None until its PMT is
+        seen or if the program has none.
+        """
+        return self._pcr_pid
+
+    @property
+    def streams(self) -> list[AudioStream]:
+        """
+        Supported audio streams announced in the PMTs seen so far.
+        """
+        return self._streams
+
+    def feed(self, data: bytes) -> None:
+        """
+        Demux the next block of the transport stream.
+        """
+        buffer = memoryview(self._remainder + data if self._remainder else data)
+        offset = 0
+        size = len(buffer)
+        audio_pid = self._audio.pid if self._audio is not None else None
+
+        while offset + TS_PACKET_SIZE <= size:
+            if buffer[offset] != SYNC_BYTE:
+                # Lost sync, skip to the next sync byte
+                offset += 1
+                continue
+
+            if audio_pid is not None:
+                # Fast path for video and other streams once the audio stream is known
+                pid = ((buffer[offset + 1] & 0x1F) << 8) | buffer[offset + 2]
+                if pid != audio_pid and pid != PAT_PID and pid not in self._pmt_pids:
+                    offset += TS_PACKET_SIZE
+                    continue
+
+            self._handle_packet(buffer[offset : offset + TS_PACKET_SIZE])
+            offset += TS_PACKET_SIZE
+            if audio_pid is None and self._audio is not None:
+                audio_pid = self._audio.pid
+
+        self._remainder = bytes(buffer[offset:])
+
+    def read(self) -> bytes:
+        """
+        Return the audio elementary stream extracted so far and clear the output buffer.
+        """
+        output = bytes(self._output)
+        self._output.clear()
+        return output
+
+    def track(self) -> AudioTrack | None:
+        """
+        Return the audio elementary stream extracted so far with its lead, None if no
+        supported audio stream was found. Clears the output buffer.
+        """
+        if self._audio is None:
+            return None
+        return AudioTrack(self._audio, bytes(self._lead), self.read())
+
+    def _handle_packet(self, packet: memoryview) -> None:
+        pid = ((packet[1] & 0x1F) << 8) | packet[2]
+        audio = self._audio
+
+        adaptation_field_control = (packet[3] >> 4) & 0x03
+        if not adaptation_field_control & 0x01:
+            return
+
+        payload_start = 4
+        if adaptation_field_control & 0x02:
+            payload_start += 1 + packet[4]
+        if payload_start >= TS_PACKET_SIZE:
+            return
+
+        payload = packet[payload_start:]
+        unit_start = bool(packet[1] & 0x40)
+
+        if audio is not None and pid == audio.pid:
+            self._handle_pes(payload, unit_start)
+        elif pid == PAT_PID or pid in self._pmt_pids:
+            self._handle_psi(pid, payload, unit_start)
+
+    def _handle_pes(self, payload: memoryview, unit_start: bool) -> None:
+        if unit_start:
+            # PES header: start code (3), stream id (1), packet length (2), flags (2),
+            # header data length (1), optional fields
+            if len(payload) < 9 or payload[0] != 0 or payload[1] != 0 or payload[2] != 1:
+                self._in_pes = False
+                return
+            self._in_pes = True
+            self._pes_seen = True
+            payload = payload[9 + payload[8] :]
+        elif not self._in_pes:
+            if not self._pes_seen:
+                # The chunk starts inside a PES packet
+                self._lead += payload
+            return
+
+        self._output += payload
+
+    def _handle_psi(self, pid: int, payload: memoryview, unit_start: bool) -> None:
+        if unit_start:
+            pointer = payload[0]
+            self._sections[pid] = bytearray(payload[1 + pointer :])
+        elif pid in self._sections:
+            self._sections[pid] += payload
+        else:
+            return
+
+        section = self._sections[pid]
+        if len(section) < 3:
+            return
+        section_length = ((section[1] & 0x0F) << 8) | section[2]
+        if len(section) < 3 + section_length:
+            return
+
+        del self._sections[pid]
+        section = section[: 3 + section_length]
+        # Truncated or damaged tables are ignored, the next repetition replaces them
+        if crc32_mpeg(section) != 0:
+            return
+        if section[0] == PAT_TABLE_ID and len(section) >= _MIN_PAT_SIZE:
+            self._parse_pat(section)
+        elif section[0] == PMT_TABLE_ID and len(section) >= _MIN_PMT_SIZE:
+            self._parse_pmt(section)
+
+    def _parse_pat(self, section: bytearray) -> None:
+        # Program loop starts after the 8 byte header and ends before the 4 byte CRC
+        for i in range(8, len(section) - 4, 4):
+            program_number = (section[i] << 8) | section[i + 1]
+            if program_number != 0:
+                self._pmt_pids.add(((section[i + 2] & 0x1F) << 8) | section[i + 3])
+
+    def _parse_pmt(self, section: bytearray) -> None:
+        pcr_pid = ((section[8] & 0x1F) << 8) | section[9]
+        program_info_length = ((section[10] & 0x0F) << 8) | section[11]
+        i = 12 + program_info_length
+        end = len(section) - 4
+
+        streams = []
+        while i + 5 <= end:
+            stream_type = section[i]
+            pid = ((section[i + 1] & 0x1F) << 8) | section[i + 2]
+            es_info_length = ((section[i + 3] & 0x0F) << 8) | section[i + 4]
+            descriptors = section[i + 5 : i + 5 + es_info_length]
+            i += 5 + es_info_length
+
+            if stream_type in AUDIO_STREAM_TYPES:
+                streams.append(AudioStream(pid, stream_type, self._get_language(descriptors)))
+
+        if streams and self._audio is None:
+            self._streams = streams
+            self._audio = self._select(streams)
+            self._pcr_pid = pcr_pid if pcr_pid != NULL_PID else None
+
+    def _select(self, streams: list[AudioStream]) -> AudioStream:
+        for stream in streams:
+            if stream.language in self._languages:
+                return stream
+        return streams[0]
+
+    @staticmethod
+    def _get_language(descriptors: bytearray) -> str | None:
+        i = 0
+        while i + 2 <= len(descriptors):
+            tag, length = descriptors[i], descriptors[i + 1]
+            if tag == ISO_639_LANGUAGE_DESCRIPTOR and length >= 3:
+                return bytes(descriptors[i + 2 : i + 5]).decode("latin-1").lower()
+            i += 2 + length
+        return None
+
+    @staticmethod
+    def _get_language_codes(language: str | None) -> set[str]:
+        if not language:
+            return set()
+        language = language.lower()
+        return LANGUAGE_CODES.get(language, set()) | {language}
+
+
+def _demux(spool: Spool, language: str | None) -> AudioTrack | None:
+    demuxer = TsDemuxer(language)
+    with spool.open() as f:
+        while block := f.read(_READ_BLOCK_SIZE):
+            demuxer.feed(block)
+    return demuxer.track()
+
+
+async def demux_audio(spool: Spool, language: str | None = None) -> AudioTrack | None:
+    """
+    Demux the audio elementary stream of an MPEG-TS chunk in a worker thread.
+
+    Args:
+        spool (Spool): MPEG-TS chunk
+        language (str | None): Preferred audio language (ISO 639-1 or ISO 639-2)
+
+    Returns:
+        AudioTrack | None: Audio elementary stream, None if the chunk has no supported
+            audio stream
+    """
+    return await asyncio.to_thread(_demux, spool, language)
+
+
+async def extract_audio(spool: Spool, language: str | None = None) -> Spool | None:
+    """
+    Extract the audio elementary stream from an MPEG-TS chunk.
+
+    Demuxing runs in a worker thread. Returns None if the chunk has no supported
+    audio stream, in which case the full chunk should be used instead.
+
+    Args:
+        spool (Spool): MPEG-TS chunk
+        language (str | None): Preferred audio language (ISO 639-1 or ISO 639-2)
+
+    Returns:
+        Spool | None: Audio elementary stream, the caller is responsible for closing it
+    """
+    track = await demux_audio(spool, language)
+    if track is None or not track.data:
+        log.debug("No audio stream found in chunk", name=spool.name)
+        return None
+
+    result = await track.to_spool(spool.name)
+    log.debug(
+        "Audio stream extracted",
+        name=spool.name,
+        pid=track.stream.pid,
+        language=track.stream.language,
+        chunk_size=spool.size,
+        audio_size=result.size,
+        sampled=True,
+    )
+    return result
+
+
+def _find_audio_offset(
+    spool: Spool, seconds: float, language: str | None
+) -> tuple[bytes, int] | None:
+    """
+    Returns the PAT and PMT packets of a chunk and the offset of the first audio packet
+    `seconds` into it, None if it has no audio stream or its audio ends before.
+    """
+    # Only the tables are demuxed, to find the audio stream
+    demuxer = TsDemuxer(language)
+    tables: dict[int, bytearray] = {}
+    complete: set[int] = set()
+    progression = Progression()
+    audio_pid = None
+    position = 0
+    remainder = b""
+
+    with spool.open() as f:
+        while block := f.read(_READ_BLOCK_SIZE):
+            buffer = memoryview(remainder + block if remainder else block)
+            base = position - len(remainder)
+            offset = 0
+            size = len(buffer)
+            while offset + TS_PACKET_SIZE <= size:
+                if buffer[offset] != SYNC_BYTE:
+                    offset += 1
+                    continue
+                pid = ((buffer[offset + 1] & 0x1F) << 8) | buffer[offset + 2]
+                if pid != audio_pid and pid != PAT_PID and pid not in demuxer.program_pids:
+                    offset += TS_PACKET_SIZE
+                    continue
+                packet = buffer[offset : offset + TS_PACKET_SIZE]
+                unit_start = packet[1] & 0x40
+
+                if pid != audio_pid:
+                    if pid not in complete:
+                        # Keep the first section of each table, up to the start of the next one
+                        if unit_start and pid in tables:
+                            complete.add(pid)
+                        elif unit_start or pid in tables:
+                            tables.setdefault(pid, bytearray()).extend(packet)
+                    if audio_pid is None:
+                        demuxer.feed(bytes(packet))
+                        if demuxer.audio is not None:
+                            audio_pid = demuxer.audio.pid
+                elif unit_start:
+                    adaptation_field_control = (packet[3] >> 4) & 0x03
+                    payload_start = 4 + (1 + packet[4] if adaptation_field_control & 0x02 else 0)
+                    pts = read_pts(packet[payload_start:])
+                    if pts is not None:
+                        progression.add(pts)
+                        if progression.seconds >= seconds:
+                            pids = sorted(tables, key=lambda table_pid: table_pid != PAT_PID)
+                            return b"".join(tables[table_pid] for table_pid in pids), base + offset
+                offset += TS_PACKET_SIZE
+
+            remainder = bytes(buffer[offset:])
+            position += len(block)
+    return None
+
+
+def _slice(spool: Spool, seconds: float, language: str | None) -> bytes | None:
+    found = _find_audio_offset(spool, seconds, language)
+    if found is None:
+        return None
+    tables, offset = found
+    with spool.open() as f:
+        f.seek(offset)
+        return tables + f.read()
+
+
+async def slice_from(spool: Spool, seconds: float, language: str | None = None) -> Spool | None:
+    """
+    Cut off the start of an MPEG-TS chunk.
+
+    The chunk is cut at the first audio packet `seconds` into it, as measured by the audio
+    timestamps, and the PAT and PMT are repeated in front so that the rest can be demuxed
+    and joined to the next chunk. Runs in a worker thread.
+
+    Args:
+        spool (Spool): MPEG-TS chunk
+        seconds (float): Time to cut off
+        language (str | None): Preferred audio language, selects the audio stream timed
+
+    Returns:
+        Spool | None: Rest of the chunk, None if the chunk has no supported audio stream
+            or its audio ends before. The caller is responsible for closing it.
+    """
+    data = await asyncio.to_thread(_slice, spool, seconds, language)
+    if data is None:
+        return None
+    result = Spool(spool.name)
+    await result.write(data)
+    return result
@@ -0,0 +1,408 @@
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+
+from aiohttp import web
+from aiohttp.typedefs import Handler
+
+from src import log
+from src.config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Default histogram buckets, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    """
+    Base class of metric families. A family without label names has a single child that
+    the family methods record to; labelled children are created once by `labels()` and
+    should be kept by the caller, so recording never looks them up on the hot path.
+
+    Metrics are recorded from the event loop thread only, so they need no locks.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._children: dict[tuple[str, ...], object] = {}
+        if not labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: object):
+        """
+        Return the child for the label values, creating it on first use.
+        """
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._create_child()
+        return child
+
+    def remove(self, *values: object) -> None:
+        """
+        Drop the child for the label values, e.g. when a source is stopped. Trailing label
+        values may be left out to drop the children for all of their values.
+        """
+        prefix = tuple(str(value) for value in values)
+        for key in [key for key in self._children if key[: len(prefix)] == prefix]:
+            del self._children[key]
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        for key, child in list(self._children.items()):
+            yield from self._render_child(key, child)
+
+    def _create_child(self) -> object:
+        raise NotImplementedError()
+
+    def _render_child(self, key: tuple[str, ...], child) -> Iterator[str]:
+        raise NotImplementedError()
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing counter.
+    """
+
+    type = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.value += amount
+
+    def _create_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _render_child(self, key: tuple[str, ...], child: _CounterChild) -> Iterator[str]:
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self) -> None:
+        self.value = 0
+        self.function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """
+        Compute the value when metrics are collected instead of on every change.
+        """
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down, either set directly or computed on collection.
+    """
+
+    type = "gauge"
+
+    def set(self, value: float) -> None:
+        self._default.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default.set_function(function)
+
+    def _create_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def _render_child(self, key: tuple[str, ...], child: _GaugeChild) -> Iterator[str]:
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}{labels} {_format_value(child.get())}"
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # Non-cumulative counts per bucket, the last one is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in fixed buckets.
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _create_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, key: tuple[str, ...], child: _HistogramChild) -> Iterator[str]:
+        names = (*self.labelnames, "le")
+        total = 0
+        for bound, count in zip((*self.buckets, math.inf), child.counts, strict=True):
+            total += count
+            labels = _format_labels(names, (*key, _format_value(bound)))
+            yield f"{self.name}_bucket{labels} {total}"
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+        yield f"{self.name}_count{labels} {total}"
+
+
+class Registry:
+    """
+    Collection of metrics rendered together in the Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register[M: _Metric](self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+download_seconds = registry.register(
+    Histogram("trs_download_seconds", "Time to download an archive window.")
+)
+transcription_seconds = registry.register(
+    Histogram(
+        "trs_transcription_seconds",
+        "Time of a transcription request, excluding the wait for a slot.",
+        buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+    )
+)
+filtering_seconds = registry.register(
+    Histogram(
+        "trs_filtering_seconds",
+        "Time to filter the segments of a transcribed window.",
+        buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+    )
+)
+backend_post_seconds = registry.register(
+    Histogram("trs_backend_post_seconds", "Time to post a transcription result to the backend.")
+)
+delivery_journal_errors = registry.register(
+    Counter(
+        "trs_delivery_journal_errors_total",
+        "Failed writes to the delivery journal, the results were delivered without durability.",
+    )
+)
+downloaded_bytes = registry.register(
+    Counter("trs_downloaded_bytes_total", "Bytes downloaded from the archive.")
+)
+uploaded_bytes = registry.register(
+    Counter("trs_uploaded_bytes_total", "Bytes uploaded to the transcription service.")
+)
+skipped_chunks = registry.register(
+    Counter(
+        "trs_skipped_chunks_total",
+        "Windows that were not transcribed: unavailable in the archive, HTTP 500 or other errors.",
+        ("reason",),
+    )
+)
+dead_chunks = registry.register(
+    Counter(
+        "trs_dead_chunks_total",
+        "Downloaded windows not transcribed because the inspection judged them dead.",
+        ("source_id", "reason"),
+    )
+)
+redundant_audio_seconds = registry.register(
+    Counter(
+        "trs_redundant_audio_seconds_total",
+        "Seconds of audio transcribed again because consecutive windows overlap.",
+        ("source_id",),
+    )
+)
+shared_chunks = registry.register(
+    Counter(
+        "trs_shared_chunks_total",
+        "Archive windows and transcriptions reused from another source of the same stream.",
+        ("kind",),
+    )
+)
+stage_failures = registry.register(
+    Counter(
+        "trs_pipeline_stage_failures_total",
+        "Unexpected errors after which a pipeline stage of a source was restarted.",
+        ("source_id", "stage"),
+    )
+)
+excluded_phrases = registry.register(
+    Counter(
+        "trs_excluded_phrases_total",
+        "Segments dropped because of an excluded phrase, per configured phrase.",
+        ("phrase",),
+    )
+)
+source_lag_seconds = registry.register(
+    Gauge(
+        "trs_source_lag_seconds",
+        "Seconds of archive a source has not transcribed yet beyond its trailing delay.",
+        ("source_id",),
+    )
+)
+event_loop_lag_seconds = registry.register(
+    Histogram(
+        "trs_event_loop_lag_seconds",
+        "Delay before a callback scheduled on the event loop runs.",
+        buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    )
+)
+event_loop_blocks = registry.register(
+    Counter(
+        "trs_event_loop_blocks_total",
+        "Times the event loop was blocked for longer than LOOP_BLOCK_THRESHOLD.",
+    )
+)
+source_tasks = registry.register(Gauge("trs_source_tasks", "Running source processing tasks."))
+replica_outstanding = registry.register(
+    Gauge(
+        "trs_transcription_replica_outstanding",
+        "Requests in flight per transcription replica.",
+        ("replica",),
+    )
+)
+replica_circuit_open = registry.register(
+    Gauge(
+        "trs_transcription_replica_circuit_open",
+        "Whether the circuit breaker of a transcription replica is open.",
+        ("replica",),
+    )
+)
+replica_failures = registry.register(
+    Counter(
+        "trs_transcription_replica_failures_total",
+        "Requests that failed because of the transcription replica: connection errors, 502-504.",
+        ("replica",),
+    )
+)
+hedged_requests = registry.register(
+    Counter(
+        "trs_transcription_hedged_requests_total",
+        "Transcription requests duplicated to a second replica after exceeding the p95 latency.",
+    )
+)
+
+
+class MetricsServer:
+    """
+    Embedded HTTP server exposing the registry at `/metrics` in the Prometheus text format.
+    Disabled when `METRICS_PORT` is 0.
+    """
+
+    def __init__(self, registry: Registry, host: str, port: int) -> None:
+        self._registry = registry
+        self._host = host
+        self._port = port
+        self._runner: web.AppRunner | None = None
+        self._routes: list[web.RouteDef] = []
+
+    def add_route(self, method: str, path: str, handler: Handler) -> None:
+        """
+        Serve another endpoint next to the metrics, e.g. for diagnostics. Takes effect when
+        the server is started.
+        """
+        self._routes.append(web.route(method, path, handler))
+
+    async def start(self) -> None:
+        if self._runner is not None or not self._port:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        app.router.add_routes(self._routes)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self._host, self._port).start()
+        log.info("Metrics server started", host=self._host, port=self._port)
+
+    async def close(self) -> None:
+        if self._runner is None:
+            return
+        await self._runner.cleanup()
+        self._runner = None
+
+    async def __aenter__(self) -> "MetricsServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        body = self._registry.render()
+        log.debug("Metrics collected", duration=time.perf_counter() - started)
+        return web.Response(body=body.encode(), headers={"Content-Type": CONTENT_TYPE})
+
+
+metrics_server = MetricsServer(registry, settings.METRICS_HOST, settings.METRICS_PORT)
@@ -0,0 +1,11 @@
+from .leases import LeaseStore, ShardOwnership, lease_store, rendezvous_owner, shard_ownership
+from .supervisor import supervise
+
+__all__ = [
+    "LeaseStore",
+    "ShardOwnership",
+    "lease_store",
+    "rendezvous_owner",
+    "shard_ownership",
+    "supervise",
+]
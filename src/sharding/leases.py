@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+
+from src import log
+from src.config import settings
+
+
+def rendezvous_owner(source_id: int, workers: Iterable[str]) -> str | None:
+    """
+    Picks the worker owning a source by rendezvous (highest random weight) hashing:
+    when a worker joins or leaves, only the sources it wins or owned move.
+    """
+    owner, best = None, b""
+    for worker_id in workers:
+        weight = hashlib.blake2b(f"{worker_id}:{source_id}".encode(), digest_size=8).digest()
+        if weight > best:
+            owner, best = worker_id, weight
+    return owner
+
+
+class LeaseStore:
+    """
+    SQLite-backed registry of live workers and of the source leases they hold, shared by
+    every worker through the state database.
+
+    A worker is alive while it keeps renewing its heartbeat, a lease is held while its owner
+    keeps renewing it. Both expire after `ttl` seconds, so the sources of a worker that died
+    can be claimed by the others.
+    """
+
+    def __init__(self, path: str | Path, worker_id: str, ttl: float) -> None:
+        self._path = Path(path)
+        self._worker_id = worker_id
+        self._ttl = ttl
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def worker_id(self) -> str:
+        return self._worker_id
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    async def open(self) -> None:
+        """
+        Open the database and create the schema if needed.
+        """
+        if self._connection is not None:
+            return
+        await asyncio.to_thread(self._open)
+        log.info("Lease store opened", path=str(self._path), worker_id=self._worker_id)
+
+    async def close(self) -> None:
+        """
+        Release every lease of the worker and close the database.
+        """
+        if self._connection is None:
+            return
+        await asyncio.to_thread(self._close)
+
+    async def __aenter__(self) -> "LeaseStore":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def heartbeat(self) -> list[str]:
+        """
+        Renew the heartbeat of the worker and return the ids of all live workers.
+        """
+        return await asyncio.to_thread(self._heartbeat)
+
+    async def acquire(self, source_ids: Iterable[int]) -> set[int]:
+        """
+        Claim or renew the leases of the sources. Returns the sources the worker holds
+        afterwards; a source leased by another live worker is not taken over.
+        """
+        return await asyncio.to_thread(self._acquire, list(source_ids))
+
+    async def release(self, source_ids: Iterable[int]) -> None:
+        """
+        Give up the leases of the sources.
+        """
+        source_ids = list(source_ids)
+        if source_ids:
+            await asyncio.to_thread(self._release, source_ids)
+
+    def _open(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path,
+            timeout=settings.STATE_DB_BUSY_TIMEOUT,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            "worker_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS leases ("
+            "source_id INTEGER PRIMARY KEY, worker_id TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection = connection
+
+    def _close(self) -> None:
+        with self._lock:
+            with self._transaction() as connection:
+                connection.execute("DELETE FROM leases WHERE worker_id = ?", (self._worker_id,))
+                connection.execute("DELETE FROM workers WHERE worker_id = ?", (self._worker_id,))
+            self._connection.close()
+            self._connection = None
+
+    def _heartbeat(self) -> list[str]:
+        now = time.time()
+        with self._lock, self._transaction() as connection:
+            connection.execute(
+                "INSERT INTO workers (worker_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE SET expires_at = excluded.expires_at",
+                (self._worker_id, now + self._ttl),
+            )
+            connection.execute("DELETE FROM workers WHERE expires_at <= ?", (now,))
+            rows = connection.execute("SELECT worker_id FROM workers ORDER BY worker_id")
+            return [row[0] for row in rows]
+
+    def _acquire(self, source_ids: list[int]) -> set[int]:
+        now = time.time()
+        with self._lock, self._transaction() as connection:
+            connection.executemany(
+                "INSERT INTO leases (source_id, worker_id, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (source_id) DO UPDATE "
+                "SET worker_id = excluded.worker_id, expires_at = excluded.expires_at "
+                "WHERE leases.worker_id = excluded.worker_id OR leases.expires_at <= ?",
+                [(source_id, self._worker_id, now + self._ttl, now) for source_id in source_ids],
+            )
+            rows = connection.execute(
+                "SELECT source_id FROM leases WHERE worker_id = ? AND expires_at > ?",
+                (self._worker_id, now),
+            )
+            return {row[0] for row in rows} & set(source_ids)
+
+    def _release(self, source_ids: list[int]) -> None:
+        with self._lock, self._transaction() as connection:
+            connection.executemany(
+                "DELETE FROM leases WHERE source_id = ? AND worker_id = ?",
+                [(source_id, self._worker_id) for source_id in source_ids],
+            )
+
+    def _transaction(self) -> sqlite3.Connection:
+        if self._connection is None:
+            raise RuntimeError("Lease store is not open")
+        # Take the write lock upfront so that concurrent workers serialize instead of failing
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._connection
+
+
+class ShardOwnership:
+    """
+    Decides which sources this worker processes.
+
+    On every refresh the worker renews its heartbeat, picks its share of the sources by
+    rendezvous hashing over the live workers and claims leases for them. A source moving
+    to another worker is released one refresh later, after its processing has been stopped,
+    and the new owner takes it over once the lease is free.
+
+    If refreshing keeps failing, the worker owns nothing once its leases could have expired.
+    """
+
+    def __init__(self, store: LeaseStore) -> None:
+        self._store = store
+        self._owned: set[int] = set()
+        self._releasing: set[int] = set()
+        self._renewed_at = 0.0
+
+    @property
+    def owned(self) -> set[int]:
+        """
+        Sources leased by this worker as of the last refresh.
+        """
+        if time.monotonic() - self._renewed_at >= self._store.ttl:
+            return set()
+        return self._owned
+
+    async def refresh(self, source_ids: Iterable[int]) -> bool:
+        """
+        Rebalance ownership of the sources. Returns True when the owned sources changed.
+        """
+        workers = await self._store.heartbeat()
+        worker_id = self._store.worker_id
+        desired = {
+            source_id
+            for source_id in source_ids
+            if rendezvous_owner(source_id, workers) == worker_id
+        }
+
+        await self._store.release(self._releasing - desired)
+        self._releasing = self._owned - desired
+
+        renewed_at = time.monotonic()
+        owned = await self._store.acquire(desired)
+        changed = owned != self.owned
+        self._renewed_at = renewed_at
+        if changed:
+            log.info(
+                "Source ownership changed",
+                worker_id=worker_id,
+                workers=len(workers),
+                owned=len(owned),
+                waiting=len(desired - owned),
+            )
+        self._owned = owned
+        return changed
+
+    async def release_all(self) -> None:
+        """
+        Give up every lease, e.g. on shutdown.
+        """
+        await self._store.release(self._owned | self._releasing)
+        self._owned, self._releasing = set(), set()
+
+
+lease_store = LeaseStore(settings.STATE_DB_PATH, settings.WORKER_ID, settings.LEASE_TTL)
+shard_ownership = ShardOwnership(lease_store)
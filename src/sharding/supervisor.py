@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+import time
+
+from src import log
+from src.config import settings
+
+# A worker running at least this long is restarted without delay, seconds
+_HEALTHY_UPTIME = 60.0
+_MAX_RESTART_DELAY = 60.0
+_STOP_TIMEOUT = 30.0
+
+
+def worker_environment(index: int) -> dict[str, str]:
+    """
+    Environment of a worker process: a single sharded worker with its own id and metrics port.
+    """
+    return {
+        **os.environ,
+        "WORKERS": "1",
+        "SHARDING": "true",
+        "WORKER_ID": f"{settings.WORKER_ID}-{index}",
+        "METRICS_PORT": str(settings.METRICS_PORT + index if settings.METRICS_PORT else 0),
+    }
+
+
+async def supervise(workers: int) -> None:
+    """
+    Runs the service as `workers` sharded worker processes and restarts the ones that exit.
+    Ownership of the sources of a dead worker moves to the others once its leases expire,
+    and moves back when it has been restarted.
+    """
+    log.info("Starting supervisor", workers=workers, worker_id=settings.WORKER_ID)
+    async with asyncio.TaskGroup() as tg:
+        for index in range(workers):
+            tg.create_task(_run_worker(index))
+
+
+async def _run_worker(index: int) -> None:
+    env = worker_environment(index)
+    delay = 1.0
+    while True:
+        started = time.monotonic()
+        process = await asyncio.create_subprocess_exec(sys.executable, "-m", "src.main", env=env)
+        log.info("Worker started", worker_id=env["WORKER_ID"], pid=process.pid)
+        try:
+            code = await process.wait()
+        except asyncio.CancelledError:
+            await _stop(process)
+            raise
+
+        if time.monotonic() - started >= _HEALTHY_UPTIME:
+            delay = 1.0
+        log.error("Worker exited, restarting", worker_id=env["WORKER_ID"], code=code, delay=delay)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, _MAX_RESTART_DELAY)
+
+
+async def _stop(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), _STOP_TIMEOUT)
+    except TimeoutError:
+        process.kill()
+        await process.wait()
@@ -0,0 +1,97 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from src import log
+from src.config import settings
+
+
+class CheckpointStore:
+    """
+    SQLite-backed store of the last committed position of every source.
+
+    A position is the archive timestamp the source will continue from. All database calls
+    run in worker threads and are serialized on a single connection.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path)
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    async def open(self) -> None:
+        """
+        Open the database and create the schema if needed.
+        """
+        if self._connection is not None:
+            return
+        await asyncio.to_thread(self._open)
+        log.info("Checkpoint store opened", path=str(self._path))
+
+    async def close(self) -> None:
+        """
+        Close the database.
+        """
+        if self._connection is None:
+            return
+        await asyncio.to_thread(self._close)
+
+    async def __aenter__(self) -> "CheckpointStore":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def load(self, source_id: int) -> int | None:
+        """
+        Return the committed position of a source, or None if it has never committed one.
+        """
+        row = await asyncio.to_thread(
+            self._execute, "SELECT position FROM checkpoints WHERE source_id = ?", (source_id,)
+        )
+        return row[0] if row else None
+
+    async def save(self, source_id: int, position: int) -> None:
+        """
+        Commit the position of a source.
+        """
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO checkpoints (source_id, position, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (source_id) DO UPDATE "
+            "SET position = excluded.position, updated_at = excluded.updated_at",
+            (source_id, position, int(time.time())),
+        )
+
+    def _open(self) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path,
+            timeout=settings.STATE_DB_BUSY_TIMEOUT,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=FULL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "source_id INTEGER PRIMARY KEY, position INTEGER NOT NULL, updated_at INTEGER NOT NULL)"
+        )
+        self._connection = connection
+
+    def _close(self) -> None:
+        with self._lock:
+            self._connection.close()
+            self._connection = None
+
+    def _execute(self, sql: str, parameters: tuple) -> tuple | None:
+        with self._lock:
+            if self._connection is None:
+                raise RuntimeError("Checkpoint store is not open")
+            return self._connection.execute(sql, parameters).fetchone()
+
+
+checkpoint_store = CheckpointStore(settings.STATE_DB_PATH)
@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+
+from src.api.backend.schemas import TranscriptionList
+from src.api.spool import Spool
+from src.media import AudioTrack
+
+
+@dataclass
+class Chunk:
+    """
+    Archive window downloaded by the download stage.
+
+    `data` is None when the window could not be downloaded. `language` and `url` are those of
+    the source at the time of the download. `independent` windows are catch-up windows that overlap
+    the previous one instead of continuing from its result. `live` windows were downloaded
+    from the playlist, at the live edge. `track` is the audio stream of `data` demuxed by
+    the inspection, if any.
+    """
+
+    start: int
+    duration: int
+    data: Spool | None
+    language: str
+    url: str
+    independent: bool = False
+    live: bool = False
+    track: AudioTrack | None = None
+
+    @property
+    def end(self) -> int:
+        return self.start + self.duration
+
+
+@dataclass
+class ChunkResult:
+    """
+    Outcome of a transcribed window handed to the publish stage.
+
+    `next_time` is the position to continue from once the transcription is published.
+    """
+
+    next_time: int
+    transcription: TranscriptionList | None
@@ -0,0 +1,152 @@
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from yarl import URL
+
+from src import metrics
+from src.api.spool import Spool
+from src.api.transcription.schemas import TranscriptionResult
+from src.config import settings
+
+T = TypeVar("T")
+
+_shared_downloads = metrics.shared_chunks.labels("download")
+_shared_transcriptions = metrics.shared_chunks.labels("transcription")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Returns the canonical form of a URL: lowercase scheme and host, no default port,
+    dot segments or fragment, and sorted query parameters.
+    """
+    parsed = URL(url).with_fragment(None)
+    return str(parsed.with_query(sorted(parsed.query.items())))
+
+
+@dataclass
+class _Flight(Generic[T]):
+    task: asyncio.Task[T]
+    waiters: int = 0
+
+
+class ChunkCache:
+    """
+    Shares archive windows and their transcriptions between sources of the same stream.
+
+    Downloads are keyed by the normalized window URL, which carries the time window, and
+    made once however many sources request them at the same time. The downloaded spool is
+    reference counted: every source gets its own reference and the window stays available
+    to other sources until the last one is closed, then its memory is released.
+
+    Transcriptions are keyed by the stream, the audio window and the language. A request is
+    sent once for sources asking for the same audio at the same time, and the most recent
+    `TRANSCRIPTION_RESULT_CACHE_SIZE` results are kept for sources asking later. Every
+    source gets its own copy of the result.
+
+    A download or a transcription is cancelled once every source waiting for it is.
+    """
+
+    def __init__(self) -> None:
+        self._downloads: dict[str, _Flight[Spool]] = {}
+        self._chunks: dict[str, Spool] = {}
+        self._transcriptions: dict[Hashable, _Flight[TranscriptionResult]] = {}
+        self._results: OrderedDict[Hashable, TranscriptionResult] = OrderedDict()
+
+    async def download(self, url: str, fetch: Callable[[], Awaitable[Spool]]) -> Spool:
+        """
+        Returns the archive window at `url`, shared with the other sources requesting it,
+        calling `fetch` to download it if no source has it. The caller is responsible for
+        closing the returned reference.
+        """
+        if not settings.CHUNK_CACHE_ENABLED:
+            return await fetch()
+
+        key = normalize_url(url)
+        # Windows whose every reference was closed are gone
+        self._chunks = {k: spool for k, spool in self._chunks.items() if not spool.closed}
+        spool = self._chunks.get(key)
+        if spool is not None:
+            _shared_downloads.inc()
+            return spool.retain()
+
+        return await self._join(
+            self._downloads,
+            key,
+            fetch,
+            Spool.retain,
+            self._downloaded,
+            _shared_downloads.inc,
+        )
+
+    async def transcription(
+        self, key: Hashable, transcribe: Callable[[], Awaitable[TranscriptionResult]]
+    ) -> TranscriptionResult:
+        """
+        Returns the transcription of the audio identified by `key`, reusing the result of
+        another source or calling `transcribe` if there is none.
+        """
+        if settings.TRANSCRIPTION_RESULT_CACHE_SIZE <= 0:
+            return await transcribe()
+
+        # Segments are shifted and filtered in place by each source, each gets a copy
+        result = self._results.get(key)
+        if result is not None:
+            self._results.move_to_end(key)
+            _shared_transcriptions.inc()
+            return result.model_copy(deep=True)
+        return await self._join(
+            self._transcriptions,
+            key,
+            transcribe,
+            lambda result: result.model_copy(deep=True),
+            self._transcribed,
+            _shared_transcriptions.inc,
+        )
+
+    async def _join(
+        self,
+        flights: dict[Hashable, _Flight[T]],
+        key: Hashable,
+        factory: Callable[[], Awaitable[T]],
+        share: Callable[[T], T],
+        on_done: Callable[[Hashable, T], None],
+        count_shared: Callable[[], None],
+    ) -> T:
+        """
+        Waits for the running flight of `key`, starting it if there is none, and returns
+        its result passed through `share`. `on_done` is called with the result once every
+        waiter received its share.
+        """
+        flight = flights.get(key)
+        if flight is None:
+            flight = flights[key] = _Flight(asyncio.create_task(factory()))
+        else:
+            count_shared()
+
+        flight.waiters += 1
+        try:
+            return share(await asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0:
+                del flights[key]
+                if not flight.task.done():
+                    flight.task.cancel()
+                elif not flight.task.cancelled() and flight.task.exception() is None:
+                    on_done(key, flight.task.result())
+
+    def _downloaded(self, key: str, spool: Spool) -> None:
+        # Every waiter holds its own reference, the one of the download is no longer needed
+        self._chunks[key] = spool
+        spool.close()
+
+    def _transcribed(self, key: Hashable, result: TranscriptionResult) -> None:
+        self._results[key] = result
+        while len(self._results) > settings.TRANSCRIPTION_RESULT_CACHE_SIZE:
+            self._results.popitem(last=False)
+
+
+chunk_cache = ChunkCache()
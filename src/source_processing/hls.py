@@ -0,0 +1,230 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from yarl import URL
+
+from src import log
+from src.api.http import http_clients
+
+# Reloads without a new segment for this many target durations mean the stream stalled
+_STALL_TARGET_DURATIONS = 3
+
+
+@dataclass
+class PlaylistSegment:
+    """
+    Media segment of an HLS playlist.
+
+    `start` is the Unix time of the first frame: from `#EXT-X-PROGRAM-DATE-TIME`, extrapolated
+    from an earlier tag of the playlist, or None when the playlist carries no date.
+    """
+
+    sequence: int
+    url: str
+    duration: float
+    start: float | None = None
+
+    @property
+    def end(self) -> float | None:
+        return self.start + self.duration if self.start is not None else None
+
+
+@dataclass
+class MediaPlaylist:
+    target_duration: float
+    segments: list[PlaylistSegment]
+    ended: bool = False
+
+
+def _parse_date(value: str) -> float | None:
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def _parse_attributes(value: str) -> dict[str, str]:
+    attributes = {}
+    key, quoted, token = "", False, ""
+    for char in value + ",":
+        if char == '"':
+            quoted = not quoted
+        elif char == "=" and not quoted and not key:
+            key, token = token, ""
+        elif char == "," and not quoted:
+            attributes[key.strip()] = token.strip()
+            key, token = "", ""
+        else:
+            token += char
+    return attributes
+
+
+def select_variant(text: str, url: str) -> str | None:
+    """
+    Returns the URL of the lowest bandwidth variant of a master playlist, or None if `text` is
+    a media playlist. Transcription only needs the audio, which every variant carries.
+    """
+    best, best_bandwidth = None, None
+    bandwidth = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            attributes = _parse_attributes(line.partition(":")[2])
+            bandwidth = int(attributes.get("BANDWIDTH", "0") or 0)
+        elif line and not line.startswith("#") and bandwidth is not None:
+            if best_bandwidth is None or bandwidth < best_bandwidth:
+                best, best_bandwidth = str(URL(url).join(URL(line))), bandwidth
+            bandwidth = None
+    return best
+
+
+def parse_media_playlist(text: str, url: str) -> MediaPlaylist:
+    """
+    Parses an HLS media playlist. Segment URLs are resolved against the playlist `url`.
+    """
+    if not text.startswith("#EXTM3U"):
+        raise ValueError("Not an HLS playlist")
+
+    target_duration = 0.0
+    sequence = 0
+    segments: list[PlaylistSegment] = []
+    ended = False
+    duration: float | None = None
+    start: float | None = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        tag, _, value = line.partition(":")
+        if tag == "#EXT-X-TARGETDURATION":
+            target_duration = float(value)
+        elif tag == "#EXT-X-MEDIA-SEQUENCE":
+            sequence = int(value)
+        elif tag == "#EXTINF":
+            duration = float(value.partition(",")[0])
+        elif tag == "#EXT-X-PROGRAM-DATE-TIME":
+            start = _parse_date(value)
+        elif tag == "#EXT-X-ENDLIST":
+            ended = True
+        elif not line.startswith("#") and duration is not None:
+            segments.append(
+                PlaylistSegment(sequence, str(URL(url).join(URL(line))), duration, start)
+            )
+            sequence += 1
+            # Dates of the following segments are extrapolated until the next tag
+            start = start + duration if start is not None else None
+            duration = None
+
+    return MediaPlaylist(target_duration, segments, ended)
+
+
+class LivePlaylist:
+    """
+    Follows a live HLS playlist and returns its new segments in batches.
+
+    Segments are tracked by media sequence number, so each one is returned once however often
+    the playlist is reloaded. The playlist is reloaded after its target duration when it
+    changed and after half of it when it did not, as recommended by the HLS specification.
+    Segments of playlists without `#EXT-X-PROGRAM-DATE-TIME` are dated by assuming the last
+    segment of the first reload ends at the time of the reload.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._media_url: str | None = None
+        self._last: PlaylistSegment | None = None
+        self._pending: list[PlaylistSegment] = []
+        self._target_duration = 0.0
+        self._changed_at = time.monotonic()
+
+    async def next_batch(self, since: float, duration: float) -> list[PlaylistSegment]:
+        """
+        Wait for consecutive new segments covering at least `duration` seconds and return
+        them. Segments mostly before `since` are skipped. Raises TimeoutError if the playlist
+        stops getting new segments and EOFError once it ended.
+        """
+        while True:
+            changed, ended = await self._reload()
+            self._pending = [s for s in self._pending if s.start + s.duration / 2 >= since]
+
+            batch, total = [], 0.0
+            for segment in self._pending:
+                batch.append(segment)
+                total += segment.duration
+                if total >= duration:
+                    break
+            if total >= duration or (ended and batch):
+                del self._pending[: len(batch)]
+                return batch
+            if ended:
+                raise EOFError("Live playlist ended")
+            stalled_for = time.monotonic() - self._changed_at
+            if stalled_for > _STALL_TARGET_DURATIONS * max(self._target_duration, 1.0):
+                self._changed_at = time.monotonic()
+                raise TimeoutError("Live playlist stopped updating")
+
+            await asyncio.sleep(self._target_duration / (1 if changed else 2) or 1.0)
+
+    async def _reload(self) -> tuple[bool, bool]:
+        """
+        Fetch the playlist and queue its new segments. Returns whether new segments
+        appeared and whether the playlist ended.
+        """
+        fetched_at = time.time()
+        playlist = await self._fetch()
+        self._target_duration = playlist.target_duration
+        segments = playlist.segments
+        if not segments:
+            return False, playlist.ended
+
+        if self._last is not None and segments[-1].sequence < self._last.sequence:
+            log.warning(
+                "Live playlist media sequence went back, restarting",
+                url=self.url,
+                sequence=segments[-1].sequence,
+                last=self._last.sequence,
+            )
+            self._last = None
+
+        if self._last is None:
+            # Date segments from the reload time if the playlist has no date
+            end = fetched_at
+            for segment in reversed(segments):
+                if segment.start is None:
+                    segment.start = end - segment.duration
+                end = segment.start
+            new = segments
+        else:
+            new = [s for s in segments if s.sequence > self._last.sequence]
+            previous = self._last
+            for segment in new:
+                if segment.start is None:
+                    segment.start = previous.end
+                previous = segment
+
+        if new:
+            self._pending.extend(new)
+            self._last = new[-1]
+            self._changed_at = time.monotonic()
+        return bool(new), playlist.ended
+
+    async def _fetch(self) -> MediaPlaylist:
+        url = self._media_url or self.url
+        text = await self._get(url)
+        if self._media_url is None:
+            variant = select_variant(text, url)
+            if variant is not None:
+                log.info("Following live playlist variant", url=self.url, variant=variant)
+                url = variant
+                text = await self._get(url)
+            self._media_url = url
+        return parse_media_playlist(text, url)
+
+    @staticmethod
+    async def _get(url: str) -> str:
+        async with http_clients.archive.get(url) as response:
+            response.raise_for_status()
+            return await response.text()
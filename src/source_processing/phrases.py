@@ -0,0 +1,196 @@
+import asyncio
+import json
+import re
+from collections import deque
+from pathlib import Path
+
+from src import log, metrics
+from src.api.backend import BackendClient
+from src.config import settings
+from src.source_processing.constants import EXCLUDED_PHRASES
+
+# Phrases under this key apply to every language
+ALL_LANGUAGES = "*"
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    """
+    Normalizes text for phrase matching: case folding, ё -> е, punctuation and quotes
+    replaced with spaces, and repeated whitespace collapsed.
+    """
+    text = text.casefold().replace("ё", "е")
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher. Finds any of the patterns in a single pass over the text,
+    independently of the number of patterns.
+    """
+
+    def __init__(self, patterns: list[str]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # Index of a pattern ending in the state, including patterns reachable by fail links
+        self._output: list[int] = [-1]
+
+        for index, pattern in enumerate(patterns):
+            if pattern:
+                self._insert(pattern, index)
+        self._build()
+
+    def search(self, text: str) -> int | None:
+        """
+        Return the index of the first pattern found in the text, or None.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] >= 0:
+                return output[state]
+        return None
+
+    def _insert(self, pattern: str, index: int) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(-1)
+            state = next_state
+        if self._output[state] < 0:
+            self._output[state] = index
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] < 0:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+
+class PhraseFilter:
+    """
+    Matcher of excluded (hallucinated) phrases shared by all sources.
+
+    Phrases are grouped by language, phrases under `ALL_LANGUAGES` apply to every language.
+    A matcher is compiled once per language and replaced atomically when phrases are reloaded,
+    so running sources pick up new phrases without restarting.
+
+    Hits are counted per phrase in `trs_excluded_phrases_total`. Only configured phrases are
+    labelled, the counters of phrases removed by a reload are dropped.
+    """
+
+    def __init__(self, phrases: dict[str, list[str]]) -> None:
+        self._phrases: dict[str, list[str]] = {}
+        self._matchers: dict[str, tuple[list[str], AhoCorasick]] = {}
+        self._hits = {}
+        self.load(phrases)
+
+    @property
+    def hits(self) -> dict[str, int]:
+        """
+        Number of segments dropped per phrase since it was configured.
+        """
+        return {phrase: counter.value for phrase, counter in self._hits.items()}
+
+    def load(self, phrases: dict[str, list[str]]) -> None:
+        """
+        Replace the phrase lists.
+        """
+        self._phrases = {language.lower(): list(items) for language, items in phrases.items()}
+        self._matchers = {}
+
+        configured = {phrase for items in self._phrases.values() for phrase in items}
+        for phrase in self._hits.keys() - configured:
+            metrics.excluded_phrases.remove(phrase)
+        self._hits = {
+            phrase: self._hits.get(phrase) or metrics.excluded_phrases.labels(phrase)
+            for phrase in configured
+        }
+        log.info(
+            "Excluded phrases loaded",
+            count={language: len(items) for language, items in self._phrases.items()},
+        )
+
+    def match(self, text: str, language: str) -> str | None:
+        """
+        Return the excluded phrase found in the text, or None.
+        """
+        phrases, matcher = self._get_matcher(language.lower())
+        index = matcher.search(normalize(text))
+        if index is None:
+            return None
+        self._hits[phrases[index]].inc()
+        return phrases[index]
+
+    def _get_matcher(self, language: str) -> tuple[list[str], AhoCorasick]:
+        matcher = self._matchers.get(language)
+        if matcher is None:
+            phrases = self._phrases.get(ALL_LANGUAGES, [])
+            if language != ALL_LANGUAGES:
+                phrases = phrases + self._phrases.get(language, [])
+            matcher = (phrases, AhoCorasick([normalize(phrase) for phrase in phrases]))
+            self._matchers[language] = matcher
+        return matcher
+
+
+def parse_phrases(data: list | dict) -> dict[str, list[str]]:
+    """
+    Parses a phrase list: either a list of phrases for all languages or an object mapping
+    languages (or "*") to lists of phrases.
+    """
+    if isinstance(data, list):
+        return {ALL_LANGUAGES: [str(phrase) for phrase in data]}
+    if isinstance(data, dict):
+        return {
+            str(language): [str(phrase) for phrase in phrases] for language, phrases in data.items()
+        }
+    raise ValueError("Excluded phrases must be a list or an object of lists")
+
+
+async def reload_phrases(phrase_filter: PhraseFilter) -> None:
+    """
+    Periodically reloads excluded phrases from `EXCLUDED_PHRASES_FILE` (when it changes) or
+    from the backend `EXCLUDED_PHRASES_ENDPOINT`. Runs until cancelled.
+    """
+    path = Path(settings.EXCLUDED_PHRASES_FILE) if settings.EXCLUDED_PHRASES_FILE else None
+    backend_client = BackendClient() if settings.EXCLUDED_PHRASES_ENDPOINT else None
+    last_modified = None
+    last_data = None
+
+    while True:
+        try:
+            if path is not None:
+                modified = (await asyncio.to_thread(path.stat)).st_mtime
+                if modified != last_modified:
+                    text = await asyncio.to_thread(path.read_text, encoding="utf-8")
+                    phrase_filter.load(parse_phrases(json.loads(text)))
+                    last_modified = modified
+            elif backend_client is not None:
+                data = await backend_client.get_excluded_phrases()
+                if data != last_data:
+                    phrase_filter.load(parse_phrases(data))
+                    last_data = data
+        except Exception as e:
+            log.error("Error reloading excluded phrases", error=str(e))
+
+        await asyncio.sleep(settings.EXCLUDED_PHRASES_RELOAD_INTERVAL)
+
+
+phrase_filter = PhraseFilter({ALL_LANGUAGES: EXCLUDED_PHRASES})
@@ -0,0 +1,151 @@
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from src import log
+from src.config import settings
+
+# Upper bound for the weight multiplier given to sources lagging behind real time
+_MAX_LAG_BOOST = 4.0
+
+
+class TranscriptionScheduler:
+    """
+    Global scheduler for transcription requests of all sources.
+
+    At most `concurrency` requests run at once. Waiting requests are dispatched in weighted
+    fair queuing order: every request gets a virtual finish tag proportional to its audio
+    duration divided by the source weight, so each source receives its share of the service
+    regardless of how often it submits. Sources lagging behind real time get their weight
+    boosted and are served first.
+
+    When `queue_size` requests are already waiting, new submissions wait before being queued,
+    which pushes back on the pipelines of the sources instead of piling up requests that would
+    time out on the transcription service.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int) -> None:
+        self._concurrency = concurrency
+        self._queue_size = queue_size
+        self._active = 0
+        self._queue: list[tuple[float, int, asyncio.Future[None]]] = []
+        self._space_waiters: deque[asyncio.Future[None]] = deque()
+        self._virtual_time = 0.0
+        self._finish_tags: dict[int, float] = {}
+        self._counter = itertools.count()
+
+    @property
+    def active(self) -> int:
+        """
+        Number of requests currently being transcribed.
+        """
+        return self._active
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Max number of requests transcribed at once.
+        """
+        return self._concurrency
+
+    @concurrency.setter
+    def concurrency(self, concurrency: int) -> None:
+        self._concurrency = concurrency
+        self._dispatch()
+
+    @property
+    def pending(self) -> int:
+        """
+        Number of requests waiting for a free slot.
+        """
+        return len(self._queue)
+
+    @asynccontextmanager
+    async def slot(
+        self, source_id: int, cost: float, weight: float = 1.0, lag: float = 0.0
+    ) -> AsyncIterator[None]:
+        """
+        Waits for a transcription slot and holds it for the duration of the block.
+
+        Args:
+            source_id (int): Source submitting the request
+            cost (float): Audio duration of the request in seconds
+            weight (float): Relative share of the service for the source
+            lag (float): How far the source is behind real time in seconds
+        """
+        await self._acquire(source_id, cost, weight, lag)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, source_id: int, cost: float, weight: float, lag: float) -> None:
+        while len(self._queue) >= self._queue_size:
+            waiter = asyncio.get_running_loop().create_future()
+            self._space_waiters.append(waiter)
+            log.debug("Transcription queue is full, waiting", source_id=source_id)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_space_waiter()
+                raise
+
+        boost = 1.0 + min(lag / cost, _MAX_LAG_BOOST) if cost > 0 else 1.0
+        start_tag = max(self._virtual_time, self._finish_tags.get(source_id, 0.0))
+        finish_tag = start_tag + cost / (weight * boost)
+        self._finish_tags[source_id] = finish_tag
+
+        if self._active < self._concurrency and not self._queue:
+            self._active += 1
+            self._virtual_time = start_tag
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (finish_tag, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right before cancellation, pass it on
+                self._release()
+            else:
+                self._remove(future)
+            raise
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._queue and self._active < self._concurrency:
+            finish_tag, _, future = heapq.heappop(self._queue)
+            self._wake_space_waiter()
+            if future.done():
+                continue
+            self._virtual_time = finish_tag
+            self._active += 1
+            future.set_result(None)
+
+    def _remove(self, future: asyncio.Future[None]) -> None:
+        for i, (_, _, queued) in enumerate(self._queue):
+            if queued is future:
+                self._queue.pop(i)
+                heapq.heapify(self._queue)
+                self._wake_space_waiter()
+                break
+
+    def _wake_space_waiter(self) -> None:
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+
+transcription_scheduler = TranscriptionScheduler(
+    settings.TRANSCRIPTION_CONCURRENCY, settings.TRANSCRIPTION_QUEUE_SIZE
+)
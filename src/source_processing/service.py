@@ -1,30 +1,179 @@
 import asyncio
 import math
 import time
+from collections.abc import Awaitable, Callable
 from datetime import datetime, timezone
-from pathlib import Path
 
+import aiohttp
 from httpx import HTTPStatusError
 from yarl import URL
 
-from src import log
+from src import log, metrics
 from src.api import TranscriptionClient, get_video_from_archive
-from src.api.backend import BackendClient
+from src.api.backend import delivery_queue
 from src.api.backend.schemas import Source, Transcription, TranscriptionList
-from src.source_processing.constants import EXCLUDED_PHRASES
-from src.source_processing.utils import delete_file
+from src.api.spool import Spool
+from src.api.transcription.schemas import Segment, TranscriptionResult
+from src.config import settings
+from src.media import (
+    AudioTrack,
+    ChunkHealth,
+    demux_audio,
+    extract_audio,
+    inspect_chunk,
+    slice_from,
+)
+from src.source_processing.checkpoints import checkpoint_store
+from src.source_processing.chunk import Chunk, ChunkResult
+from src.source_processing.chunk_cache import chunk_cache, normalize_url
+from src.source_processing.hls import LivePlaylist, PlaylistSegment
+from src.source_processing.phrases import phrase_filter
+from src.source_processing.scheduler import transcription_scheduler
+from src.source_processing.stitching import TranscribedWindow
+from src.source_processing.timers import jitter_offset, timer_wheel
+
+_skipped_unavailable = metrics.skipped_chunks.labels("unavailable")
+_skipped_http_500 = metrics.skipped_chunks.labels("http_500")
+_skipped_error = metrics.skipped_chunks.labels("error")
 
 
 class SourceProcessing:
+    """
+    Processes a single source as a pipeline of stages connected by bounded queues:
+    download -> transcribe -> (stitch) -> publish.
+
+    The next archive window is downloaded while the current one is being transcribed,
+    and results are handed to the write-behind delivery queue, so the backend never blocks
+    the next transcription.
+
+    When the source lags behind real time by more than `CATCHUP_LAG_THRESHOLD` seconds,
+    it switches to catch-up mode: the backlog is split into larger overlapping windows that
+    are downloaded and transcribed concurrently, and the stitch stage merges their segments
+    back into the ordered stream. Normal cadence resumes once the backlog is consumed.
+
+    New source settings passed to `update()` are applied at the next chunk boundary without
+    losing the position of the source.
+
+    With `HLS_LIVE_ENABLED`, `.m3u8` sources are followed at the live edge: new segments of
+    the playlist are fetched as they appear and grouped into windows of `chunk_duration`
+    seconds, instead of waiting for archive windows to be complete. The archive is still used
+    to catch up, to fill the gap before the first live segment and whenever the playlist
+    is unavailable.
+
+    Sources pointing at the same stream, e.g. one per language, request each window at the
+    same time and share its download through the chunk cache, and sources of the same stream
+    and language share its transcription as well.
+    """
+
     def __init__(self, source: Source) -> None:
         self._chunk_duration = source.chunk_duration
         self._time = self._get_current_time()
         self._transcription_client = TranscriptionClient()
-        self._backend_client = BackendClient()
         self._source = source
-        self._excluded_phrases_lower = [p.lower() for p in EXCLUDED_PHRASES]
-        self._gap = 5
+        self._pending_source: Source | None = None
         self._next_time = None
+        self._committed: float | None = None
+        # Audio of the last window after its cut, the next window starts with it
+        self._tail: Chunk | None = None
+        self._transcribed_until: int | None = None
+        self._downloaded: asyncio.Queue[Chunk] = asyncio.Queue(settings.PIPELINE_QUEUE_SIZE)
+        self._transcribed: asyncio.Queue[ChunkResult] = asyncio.Queue(settings.PIPELINE_QUEUE_SIZE)
+        self._in_flight: asyncio.Queue[asyncio.Task[tuple[Chunk, TranscribedWindow | None]]] = (
+            asyncio.Queue(settings.CATCHUP_PARALLELISM)
+        )
+        self._catching_up = False
+        self._playlist = self._create_playlist(source)
+        self._last_digest: bytes | None = None
+        self._stream = self._get_stream(source)
+        self._offset = self._get_offset(self._stream, source)
+
+    @property
+    def queue_depths(self) -> dict[str, int]:
+        """
+        Number of items waiting in front of each pipeline stage.
+        """
+        return {
+            "transcribe": self._downloaded.qsize(),
+            "stitch": self._in_flight.qsize(),
+            "publish": self._transcribed.qsize(),
+        }
+
+    @property
+    def source(self) -> Source:
+        """
+        Latest settings of the source, including an update that has not been applied yet.
+        """
+        return self._pending_source or self._source
+
+    def update(self, source: Source) -> None:
+        """
+        Schedules new settings of the source. They take effect with the next downloaded window,
+        windows already downloaded are finished with the settings they were downloaded with.
+        """
+        self._pending_source = source
+
+    def _apply_update(self) -> None:
+        source, self._pending_source = self._pending_source, None
+        if source is None:
+            return
+        changes = {
+            name: value
+            for name, value in source.model_dump().items()
+            if getattr(self._source, name) != value
+        }
+        log.info("Source settings updated", source_id=self._source.id, changes=changes)
+        if source.url != self._source.url:
+            self._playlist = self._create_playlist(source)
+            # The new stream neither continues the kept audio nor repeats the last window
+            if self._tail is not None:
+                self._tail.data.close()
+                self._tail = None
+            self._last_digest = None
+        self._source = source
+        self._chunk_duration = source.chunk_duration
+        self._stream = self._get_stream(source)
+        self._offset = self._get_offset(self._stream, source)
+
+    @staticmethod
+    def _get_stream(source: Source) -> str:
+        """
+        Normalized archive URL of the source, shared by the sources of the same stream.
+        """
+        base_url = URL(source.url)
+        if base_url.suffix == ".m3u8":
+            base_url = base_url.with_name("")
+        return normalize_url(str(base_url))
+
+    @staticmethod
+    def _get_offset(stream: str, source: Source) -> float:
+        """
+        Delay of the source after each window becomes available, spread over
+        `CHUNK_JITTER` of the chunk period so that streams do not download at the same time.
+        Sources of the same stream share it, so they request each window together and
+        download it once.
+        """
+        return jitter_offset(stream, source.chunk_duration * settings.CHUNK_JITTER)
+
+    @staticmethod
+    def _create_playlist(source: Source) -> LivePlaylist | None:
+        if settings.HLS_LIVE_ENABLED and URL(source.url).suffix == ".m3u8":
+            return LivePlaylist(source.url)
+        return None
+
+    @property
+    def catching_up(self) -> bool:
+        """
+        Whether the source is working through a backlog in catch-up mode.
+        """
+        return self._catching_up
+
+    @property
+    def lag(self) -> int:
+        """
+        Seconds of archive the source has not transcribed yet beyond its normal trailing delay.
+        """
+        committed = self._next_time if self._next_time is not None else self._time
+        return max(0, self._get_current_time() - committed)
 
     def _get_current_time(self) -> int:
         """
@@ -45,110 +194,811 @@ class SourceProcessing:
 
         return str(base_url / f"archive-{timestamp}-{duration}.ts")
 
-    async def _iteration(self):
+    def _update_mode(self) -> None:
+        """
+        Switches to catch-up mode when the lag passes the threshold and back to normal cadence
+        when less than a catch-up window of backlog is left.
+        """
+        window = self._chunk_duration * settings.CATCHUP_WINDOW_FACTOR
+        backlog = self._get_current_time() - self._time
+
+        if not self._catching_up and self.lag > settings.CATCHUP_LAG_THRESHOLD:
+            if backlog >= window:
+                self._catching_up = True
+                log.info("Switching to catch-up mode", source_id=self._source.id, lag=self.lag)
+        elif self._catching_up and backlog < window:
+            self._catching_up = False
+            log.info("Caught up, switching to normal mode", source_id=self._source.id)
+
+    def _get_filename(self, timestamp: int, duration: int) -> str:
+        return f"{self._source.id}-{timestamp}-{duration}.ts"
+
+    async def _download(
+        self, timestamp: int, duration: int, inspect: bool = True
+    ) -> tuple[Spool | None, AudioTrack | None]:
         """
-        Performs a single iteration of processing a video chunk, including downloading,
-        transcribing, and sending the transcription result to the backend.
-        It also handles updating the next time to process based on the transcription results
-        and ensures that incomplete segments are not included in the final transcription
-        sent to the backend.
+        Downloads an archive window and returns it with the audio stream demuxed by the
+        inspection. The window is None if it is not available or, when `inspect` is set,
+        judged dead by the inspection.
         """
+        data = await self._download_window(timestamp, duration)
+        if data is None or not inspect:
+            return data, None
+        alive, track = await self._inspect(data, timestamp, duration)
+        if not alive:
+            data.close()
+            return None, None
+        return data, track
 
-        actual_start = self._next_time if self._next_time is not None else self._time
-        target_end_grid = self._time + self._chunk_duration
-        actual_duration = target_end_grid - actual_start
+    async def _download_window(self, timestamp: int, duration: int) -> Spool | None:
+        """
+        Downloads an archive window, or returns None if it is not available.
+        """
+        url = self.get_url(timestamp=timestamp, duration=duration)
+        name = self._get_filename(timestamp, duration)
+        started = time.perf_counter()
+        try:
+            data = await chunk_cache.download(url, lambda: self._fetch(url, name))
+        except RuntimeError:
+            log.warning(
+                "Video chunk not available, skipping",
+                url=url,
+                source_id=self._source.id,
+            )
+            _skipped_unavailable.inc()
+            return None
+        metrics.download_seconds.observe(time.perf_counter() - started)
+        return data
 
-        self._next_time = actual_start + actual_duration
+    async def _download_backlog_window(
+        self, timestamp: int, duration: int
+    ) -> tuple[Spool | None, ChunkHealth | None]:
+        """
+        Downloads and inspects a catch-up window. The health is None if the inspection is
+        disabled; whether the window repeats the previous one is left to `_judge`, in window
+        order, as catch-up windows are downloaded concurrently.
+        """
+        data = await self._download_window(timestamp, duration)
+        if data is None or not settings.TS_INSPECTION_ENABLED:
+            return data, None
+        health = await self._read_health(data, timestamp)
+        if health is None:
+            data.close()
+            return None, None
+        return data, health
 
-        filepath = Path("data/") / str(self._source.id) / f"{actual_start}-{actual_duration}.ts"
-        url = self.get_url(timestamp=actual_start, duration=actual_duration)
+    @staticmethod
+    async def _fetch(url: str, name: str) -> Spool:
+        """
+        Downloads a file from the archive, on behalf of every source of the stream.
+        """
+        data = await get_video_from_archive(url, name)
+        metrics.downloaded_bytes.inc(data.size)
+        return data
+
+    async def _inspect(
+        self, data: Spool, timestamp: int, duration: int
+    ) -> tuple[bool, AudioTrack | None]:
+        """
+        Checks that a downloaded window is worth transcribing: the stream is progressing, has
+        audio, is not corrupt and is not a copy of the previous window.
+        Returns the verdict and the audio stream of the window, demuxed on the way.
+        """
+        if not settings.TS_INSPECTION_ENABLED:
+            return True, None
+        health = await self._read_health(data, timestamp)
+        if health is None or not self._judge(health, timestamp, duration):
+            return False, None
+        return True, health.track
 
+    async def _read_health(self, data: Spool, timestamp: int) -> ChunkHealth | None:
+        """
+        Inspects a downloaded window. Returns None if it cannot be inspected, which counts
+        it as corrupt.
+        """
         try:
-            await get_video_from_archive(url, filepath)
+            return await inspect_chunk(data, self._source.language)
+        except Exception as e:
+            log.warning(
+                "Video chunk cannot be inspected, skipping",
+                source_id=self._source.id,
+                start=timestamp,
+                error=str(e) or type(e).__name__,
+            )
+            metrics.dead_chunks.labels(self._source.id, "corrupt").inc()
+            return None
 
-            log.debug("Transcribing...", start=actual_start, duration=actual_duration)
-            transcription_result = await self._transcription_client.transcribe(
-                filepath, language=self._source.language
+    def _judge(self, health: ChunkHealth, timestamp: int, duration: int) -> bool:
+        """
+        Returns whether an inspected window is alive, compared with the previous window of
+        the source. Dead windows are counted per source and reason.
+        """
+        reason = health.dead_reason(duration, self._last_digest)
+        self._last_digest = health.digest
+        if reason is None:
+            return True
+
+        log.warning(
+            "Dead video chunk, skipping",
+            source_id=self._source.id,
+            start=timestamp,
+            reason=reason,
+            packets=health.packets,
+            cc_errors=health.cc_errors,
+            pcr_seconds=health.pcr_seconds,
+            pts_seconds=health.pts_seconds,
+            audio_bytes=health.audio_bytes,
+        )
+        metrics.dead_chunks.labels(self._source.id, reason).inc()
+        return False
+
+    async def _download_stage(self) -> None:
+        """
+        Downloads consecutive archive windows of `chunk_duration` seconds as soon as
+        they are available in the archive.
+        """
+        while True:
+            self._apply_update()
+            self._update_mode()
+            if self._catching_up:
+                await self._download_backlog()
+                continue
+            if self._playlist is not None and await self._download_live():
+                continue
+
+            # Until `_get_current_time()` reaches the window, plus the offset of the source
+            await timer_wheel.sleep_until(self._time + self._chunk_duration * 3 // 2 + self._offset)
+
+            start_time_counter = time.perf_counter()
+            data, track = await self._download(self._time, self._chunk_duration)
+            log.debug(
+                "Chunk downloaded",
+                source_id=self._source.id,
+                start=self._time,
+                duration=time.perf_counter() - start_time_counter,
+                queue_depths=self.queue_depths,
+                sampled=True,
             )
-            log.debug("Transcription result", result=transcription_result)
 
-            valid_segments = []
+            await self._downloaded.put(
+                Chunk(
+                    self._time,
+                    self._chunk_duration,
+                    data,
+                    self._source.language,
+                    self._source.url,
+                    track=track,
+                )
+            )
+            self._time += self._chunk_duration
 
-            for segment in transcription_result.segments:
-                segment_text_lower = segment.text.lower()
+    async def _download_backlog(self) -> None:
+        """
+        Downloads the next catch-up windows concurrently. Each window is
+        `CATCHUP_WINDOW_FACTOR` chunks long and starts `CATCHUP_OVERLAP` seconds before the end
+        of the previous one, so segments cut at a window boundary are complete in the next one.
+        """
+        window = self._chunk_duration * settings.CATCHUP_WINDOW_FACTOR
+        overlap = settings.CATCHUP_OVERLAP
+        backlog = self._get_current_time() - self._time
+        count = max(1, min(settings.CATCHUP_PARALLELISM, backlog // window))
 
-                if any(phrase in segment_text_lower for phrase in self._excluded_phrases_lower):
-                    continue
+        starts = [self._time + i * window - overlap for i in range(count)]
+        downloads = await asyncio.gather(
+            *(self._download_backlog_window(start, window + overlap) for start in starts)
+        )
+        log.debug(
+            "Backlog windows downloaded",
+            source_id=self._source.id,
+            start=self._time,
+            count=count,
+            lag=self.lag,
+            queue_depths=self.queue_depths,
+            sampled=True,
+        )
 
-                if actual_duration - segment.end >= self._gap:
-                    segment.start += actual_start
-                    segment.end += actual_start
-                    valid_segments.append(segment)
+        for start, (data, health) in zip(starts, downloads, strict=True):
+            track = None
+            if health is not None:
+                # Judged in window order, for the repeat check to compare neighbours
+                if self._judge(health, start, window + overlap):
+                    track = health.track
                 else:
-                    log.debug(
-                        f"Skipping incomplete segment ending at {segment.end} "
-                        f"(duration: {actual_duration})"
-                    )
+                    data.close()
+                    data = None
+            await self._downloaded.put(
+                Chunk(
+                    start,
+                    window + overlap,
+                    data,
+                    self._source.language,
+                    self._source.url,
+                    independent=True,
+                    track=track,
+                )
+            )
+        self._time += count * window
+
+    async def _download_live(self) -> bool:
+        """
+        Downloads the next live window from the segments of the playlist. Returns False if
+        the playlist is unavailable, for the window to be downloaded from the archive instead.
+        """
+        try:
+            segments = await self._playlist.next_batch(self._time, self._chunk_duration)
+        except (aiohttp.ClientError, TimeoutError, ValueError, EOFError) as e:
+            log.warning(
+                "Live playlist unavailable, using the archive",
+                source_id=self._source.id,
+                error=str(e) or type(e).__name__,
+            )
+            return False
+
+        start = round(segments[0].start)
+        if start > self._time:
+            # Audio between the archive position and the oldest live segment
+            gap = start - self._time
+            log.info("Filling the gap before the live edge", source_id=self._source.id, gap=gap)
+            data, track = await self._download(self._time, gap)
+            await self._downloaded.put(
+                Chunk(self._time, gap, data, self._source.language, self._source.url, track=track)
+            )
 
-            if valid_segments:
-                self._next_time = math.floor(valid_segments[-1].end)
-
-                transcription = TranscriptionList(
-                    transcriptions=[
-                        Transcription(
-                            start=math.floor(s.start),
-                            end=math.ceil(s.end),
-                            text=s.text,
-                        )
-                        for s in valid_segments
-                    ],
+        duration = max(1, round(segments[-1].end) - start)
+        data, track = await self._download_segments(segments, start, duration)
+        log.debug(
+            "Live window downloaded",
+            source_id=self._source.id,
+            start=start,
+            segments=len(segments),
+            first_sequence=segments[0].sequence,
+            delay=round(time.time() - segments[-1].end, 3),
+            queue_depths=self.queue_depths,
+            sampled=True,
+        )
+        await self._downloaded.put(
+            Chunk(
+                start,
+                duration,
+                data,
+                self._source.language,
+                self._source.url,
+                live=True,
+                track=track,
+            )
+        )
+        self._time = start + duration
+        return True
+
+    async def _download_segments(
+        self, segments: list[PlaylistSegment], start: int, duration: int
+    ) -> tuple[Spool | None, AudioTrack | None]:
+        """
+        Downloads live segments concurrently and joins them into a single window. If one of
+        them cannot be downloaded, the window is downloaded from the archive instead.
+        """
+        name = self._get_filename(start, duration)
+        started = time.perf_counter()
+        parts = await asyncio.gather(
+            *(
+                chunk_cache.download(segment.url, lambda url=segment.url: self._fetch(url, name))
+                for segment in segments
+            ),
+            return_exceptions=True,
+        )
+        try:
+            if any(isinstance(part, BaseException) for part in parts):
+                log.warning(
+                    "Live segment not available, using the archive",
+                    source_id=self._source.id,
+                    start=start,
                 )
+                return await self._download(start, duration)
 
-                log.debug(
-                    "Sending transcription result",
-                    count=len(valid_segments),
-                    source_id=self._source.id
+            data = Spool(name)
+            try:
+                for part in parts:
+                    await data.write_from(part)
+            except BaseException:
+                data.close()
+                raise
+        finally:
+            for part in parts:
+                if isinstance(part, Spool):
+                    part.close()
+
+        metrics.download_seconds.observe(time.perf_counter() - started)
+        alive, track = await self._inspect(data, start, duration)
+        if not alive:
+            data.close()
+            return None, None
+        return data, track
+
+    async def transcribe_archive_window(
+        self, start: int, duration: int
+    ) -> TranscribedWindow | None:
+        """
+        Downloads and transcribes an archive window on its own, outside of the pipeline.
+        Returns None if the window could not be downloaded or transcribed.
+        """
+        data, track = await self._download(start, duration)
+        if data is None:
+            return None
+        with data:
+            return await self._transcribe_window(
+                data, start, duration, self._source.language, track
+            )
+
+    async def _transcribe_stage(self) -> None:
+        """
+        Transcribes downloaded windows in order and hands valid segments to the publish stage.
+        Catch-up windows do not depend on the previous result, so they are transcribed
+        concurrently and handed to the stitch stage instead.
+        """
+        while True:
+            chunk = await self._downloaded.get()
+            if chunk.independent:
+                task = asyncio.create_task(
+                    self._transcribe_independent(chunk),
+                    name=f"source-{self._source.id}-window-{chunk.start}",
                 )
-                await self._backend_client.send_transcription_result(
+                await self._in_flight.put(task)
+                continue
+
+            # Continuing from the previous window requires every catch-up window to be stitched
+            await self._in_flight.join()
+
+            start_time_counter = time.perf_counter()
+            try:
+                transcription = await self._transcribe_chunk(chunk)
+            finally:
+                if chunk.data is not None:
+                    chunk.data.close()
+            await self._transcribed.put(ChunkResult(self._next_time, transcription))
+
+            log.info(
+                "Duration execution",
+                source_id=self._source.id,
+                duration=time.perf_counter() - start_time_counter,
+                lag=self.lag,
+                queue_depths=self.queue_depths,
+                sampled=True,
+            )
+
+    async def _transcribe_independent(self, chunk: Chunk) -> tuple[Chunk, TranscribedWindow | None]:
+        """
+        Transcribes a catch-up window on its own.
+        """
+        if chunk.data is None:
+            return chunk, None
+        try:
+            return chunk, await self._transcribe_window(
+                chunk.data, chunk.start, chunk.duration, chunk.language, chunk.track
+            )
+        finally:
+            chunk.data.close()
+
+    async def _stitch_stage(self) -> None:
+        """
+        Merges concurrently transcribed catch-up windows back into the ordered stream.
+        Segments that start before the position committed by the previous window were
+        already covered by it and are dropped.
+        """
+        while True:
+            task = await self._in_flight.get()
+            try:
+                start_time_counter = time.perf_counter()
+                chunk, window = await task
+
+                committed = self._committed if self._committed is not None else chunk.start
+                if chunk.start > committed:
+                    # Only speech cut at the end of the previous window can be lost here
+                    log.debug(
+                        "Catch-up window starts after the committed position",
+                        source_id=self._source.id,
+                        uncovered=chunk.start - committed,
+                    )
+
+                transcription = None
+                if window is None:
+                    self._commit(chunk.end)
+                else:
+                    self._count_redundant(window)
+                    cut = window.cut_point(committed)
+                    segments = window.take(committed, cut)
+                    self._commit(cut)
+                    if segments:
+                        transcription = self.to_transcription(segments)
+
+                await self._transcribed.put(ChunkResult(self._next_time, transcription))
+                log.info(
+                    "Duration execution",
                     source_id=self._source.id,
-                    transcription=transcription,
+                    duration=time.perf_counter() - start_time_counter,
+                    lag=self.lag,
+                    catching_up=True,
+                    queue_depths=self.queue_depths,
+                    sampled=True,
                 )
+            finally:
+                self._in_flight.task_done()
+
+    async def _prepend_tail(
+        self, chunk: Chunk, actual_start: int, tail: Chunk | None
+    ) -> tuple[Spool, int, AudioTrack | None]:
+        """
+        Prepends the tail of the previous window that was cut off to the chunk. The tail
+        kept from the previous window is used if it fits, otherwise it is downloaded, except
+        for live windows, which the archive does not have yet, and windows of a URL the source
+        no longer has.
+        MPEG-TS is packet framed, so consecutive windows can be joined byte-wise.
+
+        Returns the audio to transcribe, its start time and its audio stream, if known
+        without demuxing the joined audio again. If the tail is not available, the chunk is
+        returned unchanged. Closes `tail`.
+        """
+        if tail is not None and (
+            tail.start != actual_start or tail.end != chunk.start or tail.url != chunk.url
+        ):
+            tail.data.close()
+            tail = None
+        if actual_start >= chunk.start:
+            return chunk.data, chunk.start, chunk.track
+
+        track = None
+        if tail is not None:
+            data = tail.data
+            if tail.track is not None and chunk.track is not None:
+                track = tail.track.join(chunk.track)
+        elif chunk.live or chunk.url != self._source.url:
+            log.debug(
+                "No tail kept for the window",
+                source_id=self._source.id,
+                start=chunk.start,
+                uncovered=chunk.start - actual_start,
+            )
+            return chunk.data, chunk.start, chunk.track
+        else:
+            data, _ = await self._download(actual_start, chunk.start - actual_start, inspect=False)
+            if data is None:
+                return chunk.data, chunk.start, chunk.track
+
+        with data:
+            audio = Spool(self._get_filename(actual_start, chunk.end - actual_start))
+            try:
+                await audio.write_from(data)
+                await audio.write_from(chunk.data)
+            except BaseException:
+                audio.close()
+                raise
+        return audio, actual_start, track
+
+    async def _keep_tail(
+        self, audio: Spool, actual_start: int, chunk: Chunk, track: AudioTrack | None
+    ) -> None:
+        """
+        Keeps the audio of a window after its cut, which the next window continues from,
+        so that it is not downloaded again. If the audio stream of the window is known,
+        the one of the tail is demuxed as well, for the next window to reuse both.
+        """
+        if self._next_time >= chunk.end:
+            return
+        data = await slice_from(audio, self._next_time - actual_start, chunk.language)
+        if data is None:
+            return
+        if track is not None:
+            track = await demux_audio(data, chunk.language)
+        self._tail = Chunk(
+            self._next_time,
+            chunk.end - self._next_time,
+            data,
+            chunk.language,
+            chunk.url,
+            track=track,
+        )
+
+    async def _transcribe_chunk(self, chunk: Chunk) -> TranscriptionList | None:
+        """
+        Transcribes a window starting where the previous one stopped and ending at the end
+        of the downloaded chunk. It also handles updating the next time to process based on
+        the transcription results.
+        """
+        actual_start = self._next_time if self._next_time is not None else chunk.start
+        actual_start = min(actual_start, chunk.start)
+
+        committed = self._committed
+        self._commit(chunk.end)
+        tail, self._tail = self._tail, None
+
+        if chunk.data is None:
+            if tail is not None:
+                tail.data.close()
+            return None
+
+        audio, actual_start, track = await self._prepend_tail(chunk, actual_start, tail)
+        try:
+            window = await self._transcribe_window(
+                audio, actual_start, chunk.end - actual_start, chunk.language, track
+            )
+            if window is None:
+                return None
+
+            self._count_redundant(window)
+            cut = window.cut_point(committed)
+            segments = window.take(committed, cut)
+            self._commit(cut)
+            await self._keep_tail(audio, actual_start, chunk, track)
+        finally:
+            if audio is not chunk.data:
+                audio.close()
+
+        if not segments:
+            return None
+        return self.to_transcription(segments)
+
+    def _commit(self, position: float) -> None:
+        """
+        Records the position up to which the source was transcribed. The next window starts
+        at the second it falls into and drops what it transcribes again before it.
+        """
+        self._committed = position
+        self._next_time = math.floor(position)
+
+    def _count_redundant(self, window: TranscribedWindow) -> None:
+        """
+        Counts the audio of a window that was already transcribed as part of the previous one.
+        """
+        if self._transcribed_until is not None and self._transcribed_until > window.start:
+            redundant = min(window.end, self._transcribed_until) - window.start
+            metrics.redundant_audio_seconds.labels(self._source.id).inc(redundant)
+        self._transcribed_until = window.end
+
+    async def _transcribe_window(
+        self,
+        audio: Spool,
+        actual_start: int,
+        actual_duration: int,
+        language: str,
+        track: AudioTrack | None = None,
+    ) -> TranscribedWindow | None:
+        """
+        Transcribes a window and returns its segments and word timings with absolute
+        timestamps, or None if the window could not be transcribed. Excluded phrases
+        are dropped. `track` is the audio stream of the window if it was already demuxed.
+        """
+        lag = self.lag
+
+        try:
+            # Sources of the same stream and language transcribe the same audio once
+            transcription_result = await chunk_cache.transcription(
+                (self._stream, actual_start, actual_duration, language),
+                lambda: self._request_transcription(
+                    audio, actual_start, actual_duration, language, lag, track
+                ),
+            )
+            log.debug(
+                "Transcription result",
+                source_id=self._source.id,
+                segments=len(transcription_result.segments),
+                sampled=True,
+            )
+
+            started = time.perf_counter()
+            segments = []
+
+            for segment in transcription_result.segments:
+                phrase = phrase_filter.match(segment.text, language)
+                if phrase is not None:
+                    log.debug(
+                        "Skipping excluded phrase",
+                        phrase=phrase,
+                        source_id=self._source.id,
+                        sampled=True,
+                    )
+                    continue
+
+                segment.start += actual_start
+                segment.end += actual_start
+                segments.append(segment)
+
+            words = transcription_result.words
+            if words is not None:
+                words.shift(actual_start)
+
+            metrics.filtering_seconds.observe(time.perf_counter() - started)
+            return TranscribedWindow(actual_start, actual_duration, segments, words)
 
         except HTTPStatusError as e:
             if e.response.status_code == 500:
                 log.warning(
                     "Video chunk not available (HTTP 500), skipping",
-                    url=url,
+                    start=actual_start,
                     source_id=self._source.id,
                 )
+                _skipped_http_500.inc()
             else:
                 log.error(
-                    "HTTP error while fetching video chunk",
+                    "HTTP error while transcribing video chunk",
                     error=str(e),
-                    url=url,
+                    start=actual_start,
                     source_id=self._source.id,
                     status_code=e.response.status_code,
                 )
+                _skipped_error.inc()
         except Exception as e:
             log.error("Error processing chunk", error=e, source_id=self._source.id)
+            _skipped_error.inc()
+
+        return None
+
+    async def _request_transcription(
+        self,
+        audio: Spool,
+        actual_start: int,
+        actual_duration: int,
+        language: str,
+        lag: int,
+        track: AudioTrack | None,
+    ) -> TranscriptionResult:
+        """
+        Uploads a window to the transcription service once a scheduler slot is granted.
+        Takes its own reference to `audio` once it runs, so that a request cancelled before
+        it started, e.g. shared by sources that all stopped waiting, holds none.
+        """
+        audio = audio.retain()
+        upload = audio
+        try:
+            if settings.AUDIO_DEMUX_ENABLED:
+                # Upload only the audio elementary stream, fall back to the full chunk
+                if track is None:
+                    upload = await extract_audio(audio, language) or audio
+                elif track.data:
+                    upload = await track.to_spool(audio.name)
+
+            async with transcription_scheduler.slot(self._source.id, cost=actual_duration, lag=lag):
+                log.debug(
+                    "Transcribing...",
+                    source_id=self._source.id,
+                    start=actual_start,
+                    duration=actual_duration,
+                    sampled=True,
+                )
+                started = time.perf_counter()
+                transcription_result = await self._transcription_client.transcribe(
+                    upload,
+                    language=language,
+                    words=settings.STITCH_WORD_TIMINGS,
+                    duration=actual_duration,
+                )
+                metrics.transcription_seconds.observe(time.perf_counter() - started)
+                metrics.uploaded_bytes.inc(upload.size)
+            return transcription_result
         finally:
-            if filepath.exists():
-                await delete_file(filepath)
+            if upload is not audio:
+                upload.close()
+            audio.close()
 
-    async def process(self) -> None:
+    @staticmethod
+    def to_transcription(segments: list[Segment]) -> TranscriptionList:
         """
-        Main processing loop that continuously processes video chunks
-        based on the specified chunk duration.
+        Converts segments to the transcription list sent to the backend.
+        """
+        return TranscriptionList(
+            transcriptions=[
+                Transcription(
+                    start=math.floor(s.start),
+                    end=math.ceil(s.end),
+                    text=s.text,
+                )
+                for s in segments
+            ],
+        )
+
+    async def _publish_stage(self) -> None:
+        """
+        Hands transcriptions over to the backend delivery queue in the order they were produced
+        and commits the position to continue from after a restart.
         """
         while True:
-            start_time_counter = time.perf_counter()
-            await self._iteration()
-            end_time_counter = time.perf_counter()
+            result = await self._transcribed.get()
+            if result.transcription is not None:
+                log.debug(
+                    "Publishing transcription result",
+                    count=len(result.transcription.transcriptions),
+                    source_id=self._source.id,
+                    queue_depths=self.queue_depths,
+                    sampled=True,
+                )
+                await delivery_queue.submit(self._source.id, result.transcription)
 
-            duration_execution = end_time_counter - start_time_counter
-            log.info("Duration execution", duration=duration_execution)
+            # The result is journaled, it is safe to resume after it
+            await checkpoint_store.save(self._source.id, result.next_time)
 
-            self._time += self._chunk_duration
-            cur_time = self._get_current_time()
-            if cur_time - self._time < 0:
-                await asyncio.sleep(self._time - cur_time)
+    async def _restore(self) -> None:
+        """
+        Resumes from the committed checkpoint of the source, if any, so that windows between
+        a shutdown and a restart are caught up. Never goes back further than
+        `CHECKPOINT_MAX_LOOKBACK` seconds.
+        """
+        checkpoint = await checkpoint_store.load(self._source.id)
+        if checkpoint is None:
+            return
+
+        earliest = self._get_current_time() - settings.CHECKPOINT_MAX_LOOKBACK
+        if checkpoint < earliest:
+            log.warning(
+                "Checkpoint is older than the max lookback, skipping the gap",
+                source_id=self._source.id,
+                checkpoint=checkpoint,
+                skipped=earliest - checkpoint,
+            )
+            checkpoint = earliest
+
+        log.info("Resuming from checkpoint", source_id=self._source.id, checkpoint=checkpoint)
+        self._time = checkpoint
+        self._next_time = None
+        self._committed = None
+
+    async def _run_stage(self, stage: str, run: Callable[[], Awaitable[None]]) -> None:
+        """
+        Runs a pipeline stage and restarts it after an unexpected error, so that a failing
+        window or a transient database error does not stop the source. The stages keep their
+        position on the source and continue from it; the item being processed is lost.
+        Restarts are delayed from `STAGE_RESTART_DELAY` seconds, doubling while the stage
+        keeps failing.
+        """
+        delay = settings.STAGE_RESTART_DELAY
+        while True:
+            started = time.monotonic()
+            try:
+                await run()
+            except Exception:
+                if time.monotonic() - started > settings.STAGE_RESTART_MAX_DELAY:
+                    # The stage recovered since it last failed
+                    delay = settings.STAGE_RESTART_DELAY
+                log.exception(
+                    "Pipeline stage failed, restarting",
+                    source_id=self._source.id,
+                    stage=stage,
+                    delay=delay,
+                )
+                metrics.stage_failures.labels(self._source.id, stage).inc()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, settings.STAGE_RESTART_MAX_DELAY)
+
+    async def process(self) -> None:
+        """
+        Main processing loop that continuously processes video chunks
+        based on the specified chunk duration.
+        """
+        await self._restore()
+        metrics.source_lag_seconds.labels(self._source.id).set_function(lambda: self.lag)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                stages = {
+                    "download": self._download_stage,
+                    "transcribe": self._transcribe_stage,
+                    "stitch": self._stitch_stage,
+                    "publish": self._publish_stage,
+                }
+                for stage, run in stages.items():
+                    tg.create_task(
+                        self._run_stage(stage, run), name=f"source-{self._source.id}-{stage}"
+                    )
+        finally:
+            for metric in (
+                metrics.source_lag_seconds,
+                metrics.dead_chunks,
+                metrics.redundant_audio_seconds,
+                metrics.stage_failures,
+            ):
+                metric.remove(self._source.id)
+            if self._tail is not None:
+                self._tail.data.close()
+                self._tail = None
+            while not self._in_flight.empty():
+                self._in_flight.get_nowait().cancel()
+            while not self._downloaded.empty():
+                chunk = self._downloaded.get_nowait()
+                if chunk.data is not None:
+                    chunk.data.close()
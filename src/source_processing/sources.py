@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field
+
+from src import log
+from src.api.backend import BackendClient
+from src.api.backend.schemas import Source
+from src.config import settings
+
+
+@dataclass
+class SourceDiff:
+    """
+    Difference between two snapshots of the enabled sources.
+    """
+
+    added: list[Source] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+    changed: list[Source] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_sources(current: dict[int, Source], sources: list[Source]) -> SourceDiff:
+    """
+    Compares the enabled sources in `sources` with `current`. Disabled sources count as removed.
+    """
+    enabled = {source.id: source for source in sources if not source.disabled}
+    diff = SourceDiff(removed=[source_id for source_id in current if source_id not in enabled])
+    for source_id, source in enabled.items():
+        previous = current.get(source_id)
+        if previous is None:
+            diff.added.append(source)
+        elif previous != source:
+            diff.changed.append(source)
+    return diff
+
+
+class SourceWatcher:
+    """
+    Polls the backend for the source list with conditional requests and reports what changed
+    since the previous poll.
+
+    The poll interval adapts to the rate of changes: it drops to `SOURCES_POLL_MIN_INTERVAL`
+    after a change and grows by `SOURCES_POLL_BACKOFF` with every unchanged poll (or error)
+    up to `SOURCES_POLL_MAX_INTERVAL`.
+    """
+
+    def __init__(self, backend_client: BackendClient) -> None:
+        self._backend_client = backend_client
+        self._sources: dict[int, Source] = {}
+        self._etag: str | None = None
+        self._interval = settings.SOURCES_POLL_MIN_INTERVAL
+
+    @property
+    def sources(self) -> dict[int, Source]:
+        """
+        Enabled sources as of the last successful poll.
+        """
+        return self._sources
+
+    @property
+    def interval(self) -> float:
+        """
+        Seconds to wait before the next poll.
+        """
+        return self._interval
+
+    async def poll(self) -> SourceDiff:
+        """
+        Fetch the source list if it changed and return the difference to the previous one.
+        """
+        try:
+            source_list, self._etag = await self._backend_client.get_sources_if_changed(self._etag)
+        except Exception:
+            self._back_off()
+            raise
+
+        if source_list is None:
+            log.debug("Sources not modified", etag=self._etag)
+            self._back_off()
+            return SourceDiff()
+
+        diff = diff_sources(self._sources, source_list.sources)
+        self._sources = {source.id: source for source in source_list.sources if not source.disabled}
+        if diff:
+            self._interval = settings.SOURCES_POLL_MIN_INTERVAL
+        else:
+            self._back_off()
+        return diff
+
+    def _back_off(self) -> None:
+        self._interval = min(
+            self._interval * settings.SOURCES_POLL_BACKOFF, settings.SOURCES_POLL_MAX_INTERVAL
+        )
@@ -0,0 +1,128 @@
+import math
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import pairwise
+
+from src.api.transcription.schemas import Segment, WordTimings
+from src.config import settings
+
+# Without word timings, segments ending this close to the end of a window may be cut off, seconds
+_SEGMENT_MARGIN = 5
+# Min audio published by a window cut before its first word, seconds
+_MIN_PROGRESS = 1.0
+
+
+def _middle(segment: Segment) -> float:
+    return (segment.start + segment.end) / 2
+
+
+@dataclass
+class TranscribedWindow:
+    """
+    Transcription of an archive window with absolute timestamps.
+
+    `words` are the word timings returned with the segments, None if the transcription service
+    returned none. Segments of excluded phrases are already dropped.
+
+    Consecutive windows overlap, so each one is cut at a point before its end and the next one
+    continues from there: `cut_point()` chooses it and `take()` returns the segments between
+    the previous cut and this one. With word timings, the cut is a pause after a confidently
+    aligned word, a segment running over it is split at that word, and every word belongs
+    to the window its middle falls into, so words on a boundary are neither lost
+    nor published twice.
+    """
+
+    start: int
+    duration: int
+    segments: list[Segment]
+    words: WordTimings | None = None
+
+    def __post_init__(self) -> None:
+        if self.words is None:
+            return
+        words = self.words
+        pairs = zip(words.starts, words.ends, strict=True)
+        self._middles = [(start + end) / 2 for start, end in pairs]
+        if any(a > b for a, b in pairwise(self._middles)):
+            order = sorted(range(len(words)), key=self._middles.__getitem__)
+            words.reorder(order)
+            self._middles = [self._middles[i] for i in order]
+
+    @property
+    def end(self) -> int:
+        return self.start + self.duration
+
+    def cut_point(self, since: float | None = None) -> float:
+        """
+        Returns the time up to which the window can be published, the next window continues
+        from it. Speech published by the previous window, before `since`, is not cut at again.
+        """
+        if not self.words:
+            if self.words is None:
+                complete = [s for s in self.segments if self.end - s.end >= _SEGMENT_MARGIN]
+                if complete:
+                    return complete[-1].end
+            return self.end
+
+        starts, ends, scores = self.words.starts, self.words.ends, self.words.scores
+        base = max(self.start, since) if since is not None else self.start
+        limit = self.end - settings.STITCH_WORD_MARGIN
+        cut = fallback = None
+        for i, end in enumerate(ends):
+            if end > limit or end <= base or scores[i] < settings.STITCH_MIN_WORD_SCORE:
+                continue
+            following = starts[i + 1] if i + 1 < len(starts) else limit
+            pause = max(0.0, min(following, limit) - end)
+            if pause >= settings.STITCH_MIN_PAUSE:
+                cut = end + pause / 2
+            fallback = end + pause / 2
+        if cut is not None or fallback is not None:
+            return cut if cut is not None else fallback
+
+        # No complete word to cut after: carry the speech over to the next window
+        first = bisect_left(self._middles, base)
+        if first < len(starts) and starts[first] - base >= 2 * _MIN_PROGRESS:
+            return (base + starts[first]) / 2
+        return self.end
+
+    def take(self, since: float | None, until: float) -> list[Segment]:
+        """
+        Returns the segments of the window between the cut of the previous window `since`
+        and the cut of this one `until`.
+        """
+        if self.words is None:
+            if since is None:
+                return [s for s in self.segments if s.end <= until]
+            # The window may start within the last segment published, whose rest comes back
+            # as a segment of its own with its middle before the cut
+            low = since - settings.CATCHUP_TOLERANCE
+            return [
+                s
+                for s in self.segments
+                if s.start >= low and _middle(s) >= since and s.end <= until
+            ]
+
+        low = since if since is not None else -math.inf
+        middles = self._middles
+        segments = []
+        for segment in self.segments:
+            first = bisect_left(middles, segment.start)
+            last = bisect_left(middles, segment.end, first)
+            if first == last:
+                if low <= _middle(segment) < until:
+                    segments.append(segment)
+                continue
+
+            kept = [i for i in range(first, last) if low <= middles[i] < until]
+            if len(kept) == last - first:
+                segments.append(segment)
+            elif kept:
+                segments.append(
+                    Segment(
+                        number=segment.number,
+                        start=self.words.starts[kept[0]],
+                        end=self.words.ends[kept[-1]],
+                        text=" ".join(self.words.words[i].strip() for i in kept),
+                    )
+                )
+        return segments
@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import math
+import time
+
+# Tick length of the wheel, seconds
+_RESOLUTION = 0.1
+# Slots of the wheel, deadlines further than one turn ahead stay in their slot for more turns
+_SLOTS = 1024
+
+
+def jitter_offset(key: int | str, period: float) -> float:
+    """
+    Deterministic offset in [0, period) derived from `key`, so that timers of different keys
+    are spread over the period while each key keeps the same offset across restarts.
+    """
+    digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64 * period
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel waking coroutines at wall-clock deadlines.
+
+    All timers share a single driver task, which runs only while timers are pending. Each
+    tick is aligned to wall-clock time instead of adding up sleep durations, so the error of
+    `asyncio.sleep` does not accumulate however long the service runs, and timers follow
+    adjustments of the system clock.
+    """
+
+    def __init__(self, resolution: float = _RESOLUTION, slots: int = _SLOTS) -> None:
+        self._resolution = resolution
+        self._slots: list[list[tuple[float, asyncio.Future[None]]]] = [[] for _ in range(slots)]
+        self._pending = 0
+        self._driver: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def sleep_until(self, deadline: float) -> None:
+        """
+        Sleep until the Unix time `deadline`, returning at most one tick late.
+        """
+        if deadline <= time.time():
+            return
+        future = asyncio.get_running_loop().create_future()
+        tick = math.ceil(deadline / self._resolution)
+        self._slots[tick % len(self._slots)].append((deadline, future))
+        self._pending += 1
+        if self._driver is None:
+            self._driver = asyncio.create_task(self._drive())
+        try:
+            await future
+        finally:
+            if not future.done() or future.cancelled():
+                # Dropped from its slot when the driver visits it
+                future.cancel()
+                self._pending -= 1
+
+    async def _drive(self) -> None:
+        try:
+            last = math.floor(time.time() / self._resolution)
+            while self._pending:
+                current = math.floor(time.time() / self._resolution)
+                if current < last:
+                    # The clock went back, visit the slots again from the new time
+                    last = current - 1
+                for tick in range(last + 1, min(current, last + len(self._slots)) + 1):
+                    self._fire(tick % len(self._slots))
+                last = current
+                await asyncio.sleep(max(0.0, (current + 1) * self._resolution - time.time()))
+        finally:
+            self._driver = None
+
+    def _fire(self, slot: int) -> None:
+        now = time.time()
+        remaining = []
+        for deadline, future in self._slots[slot]:
+            if future.done():
+                continue
+            if deadline <= now:
+                future.set_result(None)
+                self._pending -= 1
+            else:
+                remaining.append((deadline, future))
+        self._slots[slot] = remaining
+
+
+timer_wheel = TimerWheel()
@@ -0,0 +1,8 @@
+import os
+
+# Required settings, before anything imports `src.config`
+os.environ.setdefault("TRANSCRIPTION_BASE_URL", "http://transcription.test")
+os.environ.setdefault("TRANSCRIPTION_USERNAME", "user")
+os.environ.setdefault("TRANSCRIPTION_PASSWORD", "password")
+os.environ.setdefault("BACKEND_BASE_URL", "http://backend.test")
+os.environ.setdefault("BACKEND_API_KEY", "key")
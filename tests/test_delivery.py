@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.api.backend import delivery
+from src.api.backend.delivery import DeliveryQueue
+from src.api.backend.schemas import Transcription, TranscriptionList
+
+
+class Backend:
+    """
+    Records the transcriptions delivered, deliveries of `failing` sources fail.
+    """
+
+    def __init__(self, failing: set[int] = frozenset()) -> None:
+        self.failing = failing
+        self.delivered: list[tuple[int, str]] = []
+
+    async def send_transcription_result(
+        self, source_id: int, transcription: TranscriptionList
+    ) -> None:
+        if source_id in self.failing:
+            raise httpx.ConnectError("Backend unavailable")
+        self.delivered += [(source_id, t.text) for t in transcription.transcriptions]
+
+
+def result(text: str) -> TranscriptionList:
+    return TranscriptionList(transcriptions=[Transcription(start=0, end=1, text=text)])
+
+
+@pytest.fixture
+def deliver(tmp_path, monkeypatch):
+    """
+    Delivers results to a backend through a queue journaled in a temporary directory, then
+    closes it the way the service does on shutdown. The journal outlives the queue.
+    """
+
+    def deliver(backend: Backend, results, compact_size: int = 1 << 20) -> None:
+        monkeypatch.setattr(delivery, "BackendClient", lambda: backend)
+        asyncio.run(run(tmp_path, results, compact_size))
+
+    return deliver
+
+
+async def run(journal_dir, results, compact_size: int) -> None:
+    queue = DeliveryQueue(
+        journal_dir,
+        batch_size=2,
+        flush_interval=0.01,
+        max_backoff=60.0,
+        compact_size=compact_size,
+        drain_timeout=0.5,
+    )
+    async with queue:
+        for source_id, text in results:
+            await queue.submit(source_id, result(text))
+
+
+def test_undelivered_results_are_replayed_in_order(deliver, tmp_path):
+    results = [(1, "a1"), (2, "b1"), (1, "a2"), (2, "b2"), (2, "b3")]
+    first = Backend(failing={2})
+    deliver(first, results)
+    assert first.delivered == [(1, "a1"), (1, "a2")]
+
+    second = Backend()
+    deliver(second, [])
+    assert second.delivered == [(2, "b1"), (2, "b2"), (2, "b3")]
+
+    # Everything was delivered, nothing is replayed again
+    third = Backend()
+    deliver(third, [])
+    assert third.delivered == []
+    assert (tmp_path / "journal.jsonl").stat().st_size == 0
+
+
+def test_torn_journal_record_is_skipped(deliver, tmp_path):
+    deliver(Backend(failing={1}), [(1, "a1"), (1, "a2")])
+    with open(tmp_path / "journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"batch": 9, "items": {"1": {"transcri')
+
+    backend = Backend()
+    deliver(backend, [])
+    assert backend.delivered == [(1, "a1"), (1, "a2")]
+
+
+def test_journal_is_compacted_while_a_source_backs_off(deliver, tmp_path):
+    results = [(2, "b1")] + [(1, f"a{i}") for i in range(100)] + [(2, "b2")]
+    first = Backend(failing={2})
+    deliver(first, results, compact_size=1024)
+    assert first.delivered == [(1, f"a{i}") for i in range(100)]
+
+    # The delivered results no longer hold back the journal behind the first batch
+    journal = tmp_path / "journal.jsonl"
+    with open(journal, encoding="utf-8") as f:
+        batches = [record for record in map(json.loads, f) if "batch" in record]
+    assert batches[0] == {"batch": 1, "items": {"2": result("b1").model_dump()}}
+    assert journal.stat().st_size <= 2 * 1024
+
+    second = Backend()
+    deliver(second, [])
+    assert second.delivered == [(2, "b1"), (2, "b2")]
@@ -0,0 +1,136 @@
+import math
+from itertools import groupby
+
+import pytest
+
+from src.api.transcription.schemas import Segment, WordTimings
+from src.source_processing.stitching import TranscribedWindow
+
+# Sentences of 7 words 0.6 s apart, with a pause long enough to cut at between them
+SENTENCE = 7
+
+
+def speech(count: int) -> list[tuple[str, float, float]]:
+    words = []
+    t = 0.0
+    for i in range(count):
+        words.append((f"w{i}", round(t, 2), round(t + 0.45, 2)))
+        t += 1.2 if i % SENTENCE == SENTENCE - 1 else 0.6
+    return words
+
+
+def transcribe(
+    words: list[tuple[str, float, float]],
+    start: int,
+    duration: int,
+    segment_size: int = SENTENCE,
+    timings: bool = True,
+    jitter: float = 0.0,
+) -> TranscribedWindow:
+    """
+    Transcription of the words spoken entirely within a window, in segments of `segment_size`
+    words, with word timings off by `jitter` seconds.
+    """
+    inside = [
+        (word, s + jitter, e + jitter)
+        for word, s, e in words
+        if s >= start and e <= start + duration
+    ]
+    # Segments are cut at the same words in every window, a window starting within one
+    # transcribes the rest of it
+    segments = [
+        Segment(
+            number=number,
+            start=group[0][1],
+            end=group[-1][2],
+            text=" ".join(word for word, _, _ in group),
+        )
+        for number, group in enumerate(
+            list(group) for _, group in groupby(inside, lambda w: int(w[0][1:]) // segment_size)
+        )
+    ]
+    timings_ = None
+    if timings:
+        timings_ = WordTimings()
+        for word, s, e in inside:
+            timings_.append(word, s, e, 0.9)
+    return TranscribedWindow(start, duration, segments, timings_)
+
+
+def publish(window: TranscribedWindow, committed: float | None) -> tuple[list[str], float]:
+    """
+    Cuts a window after the previous one like the pipeline does, returns the words
+    published and the new committed position.
+    """
+    since = committed if committed is not None else window.start
+    cut = window.cut_point(since)
+    words = [word for segment in window.take(since, cut) for word in segment.text.split()]
+    return words, cut
+
+
+def spoken_before(words: list[tuple[str, float, float]], position: float) -> list[str]:
+    return [word for word, s, e in words if (s + e) / 2 < position]
+
+
+@pytest.mark.parametrize("segment_size", [SENTENCE, 10])
+def test_catch_up_windows_publish_every_word_once(segment_size):
+    words = speech(200)
+    published, committed = [], None
+    # Catch-up windows of 30 s starting 5 s before the end of the previous one
+    for start in range(0, 100, 25):
+        window = transcribe(words, start, 30, segment_size, jitter=0.03 * (start % 2))
+        taken, committed = publish(window, committed)
+        published += taken
+
+    assert published == spoken_before(words, committed)
+
+
+def test_live_windows_publish_every_word_once():
+    words = speech(200)
+    published, committed = [], None
+    start, end = 0, 30
+    # Each window continues from the second the previous cut falls into
+    while end <= 120:
+        taken, committed = publish(transcribe(words, start, end - start, 10), committed)
+        published += taken
+        start, end = math.floor(committed), end + 30
+
+    assert published == spoken_before(words, committed)
+
+
+def test_segment_over_the_cut_is_split_at_a_word():
+    words = speech(100)
+    first = transcribe(words, 0, 30, segment_size=10)
+    cut = first.cut_point(0)
+    taken = first.take(0, cut)
+    second = transcribe(words, math.floor(cut), 30, segment_size=10)
+    rest = second.take(cut, second.cut_point(cut))
+
+    assert cut < 30 - 1.0
+    assert taken[-1].end < cut < rest[0].start
+    assert taken[-1].text.split()[-1] != rest[0].text.split()[0]
+    assert len(taken[-1].text.split()) < 10 or len(rest[0].text.split()) < 10
+
+
+def test_cut_is_not_made_after_a_poorly_aligned_word():
+    words = speech(100)
+    window = transcribe(words, 0, 30)
+    best = window.cut_point(0)
+    last = next(i for i, end in enumerate(window.words.ends) if end > best) - 1
+    window.words.scores[last] = 0.1
+
+    cut = window.cut_point(0)
+    assert cut < window.words.ends[last]
+
+
+def test_windows_without_word_timings_publish_every_segment_once():
+    words = speech(200)
+    published, committed = [], None
+    start, end = 0, 30
+    while end <= 120:
+        window = transcribe(words, start, end - start, timings=False)
+        taken, committed = publish(window, committed)
+        published += taken
+        start, end = math.floor(committed), end + 30
+
+    assert published == spoken_before(words, committed)
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from benchmarks.ts import FRAMES_PER_SECOND, TsGenerator
+from src.api.spool import Spool
+from src.media import demux_audio, extract_audio, inspect_chunk, slice_from
+
+# Size of an ADTS frame of the generated audio stream, one per video frame
+AUDIO_FRAME_SIZE = 367
+
+
+async def spool(data: bytes) -> Spool:
+    result = Spool("chunk.ts")
+    await result.write(data)
+    return result
+
+
+async def audio(chunk: Spool) -> bytes:
+    extracted = await extract_audio(chunk, "ru")
+    with extracted, extracted.open() as f:
+        return f.read()
+
+
+@pytest.fixture
+def chunks():
+    """
+    Two consecutive 20 s chunks of a stream with a low video bitrate.
+    """
+    generator = TsGenerator(video_bitrate_kbps=200)
+    return generator.generate(20, seed=1), generator.generate(20, seed=2)
+
+
+@pytest.mark.parametrize("seconds", [0, 5, 10.5, 19])
+def test_slice_keeps_the_audio_after_the_cut(chunks, seconds):
+    async def main():
+        with await spool(chunks[0]) as chunk:
+            full = await audio(chunk)
+            with await slice_from(chunk, seconds, "ru") as rest:
+                return full, await audio(rest), await inspect_chunk(rest, "ru")
+
+    full, rest, health = asyncio.run(main())
+    assert full.endswith(rest)
+    cut = round(seconds * FRAMES_PER_SECOND)
+    assert abs(len(full) - len(rest) - cut * AUDIO_FRAME_SIZE) <= AUDIO_FRAME_SIZE
+    assert health.cc_errors == 0
+    assert health.pts_seconds == pytest.approx(20 - seconds, abs=0.1)
+
+
+def test_slice_joined_to_the_next_chunk_demuxes_as_one_stream(chunks):
+    async def main():
+        with await spool(chunks[0]) as first, await spool(chunks[1]) as second:
+            with await slice_from(first, 12, "ru") as rest, rest.open() as f:
+                with await spool(f.read() + chunks[1]) as joined:
+                    tail, following = await demux_audio(rest, "ru"), await demux_audio(second)
+                    return (
+                        await audio(rest) + await audio(second),
+                        await audio(joined),
+                        tail.join(following),
+                        await inspect_chunk(joined, "ru"),
+                    )
+
+    expected, joined, track, health = asyncio.run(main())
+    assert joined == expected
+    assert track.data == expected
+    assert health.cc_errors == 0
+
+
+def test_slice_past_the_audio_is_none(chunks):
+    async def main():
+        with await spool(chunks[0]) as chunk:
+            return await slice_from(chunk, 21, "ru")
+
+    assert asyncio.run(main()) is None